@@ -0,0 +1,430 @@
+# api/server.py
+"""
+API HTTP/JSON (ASGI) con los mismos agregados del dashboard, sin Streamlit.
+
+Ejecutar como proceso propio:
+    uvicorn api.server:app --host 0.0.0.0 --port 8502
+o dentro del proceso de Streamlit (API_EMBEDDED=1) para compartir cachés y pool.
+Con varias franquicias, cada petición elige la suya con ?franquicia=<nombre> o el
+encabezado X-Tenant (por defecto, DEFAULT_TENANT).
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from urllib.parse import parse_qs
+
+import pandas as pd
+
+from data.admission import Overloaded, QueryTimeout, collect_stale
+from data.config import API_HOST, API_PORT, API_WORKERS
+from data.tenants import DEFAULT, TENANT_URLS, use_tenant
+from services.exports import ExportError
+
+# Hilos para las consultas bloqueantes (SQLAlchemy / pandas)
+_EXECUTOR = ThreadPoolExecutor(max_workers=API_WORKERS, thread_name_prefix="api")
+GZIP_MIN_BYTES = 1024
+
+ROUTES = {}
+
+
+class BadRequest(ValueError):
+    """Parámetros inválidos en la petición (responde 400)."""
+
+
+class Download:
+    """Respuesta descargable que se envía por bloques (sin content-length ni ETag)."""
+
+    def __init__(self, chunks, formato: str, nombre: str):
+        from services.exports import FORMATOS, file_name
+        self.chunks = iter(chunks)
+        self.media_type = FORMATOS[formato][0]
+        self.file_name = file_name(nombre, formato)
+
+
+def route(path: str):
+    def decorator(fn):
+        ROUTES[path] = fn
+        return fn
+    return decorator
+
+
+# ============================================
+# 🔧 PARÁMETROS
+# ============================================
+def _param(params: dict, name: str, default=None):
+    values = params.get(name)
+    return values[0] if values else default
+
+
+def _date_param(params: dict, name: str):
+    value = _param(params, name)
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise BadRequest(f"'{name}' debe tener formato YYYY-MM-DD")
+
+
+def _branches_param(params: dict) -> tuple:
+    raw = _param(params, "sucursales", "")
+    try:
+        return tuple(sorted(int(s) for s in raw.split(",") if s.strip()))
+    except ValueError:
+        raise BadRequest("'sucursales' debe ser una lista de ids separados por coma")
+
+
+def _int_param(params: dict, name: str, default: int, lo: int, hi: int) -> int:
+    try:
+        value = int(_param(params, name, default))
+    except ValueError:
+        raise BadRequest(f"'{name}' debe ser entero")
+    if not lo <= value <= hi:
+        raise BadRequest(f"'{name}' debe estar entre {lo} y {hi}")
+    return value
+
+
+def _range(params: dict):
+    fi, ff = _date_param(params, "fecha_inicio"), _date_param(params, "fecha_fin")
+    if (fi is None) != (ff is None):
+        raise BadRequest("Indica 'fecha_inicio' y 'fecha_fin' juntos")
+    if fi and fi > ff:
+        raise BadRequest("'fecha_inicio' debe ser <= 'fecha_fin'")
+    return fi, ff
+
+
+# ============================================
+# 📡 ENDPOINTS
+# ============================================
+@route("/api/sucursales")
+def api_sucursales(params):
+    from data.dimensions import get_dimensions
+    return get_dimensions().sucursales.frame
+
+
+@route("/api/estado/cache")
+def api_cache_status(params):
+    """Uso del presupuesto de memoria y aciertos/desalojos por caché (todo el proceso)."""
+    from data.memory import GOVERNOR
+    return {**GOVERNOR.usage(), "caches": json.loads(GOVERNOR.report().to_json(orient="records"))}
+
+
+@route("/api/kpis")
+def api_kpis(params):
+    from data.config import DISTINCT_MODE
+    fi, ff = _range(params)
+    sucs = _branches_param(params)
+    if DISTINCT_MODE == "hll":
+        from data.rollups import get_monthly_rollup
+        from services.analytics import calcular_kpis_aproximados
+        rollup = get_monthly_rollup()
+        ventas, ordenes, ticket = calcular_kpis_aproximados(rollup, fi, ff, sucs)
+        return {"total_ventas": ventas, "total_ordenes": ordenes,
+                "ticket_promedio": ticket, "error_relativo": rollup.error}
+
+    from data.queries import cached_kpis
+    row = cached_kpis(fi, ff, sucs).iloc[0]
+    return {"total_ventas": float(row["total_ventas"]), "total_ordenes": int(row["total_ordenes"]),
+            "ticket_promedio": float(row["ticket_promedio"])}
+
+
+@route("/api/sucursales/mensual")
+def api_branch_monthly(params):
+    from services.analytics import get_branch_comparison_data
+    fi, ff = _range(params)
+    sucs = _branches_param(params)
+    if not (fi and sucs):
+        raise BadRequest("Requiere 'fecha_inicio', 'fecha_fin' y 'sucursales'")
+    return get_branch_comparison_data(fi, ff, list(sucs))
+
+
+@route("/api/sucursales/comparar")
+def api_branch_comparison(params):
+    from services.analytics import get_branch_comparison_data, comparar_dos_sucursales, comparar_n_sucursales
+    from data.dimensions import get_dimensions
+    fi, ff = _range(params)
+    sucs = _branches_param(params)
+    if not fi or len(sucs) < 2:
+        raise BadRequest("Requiere rango de fechas y al menos 2 'sucursales'")
+
+    df = get_branch_comparison_data(fi, ff, list(sucs))
+    if df.empty:
+        return pd.DataFrame()
+    df["Sucursal"] = get_dimensions().branch_labels(df["sucursal"], "nombre")
+    resumen = (
+        df.groupby("Sucursal", as_index=False)["total_ventas"].sum()
+        .rename(columns={"total_ventas": "Ventas Totales"})
+    )
+    if len(resumen) < 2:
+        return resumen
+    # Números sin formato: "$" y "%" son cosa de la UI
+    if len(resumen) > 2:
+        return comparar_n_sucursales(resumen, formato=False)
+    return comparar_dos_sucursales(resumen, formato=False)
+
+
+def _cohorts_param(params: dict) -> dict:
+    """"norte:1|2|3;sur:4|5" -> {"norte": [1, 2, 3], "sur": [4, 5]}."""
+    cohortes = {}
+    for item in filter(None, (p.strip() for p in _param(params, "cohortes", "").split(";"))):
+        nombre, _, ids = item.partition(":")
+        try:
+            cohortes[nombre.strip()] = [int(s) for s in ids.split("|") if s.strip()]
+        except ValueError:
+            raise BadRequest("'cohortes' debe tener formato nombre:id|id;nombre:id")
+        if not nombre.strip() or not cohortes[nombre.strip()]:
+            raise BadRequest("'cohortes' debe tener formato nombre:id|id;nombre:id")
+    return cohortes
+
+
+@route("/api/sucursales/grupos")
+def api_branch_groups(params):
+    """?por=ciudad|antiguedad|cohortes (&cohortes=nombre:id|id;...) sobre el rollup mensual."""
+    from data.dimensions import get_dimensions
+    from data.rollups import get_monthly_rollup
+    from services.groups import COHORTES, comparar_grupos, definir_grupos, prueba_grupos
+    fi, ff = _range(params)
+    sucs = _branches_param(params) or None
+    por = _param(params, "por", "ciudad")
+    cohortes = _cohorts_param(params)
+    if por == COHORTES and not cohortes:
+        raise BadRequest("'por=cohortes' requiere 'cohortes'")
+
+    rollup = get_monthly_rollup()
+    try:
+        grupos = definir_grupos(por, get_dimensions(), rollup, sucs, ff, cohortes)
+    except ValueError as e:
+        raise BadRequest(str(e))
+    tabla, serie = comparar_grupos(rollup, grupos, fi, ff)
+    return {
+        "grupos": json.loads(tabla.to_json(orient="records")),
+        "mensual": json.loads(serie.to_json(orient="records")),
+        "prueba": prueba_grupos(rollup, grupos, fi, ff),
+        "error_relativo_ordenes": rollup.error,
+    }
+
+
+@route("/api/periodos")
+def api_periods(params):
+    """
+    MoM, mismo mes del año anterior, YTD y móviles 3/6/12 para `periodo` (YYYY-MM;
+    por defecto el último mes completo). ?por=sucursal|pizza_id agrupa; sin él, total.
+    """
+    from services.periods import get_period_engine
+    por = _param(params, "por")
+    if por not in (None, "sucursal", "pizza_id"):
+        raise BadRequest("'por' debe ser 'sucursal' o 'pizza_id'")
+    eng = get_period_engine("producto" if por == "pizza_id" else "sucursal")
+    medida = _param(params, "medida", "ventas")
+    if medida not in eng.medidas:
+        raise BadRequest(f"'medida' debe ser una de: {', '.join(eng.medidas)}")
+
+    periodo = _param(params, "periodo")
+    if periodo is not None:
+        try:
+            anio, mes = (int(x) for x in periodo.split("-"))
+        except ValueError:
+            raise BadRequest("'periodo' debe tener formato YYYY-MM")
+        if not 1 <= mes <= 12:
+            raise BadRequest("'periodo' debe tener un mes entre 01 y 12")
+        periodo = anio * 12 + mes - 1
+    return eng.comparar(periodo, medida, _branches_param(params), por=por)
+
+
+@route("/api/pizzas/top")
+def api_top_pizzas(params):
+    from data.queries import cached_top_pizzas
+    top_n = _int_param(params, "top_n", 5, 1, 500)
+    return cached_top_pizzas(top_n, _branches_param(params))
+
+
+@route("/api/pareto/productos")
+def api_pareto_productos(params):
+    from services.pareto import get_pareto_productos_abc
+    fi, ff = _range(params)
+    return get_pareto_productos_abc(fi, ff, _branches_param(params)).to_frame()
+
+
+@route("/api/pareto/sucursales")
+def api_pareto_sucursales(params):
+    from services.pareto import get_pareto_sucursales_abc
+    fi, ff = _range(params)
+    return get_pareto_sucursales_abc(fi, ff, _branches_param(params)).to_frame(name_col="nombre")
+
+
+@route("/api/export/vista")
+def api_export_view(params):
+    from services.exports import export_view
+    fi, ff = _range(params)
+    vista = _param(params, "vista", "")
+    formato = _param(params, "formato", "csv")
+    chunks = export_view(vista, formato, fi, ff, _branches_param(params),
+                         top_n=_int_param(params, "top_n", 5, 1, 500))
+    return Download(chunks, formato, vista)
+
+
+@route("/api/export/ventas")
+def api_export_ventas(params):
+    from services.exports import export_ventas
+    fi, ff = _range(params)
+    formato = _param(params, "formato", "csv")
+    return Download(export_ventas(formato, fi, ff, _branches_param(params)), formato, "ventas_totales")
+
+
+# ============================================
+# 🧩 ASGI
+# ============================================
+def _to_json(payload) -> bytes:
+    if isinstance(payload, pd.DataFrame):
+        return ('{"data":' + payload.to_json(orient="records", date_format="iso") + "}").encode()
+    return json.dumps(payload, default=str).encode()
+
+
+def _headers(scope) -> dict:
+    return {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+
+
+async def _respond(send, status: int, body: bytes = b"", headers=None):
+    headers = [(k.encode(), v.encode()) for k, v in (headers or {}).items()]
+    headers.append((b"content-length", str(len(body)).encode()))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _in_tenant(tenant: str, fn, *args):
+    """Los hilos del pool no heredan el contexto: cada llamada fija la franquicia."""
+    with use_tenant(tenant):
+        return fn(*args)
+
+
+def _handle(tenant: str, handler, params) -> tuple:
+    """Ejecuta el handler y avisa si alguna caché respondió con una versión anterior."""
+    with use_tenant(tenant), collect_stale() as avisos:
+        return handler(params), bool(avisos)
+
+
+async def _stream(send, method: str, download: Download, first: bytes, tenant: str):
+    """Envía la descarga bloque a bloque; cada bloque se produce en el pool de hilos."""
+    headers = {
+        "content-type": download.media_type,
+        "content-disposition": f'attachment; filename="{download.file_name}"',
+        "cache-control": "no-store",
+    }
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(k.encode(), v.encode()) for k, v in headers.items()]})
+    if method == "HEAD":
+        if hasattr(download.chunks, "close"):
+            download.chunks.close()
+        return await send({"type": "http.response.body", "body": b""})
+
+    loop = asyncio.get_running_loop()
+    chunk = first
+    while True:
+        siguiente = await loop.run_in_executor(_EXECUTOR, _in_tenant, tenant, next, download.chunks, None)
+        await send({"type": "http.response.body", "body": chunk, "more_body": siguiente is not None})
+        if siguiente is None:
+            return
+        chunk = siguiente
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    json_headers = {"content-type": "application/json; charset=utf-8"}
+    if scope["method"] not in ("GET", "HEAD"):
+        return await _respond(send, 405, b'{"error":"method not allowed"}', json_headers)
+
+    handler = ROUTES.get(scope["path"].rstrip("/") or "/")
+    if handler is None:
+        return await _respond(send, 404, b'{"error":"not found"}', json_headers)
+
+    params = parse_qs(scope.get("query_string", b"").decode())
+    request_headers = _headers(scope)
+    tenant = _param(params, "franquicia") or request_headers.get("x-tenant") or DEFAULT
+    if tenant not in TENANT_URLS:
+        return await _respond(send, 404, json.dumps({"error": f"franquicia desconocida: {tenant}"}).encode(),
+                              json_headers)
+
+    loop = asyncio.get_running_loop()
+    try:
+        payload, stale = await loop.run_in_executor(_EXECUTOR, _handle, tenant, handler, params)
+        if isinstance(payload, Download):
+            # El primer bloque se produce antes de responder: si falla, aún es un 400
+            first = await loop.run_in_executor(_EXECUTOR, _in_tenant, tenant, next, payload.chunks, b"")
+    except (BadRequest, ExportError) as e:
+        return await _respond(send, 400, json.dumps({"error": str(e)}).encode(), json_headers)
+    except Overloaded as e:
+        # Sin versión previa que servir: el cliente debe reintentar, no quedarse en cola
+        return await _respond(send, 503, json.dumps({"error": str(e)}).encode(),
+                              dict(json_headers, **{"retry-after": "5"}))
+    except QueryTimeout as e:
+        return await _respond(send, 504, json.dumps({"error": str(e)}).encode(), json_headers)
+
+    if isinstance(payload, Download):
+        return await _stream(send, scope["method"], payload, first, tenant)
+
+    body = _to_json(payload)
+    # ETag débil: el mismo contenido puede viajar con o sin gzip
+    etag = 'W/"' + hashlib.sha1(body).hexdigest() + '"'
+    headers = dict(json_headers, etag=etag, vary="Accept-Encoding")
+    headers["cache-control"] = "no-cache"
+    if stale:
+        headers["warning"] = '110 - "Response is Stale"'
+
+    # GET condicional: el cliente ya tiene esta misma respuesta
+    if etag in [t.strip() for t in request_headers.get("if-none-match", "").split(",")]:
+        return await _respond(send, 304, b"", {"etag": etag})
+
+    if len(body) >= GZIP_MIN_BYTES and "gzip" in request_headers.get("accept-encoding", ""):
+        body = gzip.compress(body, compresslevel=5)
+        headers["content-encoding"] = "gzip"
+
+    if scope["method"] == "HEAD":
+        headers["content-length"] = str(len(body))
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(k.encode(), v.encode()) for k, v in headers.items()]})
+        return await send({"type": "http.response.body", "body": b""})
+    await _respond(send, 200, body, headers)
+
+
+# ============================================
+# 🚀 ARRANQUE
+# ============================================
+def serve(host: str = API_HOST, port: int = API_PORT):
+    """Levanta la API con uvicorn (dependencia opcional)."""
+    import uvicorn
+    uvicorn.run(app, host=host, port=port, log_level="info")
+
+
+def start_in_background(host: str = API_HOST, port: int = API_PORT) -> threading.Thread:
+    """
+    Levanta la API en un hilo daemon del proceso actual (p. ej. el de Streamlit),
+    así comparte cachés en memoria y el pool de conexiones del motor.
+    """
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    server.install_signal_handlers = lambda: None
+    thread = threading.Thread(target=server.run, name="api-server", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    serve()
@@ -1,7 +1,7 @@
 
 
 # app.py
-import os, sys
+import os, sys, time
 import streamlit as st
 from ui.views import view_comparar_sucursales
 
@@ -18,21 +18,49 @@ print(">>> Contenido ROOT:", os.listdir(ROOT))
 # ============================================
 # 🧩 IMPORTS INTERNOS
 # ============================================
-from data.config import PAGE_TITLE, PAGE_LAYOUT
+from data.config import PAGE_TITLE, PAGE_LAYOUT, API_EMBEDDED, WARMER_ENABLED
+from services.warmer import Warmer, record_usage
+from ui.fragments import registrar_tiempo, tiempos_recientes, tolerante, SHOW_TIMINGS_KEY
 from ui.filters import sidebar_filters
+from ui.downloads import view_exportar
 from ui.views import (
     compute_date_range,
     kpis_view,
     ranking_pizzas_view,
+    view_drilldown,
+    view_canasta,
     view_placeholder  # la puedes usar para futuras secciones
 )
 
 # ============================================
 # 🎨 CONFIG STREAMLIT
 # ============================================
+_t0_rerun = time.perf_counter()
 st.set_page_config(page_title=PAGE_TITLE, layout=PAGE_LAYOUT)
 st.title("🍕 Dashboard de Ventas")
 
+# ============================================
+# 📡 API HTTP EMBEBIDA (opcional)
+# ============================================
+@st.cache_resource(show_spinner=False)
+def _api_embebida():
+    # Un solo servidor por proceso: comparte cachés y pool con el dashboard
+    from api.server import start_in_background
+    return start_in_background()
+
+if API_EMBEDDED:
+    _api_embebida()
+
+# ============================================
+# 🔥 PRE-CALENTADO DE CACHÉS (un hilo por proceso)
+# ============================================
+@st.cache_resource(show_spinner=False)
+def _warmer():
+    return Warmer().start()
+
+if WARMER_ENABLED:
+    _warmer()
+
 # ============================================
 # 🧭 SIDEBAR Y FILTROS
 # ============================================
@@ -44,6 +72,7 @@ fecha_inicio, fecha_fin, m_ini, m_fin = compute_date_range(
     f["anio_inicio"], f["anio_fin"], f["months_dict"],
     f["mes_inicio"], f["mes_fin"]
 )
+record_usage("rango", fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, sucursales=f["sucs_sel"])
 
 # ============================================
 # 📂 MENÚ PRINCIPAL
@@ -54,7 +83,10 @@ opcion = st.sidebar.selectbox(
     [
         "📊 KPIs",
         "🏙️ Comparar Sucursales",
-        "🍕 Ranking de Productos (Pizzas)"
+        "🍕 Ranking de Productos (Pizzas)",
+        "🕒 Drill-down (Mes → Día → Hora)",
+        "🧺 Análisis de Canasta",
+        "📥 Exportar Datos"
     ]
 )
 
@@ -63,21 +95,62 @@ st.sidebar.caption(f"Debug: sección seleccionada ⇒ {opcion}")
 # ============================================
 #  VISTAS
 # ============================================
-if "kpi" in opcion.lower():
-    kpis_view()
-
-
-
-elif "pizza" in opcion.lower():
-    ranking_pizzas_view()
-
-elif "sucursal" in opcion.lower():
-    view_comparar_sucursales(
-    fecha_inicio=fecha_inicio,
-    fecha_fin=fecha_fin,
-    sucursales=f["sucs_sel"],
-    map_sucursales=f["suc_id_to_label"]
-)
+# Consultas canceladas/vencidas se vuelven avisos, no trazas (ui/fragments.tolerante)
+with tolerante():
+    if "kpi" in opcion.lower():
+        kpis_view()
+
+
+
+    elif "pizza" in opcion.lower():
+        ranking_pizzas_view()
+
+    elif "exportar" in opcion.lower():
+        view_exportar(
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            sucursales=f["sucs_sel"],
+            map_sucursales=f["suc_id_to_label"]
+        )
+
+    elif "canasta" in opcion.lower():
+        view_canasta(
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            sucursales=f["sucs_sel"],
+            map_sucursales=f["suc_id_to_label"]
+        )
+
+    elif "drill" in opcion.lower():
+        view_drilldown(
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            sucursales=f["sucs_sel"],
+            map_sucursales=f["suc_id_to_label"]
+        )
+
+    elif "sucursal" in opcion.lower():
+        view_comparar_sucursales(
+        fecha_inicio=fecha_inicio,
+        fecha_fin=fecha_fin,
+        sucursales=f["sucs_sel"],
+        map_sucursales=f["suc_id_to_label"]
+    )
 
     
 print(" DEBUG opción seleccionada:", opcion)
+
+# ============================================
+# ⏱️ TIEMPO DE RERUN COMPLETO
+# ============================================
+# Los reruns de fragmentos no pasan por aquí; cada sección registra el suyo.
+registrar_tiempo("script completo", time.perf_counter() - _t0_rerun, mostrar=False)
+if st.session_state.get(SHOW_TIMINGS_KEY):
+    with st.sidebar.expander("⏱️ Tiempos de rerun", expanded=True):
+        st.dataframe(tiempos_recientes(), hide_index=True, use_container_width=True)
+    with st.sidebar.expander("🧠 Memoria de cachés"):
+        from data.memory import GOVERNOR
+        uso = GOVERNOR.usage()
+        st.caption(f"{uso['cache_mb'] + uso['fijos_mb']:,.1f} de {uso['presupuesto_mb']:,.0f} MB "
+                   f"({uso['fijos_mb']:,.1f} MB fijos, {uso['entradas']} entradas)")
+        st.dataframe(GOVERNOR.report(), hide_index=True, use_container_width=True)
@@ -0,0 +1,221 @@
+# data/admission.py
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter
+
+from .config import ADMISSION_WAIT_S, MAX_HEAVY_QUERIES
+
+WATCHDOG_INTERVAL = 0.2  # segundos entre revisiones de consultas en curso
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# ⛔ ERRORES
+# ============================================
+class QueryInterrupted(RuntimeError):
+    """La consulta se interrumpió antes de terminar."""
+
+
+class QueryCancelled(QueryInterrupted):
+    """La sesión pidió otro rerun (cambió filtros) mientras la consulta corría."""
+
+
+class QueryTimeout(QueryInterrupted):
+    """La consulta excedió su presupuesto de tiempo."""
+
+
+class Overloaded(RuntimeError):
+    """No hubo cupo para otra consulta pesada dentro de ADMISSION_WAIT_S."""
+
+
+# Errores ante los que se puede servir la última versión cacheada
+DEGRADABLE = (QueryTimeout, Overloaded)
+
+
+# ============================================
+# 🚦 CONTROL DE ADMISIÓN
+# ============================================
+class AdmissionController:
+    """
+    Semáforo para consultas pesadas (escaneos completos, exportaciones): a lo sumo
+    `cupos` a la vez por proceso. Si no hay cupo en `espera` segundos se rechaza con
+    Overloaded en lugar de encolar sin fin. El cupo no es por hilo: una exportación
+    en streaming lo toma en un hilo y lo libera en otro.
+    """
+
+    def __init__(self, cupos: int = MAX_HEAVY_QUERIES, espera: float = ADMISSION_WAIT_S):
+        self.cupos = cupos
+        self.espera = espera
+        self._sem = threading.BoundedSemaphore(max(1, cupos))
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    @contextlib.contextmanager
+    def admit(self):
+        if not self._sem.acquire(timeout=self.espera):
+            with self._lock:
+                self.stats["rechazadas"] += 1
+            raise Overloaded(f"Servidor ocupado: {self.cupos} consultas pesadas en curso")
+        with self._lock:
+            self.stats["admitidas"] += 1
+            self.stats["en_curso"] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stats["en_curso"] -= 1
+            self._sem.release()
+
+
+ADMISSION = AdmissionController()
+
+
+# ============================================
+# ⏱️ CONSULTAS VIGILADAS (timeout + cancelación)
+# ============================================
+def _script_requests():
+    """Cola de pedidos de rerun de la sesión de Streamlit actual (None fuera de un script)."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return getattr(ctx, "script_requests", None) if ctx is not None else None
+
+
+# Se apaga la primera vez que el estado interno de Streamlit no se puede leer:
+# desde ahí solo se aplican los timeouts.
+_cancelacion_disponible = True
+
+
+def _superseded(requests) -> bool:
+    """
+    ¿La sesión ya pidió detener o re-ejecutar el script? Replica la regla de
+    Streamlit: un rerun de otro fragmento no interrumpe la ejecución en curso.
+    Lee estado interno (módulo privado): QueryHandle.poll atrapa cualquier error.
+    """
+    from streamlit.runtime.scriptrunner_utils.script_requests import ScriptRequestType
+    estado = getattr(requests, "_state", None)
+    if estado == ScriptRequestType.STOP:
+        return True
+    if estado == ScriptRequestType.RERUN:
+        datos = getattr(requests, "_rerun_data", None)
+        return not (datos is not None and datos.fragment_id_queue and not datos.is_fragment_scoped_rerun)
+    return False
+
+
+class QueryHandle:
+    """Una consulta en curso: su fecha límite, su sesión y cómo cancelarla en el motor."""
+
+    def __init__(self, timeout: float | None):
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.requests = _script_requests()
+        self.reason = None  # "timeout" | "cancelada"
+        self._cancel = None
+
+    def on_cancel(self, fn):
+        self._cancel = fn
+
+    def poll(self, ahora: float) -> str | None:
+        if self.reason is None:
+            if self.deadline is not None and ahora > self.deadline:
+                self.cancel("timeout")
+            elif self.requests is not None and self._superseded():
+                self.cancel("cancelada")
+        return self.reason
+
+    def _superseded(self) -> bool:
+        global _cancelacion_disponible
+        if not _cancelacion_disponible:
+            return False
+        try:
+            return _superseded(self.requests)
+        except Exception:
+            _cancelacion_disponible = False
+            logger.warning("No se pudo leer el estado de rerun de Streamlit; "
+                           "las consultas solo se cortan por timeout", exc_info=True)
+            return False
+
+    def cancel(self, reason: str):
+        self.reason = reason
+        if self._cancel is not None:
+            try:
+                self._cancel()
+            except Exception as e:  # la consulta pudo terminar justo antes
+                logger.debug("No se pudo cancelar la consulta: %r", e)
+
+    def error(self) -> QueryInterrupted:
+        if self.reason == "timeout":
+            return QueryTimeout(f"La consulta superó su límite de {self.timeout:g} s")
+        return QueryCancelled("Consulta cancelada: la sesión cambió de filtros")
+
+
+class _Watchdog:
+    """Hilo único que revisa las consultas en curso y cancela las vencidas o abandonadas."""
+
+    def __init__(self):
+        self._activas = set()
+        self._lock = threading.Lock()
+        self._hay_activas = threading.Event()
+        self._thread = None
+
+    def watch(self, handle: QueryHandle):
+        with self._lock:
+            self._activas.add(handle)
+            self._hay_activas.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="query-watchdog", daemon=True)
+                self._thread.start()
+
+    def unwatch(self, handle: QueryHandle):
+        with self._lock:
+            self._activas.discard(handle)
+            if not self._activas:
+                self._hay_activas.clear()
+
+    def _loop(self):
+        while True:
+            self._hay_activas.wait()
+            time.sleep(WATCHDOG_INTERVAL)
+            with self._lock:
+                activas = list(self._activas)
+            ahora = time.monotonic()
+            for handle in activas:
+                # El hilo no debe morir: sin él no se aplica ningún timeout
+                try:
+                    handle.poll(ahora)
+                except Exception:
+                    logger.exception("Error al revisar una consulta en curso")
+
+
+WATCHDOG = _Watchdog()
+
+
+# ============================================
+# 🕰️ RESULTADOS DEGRADADOS (última versión)
+# ============================================
+# Cuando una caché sirve una versión anterior en lugar de fallar, lo anota aquí;
+# la UI y la API recogen los avisos con collect_stale().
+_stale = contextvars.ContextVar("stale", default=None)
+
+
+def note_stale(nombre: str):
+    avisos = _stale.get()
+    if avisos is not None:
+        avisos.append(nombre)
+
+
+@contextlib.contextmanager
+def collect_stale():
+    """Junta los avisos del bloque; al salir también los pasa al colector exterior."""
+    exterior = _stale.get()
+    avisos = []
+    token = _stale.set(avisos)
+    try:
+        yield avisos
+    finally:
+        _stale.reset(token)
+        if exterior is not None:
+            exterior.extend(avisos)
@@ -0,0 +1,166 @@
+# data/cache.py
+import functools
+import hashlib
+import inspect
+import threading
+from collections import OrderedDict
+
+from .admission import DEGRADABLE, collect_stale, note_stale
+from .filters import Subconjunto, canonizar
+from .memory import GOVERNOR
+from .tenants import current_tenant
+from .versioning import get_versions
+
+# (franquicia, argumentos) recordados por función para servir la última versión
+# ante timeouts; las entradas en sí viven en el gobernador de memoria (data/memory.py).
+DEFAULT_MAX_ENTRIES = 256
+
+# función (módulo.nombre) -> tablas de las que depende, para diagnóstico
+CACHE_REGISTRY = {}
+
+
+# ============================================
+# 🔖 CACHÉ ESTAMPADA CON VERSIONES DE DATOS
+# ============================================
+def versioned_cache(*tablas: str, max_entries: int = DEFAULT_MAX_ENTRIES, subconjunto: Subconjunto | None = None):
+    """
+    Caché sin TTL: la llave de cada entrada incluye la versión (sondas de
+    data/versioning.py) de las `tablas` de las que depende. La entrada se sirve
+    mientras esas tablas no cambien y se invalida en cuanto cambian. Sin tablas,
+    la llave solo lleva la franquicia (para funciones que ya reciben la versión).
+
+    Las entradas se guardan en GOVERNOR: cuentan contra el presupuesto global de
+    memoria y se desalojan por costo/tamaño/uso, no por número de entradas.
+
+    Los argumentos se ligan a la firma y los filtros (fechas, sucursales) se
+    normalizan (data/filters.py) antes de armar la llave: el orden de selección o
+    el tipo de fecha no generan entradas distintas. Con `subconjunto`, un fallo se
+    responde filtrando una entrada vigente que ya contenga lo pedido.
+
+        @versioned_cache("ventas_totales")
+        def cached_kpis(fi, ff, sucursales: tuple): ...
+    """
+    def decorator(fn):
+        # Huella del código: una versión nueva de la función no reutiliza entradas viejas
+        try:
+            fuente = inspect.getsource(fn).encode()
+        except OSError:
+            fuente = fn.__code__.co_code
+        codigo = hashlib.sha1(fuente).hexdigest()
+        nombre = f"{fn.__module__}.{fn.__qualname__}"
+        firma = inspect.signature(fn)
+
+        def llave_de(version, argumentos):
+            return (nombre, version, codigo, repr(tuple(argumentos.items())))
+
+        # (franquicia, argumentos) -> (última versión que respondió, argumentos): ante
+        # timeout o sobrecarga se sirve esa entrada, marcada como vieja, si sigue en
+        # memoria; con `subconjunto`, también son las candidatas a superconjunto
+        ultimas = OrderedDict()
+        lock = threading.Lock()
+
+        def derivar(tenant, version, argumentos):
+            with lock:
+                candidatas = [a for (t, _), (ver, a) in reversed(ultimas.items())
+                              if t == tenant and ver == version and subconjunto.cubre(a, argumentos)]
+            for a in candidatas:
+                hit, valor = GOVERNOR.peek(llave_de(version, a))
+                if hit:
+                    GOVERNOR.note(nombre, "derivadas")
+                    return True, subconjunto.filtrar(valor, argumentos)
+            return False, None
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            ligados = firma.bind(*args, **kwargs)
+            ligados.apply_defaults()
+            argumentos = canonizar(ligados.arguments)
+            tenant = current_tenant()
+            llave = (tenant, repr(tuple(argumentos.items())))
+
+            def calcular():
+                if subconjunto is not None:
+                    hit, valor = derivar(tenant, version, argumentos)
+                    if hit:
+                        return valor
+                return fn(**argumentos)
+
+            try:
+                version = get_versions(*tablas)
+                resultado = GOVERNOR.get_or_compute(nombre, llave_de(version, argumentos), calcular)
+            except DEGRADABLE:
+                with lock:
+                    anterior = ultimas.get(llave)
+                hit, valor = (False, None) if anterior is None else GOVERNOR.peek(llave_de(anterior[0], argumentos))
+                if not hit:
+                    raise
+                note_stale(fn.__qualname__)
+                return valor
+            with lock:
+                ultimas[llave] = (version, argumentos)
+                ultimas.move_to_end(llave)
+                while len(ultimas) > max_entries:
+                    ultimas.popitem(last=False)
+            return resultado
+
+        wrapper.tablas = tablas
+        wrapper.clear = functools.partial(GOVERNOR.clear, nombre)
+        CACHE_REGISTRY[nombre] = tablas
+        return wrapper
+    return decorator
+
+
+# ============================================
+# 🏢 RECURSO VIGENTE POR FRANQUICIA
+# ============================================
+def tenant_resource(fn):
+    """
+    Sustituto de st.cache_resource(max_entries=1) para recursos construidos por
+    versión de datos (almacén, rollups, dimensiones): conserva solo el último
+    resultado, pero uno por franquicia. Con un único espacio global, alternar
+    sesiones de franquicias distintas reconstruiría el recurso en cada rerun.
+    Si reconstruir falla por timeout o sobrecarga, se sirve el anterior (marcado viejo).
+    """
+    nombre = f"{fn.__module__}.{fn.__qualname__}"
+    slots = {}  # franquicia -> (args, resultado)
+    locks = {}
+    guard = threading.Lock()
+
+    @functools.wraps(fn)
+    def wrapper(*args):
+        tenant = current_tenant()
+        with guard:
+            lock = locks.setdefault(tenant, threading.Lock())
+        with lock:
+            slot = slots.get(tenant)
+            if slot is None or slot[0] != args:
+                try:
+                    with collect_stale() as avisos:
+                        valor = fn(*args)
+                except DEGRADABLE:
+                    if slot is None:
+                        raise
+                    note_stale(fn.__qualname__)
+                    return slot[1]
+                # Construido con insumos viejos: se entrega, pero no queda como vigente
+                if avisos:
+                    return valor
+                slot = slots[tenant] = (args, valor)
+                # Fijo: no se desaloja, pero su tamaño achica el espacio de las demás cachés
+                GOVERNOR.pin(nombre, tenant, valor)
+        return slot[1]
+
+    def clear():
+        for tenant in list(slots):
+            GOVERNOR.pin(nombre, tenant, None)
+        slots.clear()
+
+    def remedir():
+        """Vuelve a medir el recurso vigente de la franquicia (estados incrementales que crecen en su lugar)."""
+        slot = slots.get(current_tenant())
+        if slot is not None:
+            GOVERNOR.pin(nombre, current_tenant(), slot[1])
+
+    wrapper.clear = clear
+    wrapper.remedir = remedir
+    return wrapper
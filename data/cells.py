@@ -0,0 +1,113 @@
+# data/cells.py
+import time
+
+import numpy as np
+import pandas as pd
+
+from .memory import GOVERNOR
+from .queries import _ts, query_monthly_sales_window
+from .versioning import get_versions
+
+CACHE = "data.cells.ventas_mensuales"
+_COLUMNAS = ["sucursal", "anio", "mes", "total_ventas"]
+
+
+# ============================================
+# 🧩 CELDAS (SUCURSAL, MES) REUTILIZABLES
+# ============================================
+# Cada mes completo de cada sucursal se guarda como una celda en GOVERNOR,
+# estampada con la versión de ventas_totales (que incluye la franquicia). Un
+# rango pedido se arma con las celdas que ya existen y solo se consultan los
+# meses faltantes: mover o ampliar la ventana de fechas cuesta uno o dos meses
+# de consulta, no el rango entero.
+#
+# Los meses cortados por el rango (el primero si no empieza el día 1 y el del
+# último día) se consultan con los límites exactos de get_monthly_sales, así el
+# resultado es idéntico al de la consulta completa.
+
+def _inicio(periodo: int) -> pd.Timestamp:
+    return pd.Timestamp(year=periodo // 12, month=periodo % 12 + 1, day=1)
+
+
+def _periodo(ts: pd.Timestamp) -> int:
+    return ts.year * 12 + ts.month - 1
+
+
+def _tramos(faltantes: dict) -> list:
+    """
+    faltantes: periodo -> sucursales sin celda. Agrupa meses consecutivos que
+    necesitan las mismas sucursales: una consulta por tramo.
+    """
+    tramos = []
+    for p in sorted(faltantes):
+        sucs = faltantes[p]
+        if tramos and tramos[-1][1] == p - 1 and tramos[-1][2] == sucs:
+            tramos[-1][1] = p
+        else:
+            tramos.append([p, p, sucs])
+    return tramos
+
+
+def _llenar(version, tramo) -> dict:
+    """Consulta un tramo de meses completos y guarda una celda por (sucursal, mes)."""
+    p0, p1, sucs = tramo
+    t0 = time.perf_counter()
+    df = query_monthly_sales_window(_inicio(p0).to_pydatetime(), _inicio(p1 + 1).to_pydatetime(), sucs)
+    costo = time.perf_counter() - t0
+
+    periodos = (df["anio"] * 12 + df["mes"] - 1).to_numpy()
+    valores = dict(zip(zip(df["sucursal"].astype(int), periodos.astype(int)), df["total_ventas"].astype(float)))
+    # None: la sucursal no vendió ese mes (la consulta no devuelve la fila)
+    celdas = {(s, p): valores.get((s, p)) for p in range(p0, p1 + 1) for s in sucs}
+    # Una consulta = un cálculo en las estadísticas; su costo se reparte entre las celdas
+    GOVERNOR.put_many(CACHE, {(CACHE, version, s, p): v for (s, p), v in celdas.items()}, costo)
+    return celdas
+
+
+def monthly_sales_from_cells(fecha_inicio, fecha_fin, sucursales) -> pd.DataFrame:
+    """
+    Mismo resultado que get_monthly_sales(fecha_inicio, fecha_fin, sucursales),
+    reutilizando celdas (sucursal, mes) ya consultadas.
+    Columnas: sucursal, anio, mes, total_ventas
+    """
+    sucs = tuple(sorted({int(s) for s in sucursales}))
+    desde, hasta = pd.Timestamp(_ts(fecha_inicio)), pd.Timestamp(_ts(fecha_fin))
+    if not sucs or desde > hasta:
+        return pd.DataFrame(columns=_COLUMNAS)
+
+    # Meses completos: del primero que empieza en o después de `desde` al anterior
+    # al de `hasta` (el mes de `hasta` nunca está completo: termina a las 00:00).
+    p_desde, p_hasta = _periodo(desde), _periodo(hasta)
+    p0 = p_desde if desde == _inicio(p_desde) else p_desde + 1
+    completos = range(p0, p_hasta)
+    if not completos:
+        return query_monthly_sales_window(desde.to_pydatetime(), hasta.to_pydatetime(), sucs, hasta_incluido=True)
+
+    version = get_versions("ventas_totales")
+    celdas, faltantes = {}, {}
+    for p in completos:
+        for s in sucs:
+            hit, valor = GOVERNOR.get(CACHE, (CACHE, version, s, p))
+            if hit:
+                celdas[(s, p)] = valor
+            else:
+                faltantes.setdefault(p, []).append(s)
+    for tramo in _tramos({p: tuple(v) for p, v in faltantes.items()}):
+        celdas.update(_llenar(version, tramo))
+
+    partes = []
+    if p0 > p_desde:
+        partes.append(query_monthly_sales_window(desde.to_pydatetime(), _inicio(p0).to_pydatetime(), sucs))
+    filas = [(s, p, v) for (s, p), v in celdas.items() if v is not None]
+    if filas:
+        s, p, v = map(np.asarray, zip(*filas))
+        partes.append(pd.DataFrame({"sucursal": s.astype(np.int64), "anio": (p // 12).astype(np.int64),
+                                    "mes": (p % 12 + 1).astype(np.int64), "total_ventas": v.astype(float)}))
+    partes.append(query_monthly_sales_window(_inicio(p_hasta).to_pydatetime(), hasta.to_pydatetime(), sucs,
+                                             hasta_incluido=True))
+
+    partes = [df for df in partes if not df.empty]
+    if not partes:
+        return pd.DataFrame(columns=_COLUMNAS)
+    return (pd.concat(partes, ignore_index=True)[_COLUMNAS]
+            .sort_values(["anio", "mes", "sucursal"], kind="stable", ignore_index=True))
@@ -10,7 +10,60 @@ DB_USER = os.getenv("DB_USER", "root")
 DB_PASS = os.getenv("DB_PASS", "")
 DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "3306")
-DB_NAME = os.getenv("DB_NAME", "pizzas")
+DB_NAME = os.getenv("DB_NAME", "pizzasnew2")
+# URL SQLAlchemy completa; si se define, reemplaza a DB_* (p. ej. sqlite:///.cache/dev.db
+# o duckdb:///.cache/dev.duckdb para correr y medir sin servidor MySQL)
+DB_URL = os.getenv("DB_URL") or f"mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# Franquicias (data/tenants.py): "norte=pizzas_norte,sur=mysql+pymysql://u:p@host/pizzas_sur".
+# Un valor sin "://" es el nombre de la base en el mismo servidor de DB_*. Vacío = solo DB_URL.
+TENANTS = os.getenv("TENANTS", "")
+DEFAULT_TENANT = os.getenv("DEFAULT_TENANT", "default")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))            # conexiones fijas por franquicia
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))      # extra en picos (tope = size + overflow)
+TENANT_IDLE_SECONDS = int(os.getenv("TENANT_IDLE_SECONDS", "900"))  # cerrar motores sin uso
+MAX_TENANT_ENGINES = int(os.getenv("MAX_TENANT_ENGINES", "16"))     # motores abiertos a la vez (LRU)
 
 PAGE_TITLE = "Ventas Pizzas - Dashboard"
 PAGE_LAYOUT = "wide"
+
+# Conteo de órdenes distintas: "exact" (nunique / COUNT DISTINCT) o "hll" (HyperLogLog)
+DISTINCT_MODE = os.getenv("DISTINCT_MODE", "exact").lower()
+HLL_PRECISION = int(os.getenv("HLL_PRECISION", "12"))
+
+# API HTTP (api/server.py)
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("API_PORT", "8502"))
+API_WORKERS = int(os.getenv("API_WORKERS", "8"))      # hilos para consultas bloqueantes
+API_EMBEDDED = os.getenv("API_EMBEDDED", "0") == "1"  # levantar la API dentro del proceso de Streamlit
+
+# Pre-calentado de cachés (services/warmer.py)
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache"))
+WARMER_ENABLED = os.getenv("WARMER_ENABLED", "1") == "1"
+WARMER_INTERVAL = int(os.getenv("WARMER_INTERVAL", "600"))      # segundos entre pasadas
+WARMER_CONCURRENCY = int(os.getenv("WARMER_CONCURRENCY", "2"))  # consultas simultáneas máximas
+WARMER_TOP_COMBOS = int(os.getenv("WARMER_TOP_COMBOS", "20"))   # combinaciones más usadas a recalentar
+
+# Detección de anomalías diarias (services/anomalies.py)
+ANOMALY_WEEKS = int(os.getenv("ANOMALY_WEEKS", "8"))              # mismos días de la semana en la línea base
+ANOMALY_THRESHOLD = float(os.getenv("ANOMALY_THRESHOLD", "3.5"))  # |z robusto| a partir del cual se marca
+ANOMALY_MIN_REL = float(os.getenv("ANOMALY_MIN_REL", "0.05"))     # dispersión mínima relativa a la mediana
+
+# Comparación por grupos de sucursales (services/groups.py)
+BRANCH_MATURITY_MONTHS = int(os.getenv("BRANCH_MATURITY_MONTHS", "12"))  # meses con ventas para ser "madura"
+
+# Reportes sin Streamlit (services/reports.py, scripts/generate_reports.py)
+REPORTS_DIR = os.getenv("REPORTS_DIR", os.path.join(CACHE_DIR, "reports"))
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", str(min(os.cpu_count() or 1, 8))))
+
+# Presupuesto de memoria de las cachés de datos (data/memory.py), incluidos rollups y dimensiones
+CACHE_BUDGET_MB = float(os.getenv("CACHE_BUDGET_MB", "512"))
+
+# Versiones de datos (data/versioning.py): cada cuántos segundos se vuelven a sondear las tablas
+VERSION_PROBE_TTL = int(os.getenv("VERSION_PROBE_TTL", "30"))
+
+# Límites de consultas (data/admission.py). 0 = sin límite.
+QUERY_TIMEOUT_S = float(os.getenv("QUERY_TIMEOUT_S", "30"))           # consultas normales
+HEAVY_QUERY_TIMEOUT_S = float(os.getenv("HEAVY_QUERY_TIMEOUT_S", "120"))  # escaneos completos
+MAX_HEAVY_QUERIES = int(os.getenv("MAX_HEAVY_QUERIES", "2"))           # pesadas simultáneas por proceso
+ADMISSION_WAIT_S = float(os.getenv("ADMISSION_WAIT_S", "3"))           # espera máxima por un cupo
@@ -1,46 +1,162 @@
 # data/connection.py
-from sqlalchemy import create_engine, text
+import contextlib
+import threading
+import time
+from collections import OrderedDict
+
 import pandas as pd
-import os
+
+from .admission import ADMISSION, WATCHDOG, QueryHandle, QueryTimeout
+from .config import (
+    DB_MAX_OVERFLOW, DB_POOL_SIZE, HEAVY_QUERY_TIMEOUT_S, MAX_TENANT_ENGINES, QUERY_TIMEOUT_S,
+    TENANT_IDLE_SECONDS,
+)
+from .tenants import current_tenant, tenant_url
 
 # ============================================
 # 🔧 CONFIGURACIÓN DE CONEXIÓN
 # ============================================
+# Única fuente: data/config.py (lee .env). El motor se crea en el primer uso,
+# no al importar, para que el arranque no pague SQLAlchemy + pymysql.
+# DB_URL elige el motor: MySQL en producción, SQLite/DuckDB en archivo para local y CI.
+# Con varias franquicias (TENANTS) hay un motor por franquicia, cada uno con su
+# pool acotado; los que pasan TENANT_IDLE_SECONDS sin uso se cierran.
+
+_engines = OrderedDict()  # franquicia -> [motor, último uso (monotonic)], orden LRU
+_engine_lock = threading.Lock()
 
-DB_USER = os.getenv("DB_USER", "root")
-DB_PASS = os.getenv("DB_PASS", "Zaiperaldama1!")   # cámbialo si es distinto
-DB_HOST = os.getenv("DB_HOST", "localhost")
-DB_PORT = os.getenv("DB_PORT", "3306")
-DB_NAME = os.getenv("DB_NAME", "pizzasnew2")
 
 # ============================================
-# 🚀 CREAR MOTOR SQLAlchemy
+# 🚀 CREAR MOTOR SQLAlchemy (perezoso, por franquicia)
 # ============================================
 
-try:
-    engine = create_engine(
-        f"mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}",
-        pool_pre_ping=True,
-    )
-    print("✅ Conexión establecida con la base de datos.")
-except Exception as e:
-    print("❌ Error al conectar con la base de datos:", e)
+def _create_engine(url: str):
+    from sqlalchemy import create_engine
+    from sqlalchemy.engine import make_url
+    kwargs = {"pool_pre_ping": True}
+    if make_url(url).get_backend_name() != "sqlite":
+        kwargs.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_recycle=3600)
+    return create_engine(url, **kwargs)
+
+
+def _evict(ahora: float, activa: str):
+    """Cierra motores inactivos y, si sobran, los menos usados (nunca el de `activa`)."""
+    for nombre, (engine, ultimo) in list(_engines.items()):
+        sobran = len(_engines) > MAX_TENANT_ENGINES
+        if nombre != activa and (ahora - ultimo > TENANT_IDLE_SECONDS or sobran):
+            del _engines[nombre]
+            # Las conexiones prestadas terminan su consulta y se descartan al devolverse
+            engine.dispose()
+
+
+def get_engine(tenant: str | None = None):
+    """Devuelve el motor de la franquicia (la activa si no se indica); lo crea la primera vez."""
+    tenant = tenant or current_tenant()
+    ahora = time.monotonic()
+    with _engine_lock:
+        entry = _engines.get(tenant)
+        if entry is None:
+            entry = _engines[tenant] = [_create_engine(tenant_url(tenant)), ahora]
+        entry[1] = ahora
+        _engines.move_to_end(tenant)
+        _evict(ahora, tenant)
+    return entry[0]
+
+
+def engine_stats() -> list[dict]:
+    """Estado de los motores abiertos (diagnóstico)."""
+    ahora = time.monotonic()
+    with _engine_lock:
+        return [{"franquicia": nombre, "inactivo_s": round(ahora - ultimo, 1),
+                 "pool": engine.pool.status()}
+                for nombre, (engine, ultimo) in _engines.items()]
+
 
 # ============================================
 # 🧩 FUNCIONES COMPATIBLES
 # ============================================
 
-def get_engine():
-    """Devuelve el motor global de conexión."""
-    return engine
+# ============================================
+# ⏱️ LÍMITE DE TIEMPO Y CANCELACIÓN EN EL MOTOR
+# ============================================
+# El límite lo aplica la base, no solo el cliente: MySQL corta la sentencia con
+# MAX_EXECUTION_TIME y una cancelación (filtros cambiados a media consulta) envía
+# KILL QUERY; SQLite aborta desde su progress handler y DuckDB con interrupt().
+
+MYSQL_ER_QUERY_TIMEOUT = 3024  # "maximum statement execution time exceeded"
 
 
-def read_sql_df(query: str, params=None):
+def _kill_query(engine, thread_id: int):
+    with engine.connect() as con:
+        con.exec_driver_sql(f"KILL QUERY {int(thread_id)}")
+
+
+@contextlib.contextmanager
+def _guarded(con, timeout: float | None):
+    handle = QueryHandle(timeout)
+    dialecto = con.dialect.name
+    raw = con.connection.driver_connection
+    if dialecto == "mysql":
+        ms = int(timeout * 1000) if timeout else 0
+        if con.info.get("max_execution_time") != ms:  # variable de sesión: sobrevive en el pool
+            con.exec_driver_sql(f"SET SESSION MAX_EXECUTION_TIME = {ms}")
+            con.info["max_execution_time"] = ms
+        handle.on_cancel(lambda engine=con.engine, tid=raw.thread_id(): _kill_query(engine, tid))
+    elif dialecto == "sqlite":
+        raw.set_progress_handler(lambda: handle.poll(time.monotonic()) is not None, 20_000)
+    elif hasattr(raw, "interrupt"):
+        handle.on_cancel(raw.interrupt)
+    WATCHDOG.watch(handle)
+    try:
+        yield handle
+    except Exception as e:
+        if handle.reason is not None:
+            raise handle.error() from e
+        if getattr(getattr(e, "orig", None), "args", (None,))[0] == MYSQL_ER_QUERY_TIMEOUT:
+            raise QueryTimeout(f"La consulta superó su límite de {timeout:g} s") from e
+        raise
+    finally:
+        WATCHDOG.unwatch(handle)
+        if dialecto == "sqlite":
+            raw.set_progress_handler(None, 0)
+
+
+def _budget(timeout: float | None, heavy: bool) -> float | None:
+    if timeout is None:
+        timeout = HEAVY_QUERY_TIMEOUT_S if heavy else QUERY_TIMEOUT_S
+    return timeout or None
+
+
+def read_sql_df(query: str, params=None, timeout: float | None = None, heavy: bool = False):
     """
     Ejecuta una consulta SQL y devuelve el resultado como DataFrame.
-    query: puede ser string o sqlalchemy.text
+    query: string, sqlalchemy.text o expresión Core (select(...))
     params: diccionario opcional con parámetros de la consulta
+    timeout: segundos (None = QUERY_TIMEOUT_S o HEAVY_QUERY_TIMEOUT_S; 0 = sin límite)
+    heavy: escaneo grande; pasa por el control de admisión (puede lanzar Overloaded)
     """
-    with engine.connect() as con:
-        df = pd.read_sql(text(query), con, params=params)
+    from sqlalchemy import text
+    with ADMISSION.admit() if heavy else contextlib.nullcontext():
+        with get_engine().connect() as con, _guarded(con, _budget(timeout, heavy)):
+            df = pd.read_sql(text(query) if isinstance(query, str) else query, con, params=params)
     return df
+
+
+def iter_sql_chunks(query: str, params=None, chunksize: int = 50_000, timeout: float = 0, heavy: bool = False):
+    """
+    Ejecuta la consulta con cursor del lado del servidor (stream_results) y
+    entrega DataFrames de hasta `chunksize` filas, sin cargar todo en memoria.
+    Por defecto sin límite de tiempo (una exportación grande es legítimamente lenta),
+    pero se cancela si la sesión que la pidió cambia de filtros.
+    """
+    from sqlalchemy import text
+    with ADMISSION.admit() if heavy else contextlib.nullcontext():
+        with get_engine().connect().execution_options(stream_results=True, max_row_buffer=chunksize) as con, \
+                _guarded(con, timeout or None):
+            yield from pd.read_sql(text(query) if isinstance(query, str) else query, con,
+                                   params=params, chunksize=chunksize)
+
+
+def dialect_name() -> str:
+    """Dialecto del motor activo ("mysql", "sqlite", "duckdb"...)."""
+    return get_engine().dialect.name
@@ -0,0 +1,99 @@
+# data/dimensions.py
+import numpy as np
+import pandas as pd
+
+from .cache import tenant_resource
+from .queries import get_sucursales, get_pizzas, get_pizzas_info
+from .versioning import get_versions
+
+DIM_TABLES = ("sucursales", "pizzas", "pizzas_info")
+
+
+# ============================================
+# 📚 DIMENSIÓN INDEXADA POR HASH
+# ============================================
+class Dimension:
+    """
+    Tabla de dimensión en memoria.
+    Cada fila tiene un código entero (su posición); `index` es un índice hash
+    id -> código, y `columns` guarda cada columna como arreglo alineado al código.
+    """
+
+    def __init__(self, df: pd.DataFrame, key: str):
+        df = df.reset_index(drop=True)
+        self.key = key
+        self.frame = df
+        self.ids = df[key].to_numpy()
+        self.index = pd.Index(self.ids)
+        self.columns = {c: df[c].to_numpy() for c in df.columns}
+        self._maps = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def codes(self, ids) -> np.ndarray:
+        """Convierte ids a códigos enteros (-1 si el id no existe)."""
+        return self.index.get_indexer(np.asarray(ids))
+
+    def lookup(self, ids, column: str) -> np.ndarray:
+        """Resuelve `column` para un arreglo de ids. Ids desconocidos -> None."""
+        codes = self.codes(ids)
+        if not len(self):
+            return np.full(len(codes), None, dtype=object)
+        out = self.columns[column].take(np.clip(codes, 0, None)).astype(object)
+        out[codes < 0] = None
+        return out
+
+    def mapping(self, column: str) -> dict:
+        """Diccionario id -> valor de `column` (se construye una sola vez)."""
+        if column not in self._maps:
+            self._maps[column] = dict(zip(self.ids, self.columns[column]))
+        return self._maps[column]
+
+    def reverse_mapping(self, column: str) -> dict:
+        """Diccionario valor de `column` -> id."""
+        key = ("reverse", column)
+        if key not in self._maps:
+            self._maps[key] = dict(zip(self.columns[column], self.ids))
+        return self._maps[key]
+
+
+class DimensionRegistry:
+    """Agrupa las dimensiones del modelo junto con la versión con la que se cargaron."""
+
+    def __init__(self, sucursales: pd.DataFrame, pizzas: pd.DataFrame,
+                 pizzas_info: pd.DataFrame, version: tuple):
+        sucursales = sucursales.sort_values(["ciudad", "nombre"]).copy()
+        sucursales["label"] = sucursales["ciudad"] + " - " + sucursales["nombre"]
+        self.sucursales = Dimension(sucursales, "id_sucursal")
+
+        self.pizzas_info = Dimension(pizzas_info, "pizza_type_id")
+
+        # Nombre legible de cada pizza resuelto una sola vez contra pizzas_info
+        pizzas = pizzas.copy()
+        pizzas["nombre"] = self.pizzas_info.lookup(pizzas["pizza_type_id"], "name")
+        self.pizzas = Dimension(pizzas, "pizza_id")
+
+        self.version = version
+
+    def branch_labels(self, ids, column: str = "nombre") -> np.ndarray:
+        return self.sucursales.lookup(ids, column)
+
+    def pizza_names(self, pizza_ids) -> np.ndarray:
+        return self.pizzas.lookup(pizza_ids, "nombre")
+
+
+# ============================================
+# 🧮 CARGA ÚNICA POR VERSIÓN
+# ============================================
+@tenant_resource
+def _build_registry(version: tuple) -> DimensionRegistry:
+    return DimensionRegistry(get_sucursales(), get_pizzas(), get_pizzas_info(), version)
+
+
+def get_dimensions() -> DimensionRegistry:
+    """
+    Devuelve el registro de dimensiones compartido entre sesiones.
+    Solo se recarga cuando cambia la versión de alguna tabla de dimensión.
+    """
+    return _build_registry(get_versions(*DIM_TABLES))
@@ -0,0 +1,133 @@
+# data/factstore.py
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from .cache import tenant_resource
+from .config import CACHE_DIR
+from .tenants import current_tenant
+from .versioning import get_versions
+
+STORE_DIR = os.path.join(CACHE_DIR, "factstore")
+META_FILE = "meta.json"
+# Versiones que se conservan en disco: la vigente y la anterior, que otro proceso
+# (p. ej. un worker de services/parallel.py) puede estar abriendo todavía
+KEEP_VERSIONS = 2
+
+
+# ============================================
+# 🗄️ ALMACÉN COLUMNAR EN DISCO (memory-mapped)
+# ============================================
+# Cada columna de ventas_totales se guarda como .npy; las de texto van
+# codificadas por diccionario (códigos int32 + categorías). Todos los procesos y
+# sesiones abren los mismos archivos con mmap_mode="r": el sistema operativo
+# comparte las páginas y nadie paga una copia ni un unpickle por sesión.
+
+class FactStore:
+    """Vista de solo lectura sobre una versión materializada de ventas_totales."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as fh:
+            self.meta = json.load(fh)
+        self.columns = {}
+        for name, info in self.meta["columns"].items():
+            data = np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            if info["kind"] == "categorical":
+                categories = np.load(os.path.join(path, f"{name}.categories.npy"), allow_pickle=False)
+                data = pd.Categorical.from_codes(data, categories=categories)
+            self.columns[name] = data
+
+    def __len__(self):
+        return int(self.meta["rows"])
+
+    @property
+    def version(self) -> str:
+        return self.meta["version"]
+
+    def frame(self, columns=None) -> pd.DataFrame:
+        """DataFrame sobre los arreglos mapeados (sin copiar los datos numéricos)."""
+        names = columns or list(self.columns)
+        return pd.DataFrame({c: self.columns[c] for c in names}, copy=False)
+
+
+def _version_key(version: tuple) -> str:
+    return hashlib.sha1(repr(version).encode()).hexdigest()[:16]
+
+
+def write_store(df: pd.DataFrame, path: str, version: tuple) -> str:
+    """
+    Materializa `df` en `path`. Se escribe en un directorio temporal y se publica
+    con un rename atómico; si otro proceso ganó la carrera, se usa el suyo.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".tmp-", dir=os.path.dirname(path))
+    meta = {"version": repr(version), "rows": len(df), "columns": {}}
+    try:
+        for name in df.columns:
+            col = df[name]
+            if pd.api.types.is_numeric_dtype(col) or pd.api.types.is_datetime64_any_dtype(col):
+                np.save(os.path.join(tmp, f"{name}.npy"), col.to_numpy())
+                meta["columns"][name] = {"kind": "array", "dtype": str(col.dtype)}
+            else:
+                codes, categories = pd.factorize(col.astype("string"), sort=True)
+                np.save(os.path.join(tmp, f"{name}.npy"), codes.astype(np.int32))
+                np.save(os.path.join(tmp, f"{name}.categories.npy"), np.asarray(categories, dtype=str))
+                meta["columns"][name] = {"kind": "categorical"}
+        with open(os.path.join(tmp, META_FILE), "w", encoding="utf-8") as fh:
+            json.dump(meta, fh)
+        os.rename(tmp, path)
+    except OSError:
+        if not os.path.exists(os.path.join(path, META_FILE)):
+            raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return path
+
+
+def _prune_old(base: str, keep: str, n: int = KEEP_VERSIONS):
+    """
+    Borra versiones viejas del almacén salvo `keep` y las más recientes hasta sumar `n`.
+    Un mmap ya abierto sigue siendo válido en POSIX, pero un proceso que apenas va a
+    abrir la versión anterior la necesita en disco.
+    """
+    if not os.path.isdir(base):
+        return
+    otras = [e for e in os.listdir(base)
+             if e != keep and not e.startswith(".tmp-") and os.path.isdir(os.path.join(base, e))]
+    otras.sort(key=lambda e: os.path.getmtime(os.path.join(base, e)), reverse=True)
+    for entry in otras[max(n - 1, 0):]:
+        shutil.rmtree(os.path.join(base, entry), ignore_errors=True)
+
+
+def _prepare(df: pd.DataFrame) -> pd.DataFrame:
+    """Columnas derivadas que usan las vistas, calculadas una sola vez al materializar."""
+    df = df.copy()
+    df["fecha_compra"] = pd.to_datetime(df["fecha_compra"])
+    df["anio"] = df["fecha_compra"].dt.year.astype(np.int16)
+    df["mes"] = df["fecha_compra"].dt.month_name()
+    return df
+
+
+@tenant_resource
+def _open_store(version: tuple) -> FactStore:
+    from .queries import fetch_ventas
+
+    # Un subdirectorio por franquicia: la limpieza de versiones viejas no toca las de otras
+    base = os.path.join(STORE_DIR, current_tenant())
+    key = _version_key(version)
+    path = os.path.join(base, key)
+    if not os.path.exists(os.path.join(path, META_FILE)):
+        write_store(_prepare(fetch_ventas()), path, version)
+        _prune_old(base, keep=key)
+    return FactStore(path)
+
+
+def get_fact_store() -> FactStore:
+    """Almacén de la versión vigente de ventas_totales (uno por proceso, mismos archivos para todos)."""
+    return _open_store(get_versions("ventas_totales"))
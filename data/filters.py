@@ -0,0 +1,96 @@
+# data/filters.py
+import pandas as pd
+
+# ============================================
+# 🧭 FILTROS CANÓNICOS PARA LLAVES DE CACHÉ
+# ============================================
+# La misma consulta llega escrita de muchas formas: sucursales en el orden en que
+# se eligieron (lista, tupla, numpy.int64), fechas como str, date o Timestamp.
+# versioned_cache (data/cache.py) normaliza cada argumento según su nombre antes
+# de armar la llave, así todas esas variantes caen en la misma entrada.
+
+# nombre de parámetro -> rol del filtro
+ROLES = {
+    "fi": "fecha_inicio", "fecha_inicio": "fecha_inicio",
+    "ff": "fecha_fin", "fecha_fin": "fecha_fin",
+    "sucs_sel": "sucursales", "sucursales": "sucursales", "ids": "sucursales",
+}
+
+
+def fecha_canonica(valor):
+    """Fecha → 'YYYY-MM-DD' (con hora distinta de 00:00, ISO completo). None y '' quedan en None."""
+    if valor is None or (isinstance(valor, str) and not valor.strip()):
+        return None
+    ts = pd.Timestamp(valor)
+    return ts.strftime("%Y-%m-%d") if ts == ts.normalize() else ts.isoformat()
+
+
+def sucursales_canonicas(valor) -> tuple:
+    """Conjunto de ids como tupla ordenada, sin repetidos, de int de Python."""
+    if valor is None:
+        return ()
+    return tuple(sorted({int(s) for s in valor}))
+
+
+_NORMALIZAR = {
+    "fecha_inicio": fecha_canonica,
+    "fecha_fin": fecha_canonica,
+    "sucursales": sucursales_canonicas,
+}
+
+
+def canonizar(argumentos: dict) -> dict:
+    """Argumentos ya ligados a la firma (nombre -> valor) con los filtros normalizados."""
+    return {k: _NORMALIZAR[ROLES[k]](v) if k in ROLES else v for k, v in argumentos.items()}
+
+
+def _es_dia(fecha) -> bool:
+    return fecha is None or len(fecha) == 10
+
+
+# ============================================
+# ✂️ SUBCONJUNTOS DESDE UN RESULTADO CACHEADO
+# ============================================
+class Subconjunto:
+    """
+    Para resultados con una fila por sucursal (y por día, si `fecha` nombra esa
+    columna): una consulta cuyas sucursales caben en las de una entrada ya cacheada
+    (y, con `fecha`, cuya ventana de días cae dentro de la suya) se responde
+    filtrando esa entrada en memoria. Sin `fecha`, las fechas deben coincidir:
+    un agregado mensual no se puede recortar a media ventana.
+    """
+
+    def __init__(self, sucursal: str = "sucursal", fecha: str | None = None):
+        self.sucursal = sucursal
+        self.fecha = fecha
+
+    def cubre(self, guardado: dict, pedido: dict) -> bool:
+        if guardado.keys() != pedido.keys():
+            return False
+        for k, v in pedido.items():
+            rol, g = ROLES.get(k), guardado[k]
+            if rol == "sucursales":
+                # Vacío significa "todas" en algunas consultas y "ninguna" en otras
+                if not v or not g or not set(v) <= set(g):
+                    return False
+            elif rol in ("fecha_inicio", "fecha_fin") and self.fecha:
+                if not (_es_dia(v) and _es_dia(g)):
+                    return False
+                if g is not None and (v is None or (v < g if rol == "fecha_inicio" else v > g)):
+                    return False
+            elif v != g:
+                return False
+        return True
+
+    def filtrar(self, valor: pd.DataFrame, pedido: dict) -> pd.DataFrame:
+        if valor.empty:
+            return valor
+        mask = valor[self.sucursal].isin(next(v for k, v in pedido.items() if ROLES.get(k) == "sucursales"))
+        if self.fecha:
+            dias = pd.to_datetime(valor[self.fecha])
+            for k, v in pedido.items():
+                if v is not None and ROLES.get(k) == "fecha_inicio":
+                    mask &= dias >= pd.Timestamp(v)
+                elif v is not None and ROLES.get(k) == "fecha_fin":
+                    mask &= dias <= pd.Timestamp(v)
+        return valor[mask.to_numpy()].reset_index(drop=True)
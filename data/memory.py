@@ -0,0 +1,287 @@
+# data/memory.py
+import heapq
+import itertools
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+
+from .config import CACHE_BUDGET_MB
+
+
+# ============================================
+# 📏 TAMAÑO EN MEMORIA
+# ============================================
+def nbytes(obj, _vistos=None) -> int:
+    """
+    Bytes aproximados que retiene `obj` (recorre contenedores y atributos).
+    Los arreglos mapeados desde disco cuentan 0: son páginas del sistema operativo,
+    compartidas entre procesos y liberables sin desalojar nada.
+    """
+    vistos = set() if _vistos is None else _vistos
+    if id(obj) in vistos:
+        return 0
+    vistos.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        mapeado = isinstance(obj, np.memmap) or isinstance(obj.base, np.memmap)
+        return 0 if mapeado else int(obj.nbytes)
+    if isinstance(obj, pd.Categorical):
+        return nbytes(obj.codes, vistos) + nbytes(obj.categories, vistos)
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(nbytes(k, vistos) + nbytes(v, vistos) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(nbytes(v, vistos) for v in obj)
+    if hasattr(obj, "__dict__"):
+        return sys.getsizeof(obj) + nbytes(vars(obj), vistos)
+    return sys.getsizeof(obj)
+
+
+def _entregar(valor):
+    """
+    Copia superficial de lo que sale de la caché: con copy-on-write de pandas, quien
+    agrega o reemplaza columnas del resultado no altera la entrada guardada.
+    """
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return valor.copy(deep=False)
+    if isinstance(valor, np.ndarray):
+        return valor.copy()
+    if isinstance(valor, (list, tuple)):
+        return type(valor)(_entregar(v) for v in valor)
+    if isinstance(valor, dict):
+        return {k: _entregar(v) for k, v in valor.items()}
+    return valor
+
+
+# ============================================
+# 🧠 GOBERNADOR DE MEMORIA DE CACHÉS
+# ============================================
+class _Entrada:
+    __slots__ = ("cache", "valor", "bytes", "costo", "usos", "prioridad")
+
+    def __init__(self, cache, valor, size, costo, prioridad):
+        self.cache = cache
+        self.valor = valor
+        self.bytes = size
+        self.costo = costo
+        self.usos = 1
+        self.prioridad = prioridad
+
+
+class CacheGovernor:
+    """
+    Presupuesto global de bytes para todas las cachés de datos del proceso.
+
+    Desalojo GreedyDual-Size-Frequency: prioridad = L + usos × costo / bytes, donde
+    costo son los segundos que tomó calcular la entrada y L sube hasta la prioridad
+    de cada desalojada. Sale primero lo barato de recalcular, grande y poco usado;
+    el envejecimiento vía L hace que lo que no se vuelve a pedir termine saliendo
+    (LRU ponderado por costo).
+
+    Los recursos fijos (rollups, dimensiones, modelos: ver data/cache.tenant_resource)
+    no se desalojan, pero sus bytes se descuentan del presupuesto.
+
+    Las candidatas a desalojo viven en un heap por prioridad con invalidación
+    perezosa: cada cambio de prioridad empuja un registro nuevo y los viejos se
+    descartan al salir (la entrada ya no existe o su prioridad ya no coincide).
+    """
+
+    def __init__(self, presupuesto: int):
+        self.presupuesto = presupuesto
+        self._entradas = {}               # llave -> _Entrada
+        self._heap = []                   # (prioridad, secuencia, llave)
+        self._seq = itertools.count()
+        self._fijos = {}                  # (nombre, franquicia) -> bytes
+        self._L = 0.0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._calculando = {}             # llave -> Lock (una sola ejecución por llave)
+        self.stats = defaultdict(Counter)
+
+    # ---------- consulta ----------
+    def _prioridad(self, e: _Entrada) -> float:
+        return self._L + e.usos * e.costo / max(e.bytes, 1)
+
+    def _encolar(self, llave, e: _Entrada):
+        """Con el lock tomado: registra la prioridad vigente de `e` en el heap."""
+        heapq.heappush(self._heap, (e.prioridad, next(self._seq), llave))
+        # Demasiados registros obsoletos: se reconstruye con los vigentes
+        if len(self._heap) > 2 * len(self._entradas) + 64:
+            self._heap = [(x.prioridad, next(self._seq), k) for k, x in self._entradas.items()]
+            heapq.heapify(self._heap)
+
+    def get(self, cache: str, llave):
+        """(True, valor) si la llave está en caché; (False, None) si no."""
+        with self._lock:
+            e = self._entradas.get(llave)
+            if e is None:
+                self.stats[cache]["fallos"] += 1
+                return False, None
+            e.usos += 1
+            e.prioridad = self._prioridad(e)
+            self._encolar(llave, e)
+            self.stats[cache]["aciertos"] += 1
+            return True, _entregar(e.valor)
+
+    def peek(self, llave):
+        """Como get pero sin contar estadísticas ni tocar la prioridad (respaldo de datos viejos)."""
+        with self._lock:
+            e = self._entradas.get(llave)
+        return (False, None) if e is None else (True, _entregar(e.valor))
+
+    def note(self, cache: str, evento: str):
+        with self._lock:
+            self.stats[cache][evento] += 1
+
+    def get_or_compute(self, cache: str, llave, fn):
+        hit, valor = self.get(cache, llave)
+        if hit:
+            return valor
+        with self._lock:
+            calc = self._calculando.setdefault(llave, threading.Lock())
+        with calc:
+            # Otro hilo pudo calcularla mientras se esperaba
+            hit, valor = self.peek(llave)
+            if hit:
+                return valor
+            try:
+                t0 = time.perf_counter()
+                valor = fn()
+                self.put(cache, llave, valor, time.perf_counter() - t0)
+            finally:
+                with self._lock:
+                    self._calculando.pop(llave, None)
+        return _entregar(valor)
+
+    # ---------- altas y desalojo ----------
+    def put(self, cache: str, llave, valor, costo: float):
+        size = nbytes(valor)
+        with self._lock:
+            st = self.stats[cache]
+            st["calculos"] += 1
+            st["ms_calculo"] += int(costo * 1000)
+            if size > self._disponible():
+                st["rechazadas"] += 1  # no cabe ni vaciando todo: se entrega sin guardar
+                return
+            vieja = self._entradas.pop(llave, None)
+            if vieja is not None:
+                self._bytes -= vieja.bytes
+            e = _Entrada(cache, valor, size, costo, 0.0)
+            e.prioridad = self._prioridad(e)
+            self._entradas[llave] = e
+            self._bytes += size
+            self._encolar(llave, e)
+            self._ajustar()
+
+    def put_many(self, cache: str, valores: dict, costo: float):
+        """
+        Guarda varias entradas calculadas juntas (una consulta, varias celdas): cuenta
+        un solo cálculo con su costo total y reparte ese costo entre las entradas.
+        """
+        if not valores:
+            return
+        por_entrada = costo / len(valores)
+        with self._lock:
+            st = self.stats[cache]
+            st["calculos"] += 1
+            st["ms_calculo"] += int(costo * 1000)
+            for llave, valor in valores.items():
+                size = nbytes(valor)
+                if size > self._disponible():
+                    st["rechazadas"] += 1
+                    continue
+                vieja = self._entradas.pop(llave, None)
+                if vieja is not None:
+                    self._bytes -= vieja.bytes
+                e = _Entrada(cache, valor, size, por_entrada, 0.0)
+                e.prioridad = self._prioridad(e)
+                self._entradas[llave] = e
+                self._bytes += size
+                self._encolar(llave, e)
+            self._ajustar()
+
+    def _disponible(self) -> int:
+        return self.presupuesto - sum(self._fijos.values())
+
+    def _ajustar(self):
+        """Desaloja (con el lock tomado) hasta quedar dentro del presupuesto."""
+        limite = self._disponible()
+        while self._bytes > limite and self._heap:
+            prioridad, _, llave = heapq.heappop(self._heap)
+            e = self._entradas.get(llave)
+            if e is None or e.prioridad != prioridad:
+                continue  # registro obsoleto
+            del self._entradas[llave]
+            self._bytes -= e.bytes
+            self._L = e.prioridad
+            self.stats[e.cache]["desalojos"] += 1
+
+    def pin(self, nombre: str, tenant: str, valor):
+        """Registra (o libera, con valor None) un recurso fijo y ajusta el espacio de las cachés."""
+        size = 0 if valor is None else nbytes(valor)
+        with self._lock:
+            if size:
+                self._fijos[(nombre, tenant)] = size
+            else:
+                self._fijos.pop((nombre, tenant), None)
+            self._ajustar()
+
+    def clear(self, cache: str | None = None):
+        with self._lock:
+            for llave in [k for k, e in self._entradas.items() if cache is None or e.cache == cache]:
+                self._bytes -= self._entradas.pop(llave).bytes
+            if not self._entradas:
+                self._heap = []
+
+    # ---------- diagnóstico ----------
+    def report(self) -> pd.DataFrame:
+        """
+        Por caché: entradas, MB, aciertos, fallos, tasa de acierto, fallos resueltos
+        filtrando un superconjunto cacheado (derivadas), desalojos, rechazadas, ms de cálculo.
+        """
+        with self._lock:
+            por_cache = defaultdict(lambda: [0, 0])
+            for e in self._entradas.values():
+                por_cache[e.cache][0] += 1
+                por_cache[e.cache][1] += e.bytes
+            filas = []
+            for cache in sorted(set(self.stats) | set(por_cache)):
+                st = self.stats[cache]
+                consultas = st["aciertos"] + st["fallos"]
+                filas.append({
+                    "cache": cache,
+                    "entradas": por_cache[cache][0],
+                    "mb": round(por_cache[cache][1] / 2**20, 3),
+                    "aciertos": st["aciertos"],
+                    "fallos": st["fallos"],
+                    "tasa_acierto": round(st["aciertos"] / consultas, 3) if consultas else None,
+                    "derivadas": st["derivadas"],
+                    "desalojos": st["desalojos"],
+                    "rechazadas": st["rechazadas"],
+                    "ms_calculo": st["ms_calculo"],
+                })
+            fijos = [{"cache": f"{nombre} [{tenant}] (fijo)", "entradas": 1, "mb": round(b / 2**20, 3)}
+                     for (nombre, tenant), b in sorted(self._fijos.items())]
+        enteros = ["aciertos", "fallos", "derivadas", "desalojos", "rechazadas", "ms_calculo"]
+        return pd.DataFrame(filas + fijos, columns=["cache", "entradas", "mb", "tasa_acierto", *enteros]) \
+            .astype({c: "Int64" for c in enteros})
+
+    def usage(self) -> dict:
+        with self._lock:
+            fijos = sum(self._fijos.values())
+            return {"presupuesto_mb": round(self.presupuesto / 2**20, 1),
+                    "cache_mb": round(self._bytes / 2**20, 2),
+                    "fijos_mb": round(fijos / 2**20, 2),
+                    "entradas": len(self._entradas)}
+
+
+GOVERNOR = CacheGovernor(int(CACHE_BUDGET_MB * 2**20))
@@ -0,0 +1,176 @@
+# data/pagination.py
+import numpy as np
+import pandas as pd
+
+from .cache import versioned_cache
+from .connection import read_sql_df
+
+DEFAULT_PAGE_SIZE = 50
+
+
+# ============================================
+# 📄 PAGINACIÓN POR LLAVE (KEYSET / SEEK)
+# ============================================
+# En lugar de OFFSET (que obliga a la base a recorrer y descartar todas las filas
+# previas), cada página continúa desde la última fila vista:
+#   WHERE (orden, llave...) > (:ultimo_orden, :ultima_llave...) ORDER BY ... LIMIT n+1
+# La fila extra solo indica si hay página siguiente. El costo por página es
+# constante sin importar qué tan lejos se navegue.
+
+def _scalar(v):
+    """Valor de pandas/NumPy → parámetro SQL nativo."""
+    if isinstance(v, pd.Timestamp):
+        return v.to_pydatetime()
+    return v.item() if isinstance(v, np.generic) else v
+
+
+def seek_clause(exprs: list, cursor: tuple, desc: bool = False):
+    """
+    Condición "después de `cursor`" para el orden lexicográfico de `exprs`,
+    expandida en ORs para que MySQL pueda usar el índice del primer término.
+    """
+    op = "<" if desc else ">"
+    terminos = []
+    for i, expr in enumerate(exprs):
+        iguales = [f"{exprs[j]} = :k{j}" for j in range(i)]
+        terminos.append("(" + " AND ".join(iguales + [f"{expr} {op} :k{i}"]) + ")")
+    return "(" + " OR ".join(terminos) + ")", {f"k{i}": _scalar(v) for i, v in enumerate(cursor)}
+
+
+class SqlKeysetSource:
+    """
+    Tabla paginable en SQL. `columnas` mapea alias visibles a expresiones SQL (lista
+    blanca: el orden y los filtros solo aceptan estos alias). `llave` son los alias
+    que, junto con la columna de orden, identifican una fila de forma única.
+    """
+
+    def __init__(self, tabla: str, columnas: dict, llave: tuple, orden_default: str,
+                 busqueda: str | None = None, fecha: str | None = None, sucursal: str | None = None):
+        self.tabla = tabla
+        self.columnas = columnas
+        self.llave = llave
+        self.orden_default = orden_default
+        self.busqueda, self.fecha, self.sucursal = busqueda, fecha, sucursal
+
+    def _where(self, texto=None, fecha_inicio=None, fecha_fin=None, sucursales=()):
+        condiciones, params = [], {}
+        if texto and self.busqueda:
+            condiciones.append(f"{self.columnas[self.busqueda]} LIKE :texto")
+            params["texto"] = f"%{texto}%"
+        if self.fecha and fecha_inicio:
+            condiciones.append(f"{self.columnas[self.fecha]} >= :fi")
+            params["fi"] = fecha_inicio
+        if self.fecha and fecha_fin:
+            condiciones.append(f"{self.columnas[self.fecha]} <= :ff")
+            params["ff"] = f"{fecha_fin} 23:59:59"
+        if self.sucursal and sucursales:
+            placeholders = ", ".join(f":s{i}" for i in range(len(sucursales)))
+            condiciones.append(f"{self.columnas[self.sucursal]} IN ({placeholders})")
+            params.update({f"s{i}": s for i, s in enumerate(sucursales)})
+        return condiciones, params
+
+    def _orden(self, orden: str) -> list:
+        if orden not in self.columnas:
+            raise ValueError(f"Columna de orden no permitida: {orden}")
+        return [orden] + [k for k in self.llave if k != orden]
+
+    def page(self, orden: str, desc: bool = False, cursor: tuple | None = None,
+             limite: int = DEFAULT_PAGE_SIZE, **filtros) -> pd.DataFrame:
+        """Hasta `limite` + 1 filas después de `cursor` (la fila extra indica que hay más)."""
+        aliases = self._orden(orden)
+        condiciones, params = self._where(**filtros)
+        if cursor is not None:
+            seek, seek_params = seek_clause([self.columnas[a] for a in aliases], cursor, desc)
+            condiciones.append(seek)
+            params.update(seek_params)
+        direccion = " DESC" if desc else ""
+        sql = (
+            "SELECT " + ", ".join(f"{expr} AS {alias}" for alias, expr in self.columnas.items())
+            + f" FROM {self.tabla}"
+            + (" WHERE " + " AND ".join(condiciones) if condiciones else "")
+            + " ORDER BY " + ", ".join(self.columnas[a] + direccion for a in aliases)
+            + " LIMIT :limite"
+        )
+        params["limite"] = int(limite) + 1
+        return read_sql_df(sql, params=params)
+
+    def count(self, **filtros) -> int:
+        condiciones, params = self._where(**filtros)
+        sql = f"SELECT COUNT(*) AS filas FROM {self.tabla}" + (
+            " WHERE " + " AND ".join(condiciones) if condiciones else "")
+        return int(read_sql_df(sql, params=params).iloc[0, 0])
+
+    def cursor_of(self, fila: pd.Series, orden: str) -> tuple:
+        return tuple(fila[a] for a in self._orden(orden))
+
+
+# Fuentes SQL registradas (las funciones cacheadas reciben el nombre, no el objeto)
+FUENTES = {
+    "ventas": SqlKeysetSource(
+        tabla="ventas_totales",
+        columnas={
+            "fecha_compra": "fecha_compra",
+            "sucursal": "sucursal",
+            "order_id": "order_id",
+            "pizza_id": "pizza_id",
+            "quantity": "quantity",
+            "net": "net",
+            "id_linea": "id_linea",
+        },
+        # (sucursal, order_id, pizza_id) se repite cuando una orden lleva dos
+        # renglones de la misma pizza: el seek saltaría filas entre páginas
+        llave=("id_linea",),
+        orden_default="fecha_compra",
+        busqueda="pizza_id",
+        fecha="fecha_compra",
+        sucursal="sucursal",
+    ),
+}
+
+
+@versioned_cache("ventas_totales")
+def cached_page(fuente: str, orden: str, desc: bool, cursor: tuple | None, limite: int,
+                texto: str = "", fecha_inicio=None, fecha_fin=None, sucursales: tuple = ()):
+    return FUENTES[fuente].page(orden, desc, cursor, limite, texto=texto,
+                                fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, sucursales=sucursales)
+
+
+@versioned_cache("ventas_totales")
+def cached_count(fuente: str, texto: str = "", fecha_inicio=None, fecha_fin=None, sucursales: tuple = ()):
+    return FUENTES[fuente].count(texto=texto, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin,
+                                 sucursales=sucursales)
+
+
+# ============================================
+# 🧮 PAGINACIÓN DE FRAMES YA CALCULADOS
+# ============================================
+class FramePager:
+    """
+    Misma interfaz que una fuente SQL para agregados en memoria (participación,
+    Pareto...): ordena y filtra en el servidor y solo entrega la página visible.
+    El cursor es la posición de inicio en el orden actual.
+    """
+
+    def __init__(self, df: pd.DataFrame, busqueda: str | None = None):
+        self.df = df
+        self.busqueda = busqueda
+        self._vista = None  # (orden, desc, texto) -> frame ordenado y filtrado
+
+    def _filtrado(self, texto: str = "") -> pd.DataFrame:
+        if texto and self.busqueda:
+            return self.df[self.df[self.busqueda].astype(str).str.contains(texto, case=False, regex=False)]
+        return self.df
+
+    def _ordenado(self, orden: str, desc: bool, texto: str = "") -> pd.DataFrame:
+        llave = (orden, desc, texto)
+        if self._vista is None or self._vista[0] != llave:
+            self._vista = (llave, self._filtrado(texto).sort_values(orden, ascending=not desc, kind="stable"))
+        return self._vista[1]
+
+    def page(self, orden: str, desc: bool = False, cursor: int | None = None,
+             limite: int = DEFAULT_PAGE_SIZE, texto: str = "") -> pd.DataFrame:
+        inicio = cursor or 0
+        return self._ordenado(orden, desc, texto).iloc[inicio:inicio + limite + 1]
+
+    def count(self, texto: str = "") -> int:
+        return len(self._filtrado(texto))
@@ -2,86 +2,112 @@
 # data/queries.py
 
 import pandas as pd
-from data.connection import get_engine  # si ya tienes esta función definida
-from sqlalchemy import text
-from .connection import read_sql_df
-import streamlit as st
-from sqlalchemy import text, bindparam
-from .connection import engine
+from sqlalchemy import and_, distinct, func, select, true
+
+from .cache import versioned_cache
+from .filters import Subconjunto
+from .connection import dialect_name, read_sql_df, iter_sql_chunks
+from .schema import anio, conteo_distinto, dia, hora, mes, pizzas, pizzas_info, sucursales as t_sucursales, ventas_totales
+
+# Todas las consultas se arman con SQLAlchemy Core (data/schema.py): compilan
+# para MySQL en producción y para SQLite/DuckDB en local (DB_URL en data/config.py).
+v = ventas_totales.c
+# Columnas de datos de una venta (id_linea solo sirve de llave para paginar)
+_HECHOS = [c for c in ventas_totales.c if c is not v.id_linea]
+
+
+def _ts(valor, fin_de_dia: bool = False):
+    """Fecha 'YYYY-MM-DD' (o datetime) → datetime para comparar contra fecha_compra."""
+    ts = pd.Timestamp(valor)
+    if fin_de_dia:
+        ts = ts.normalize() + pd.Timedelta(hours=23, minutes=59, seconds=59)
+    return ts.to_pydatetime()
+
+
+def _ids(sucursales) -> list:
+    """Ids de sucursal como int de Python: sqlite3 no sabe ligar numpy.int64 (nada coincide)."""
+    return [int(s) for s in sucursales]
 
 
 def get_branches():
     """Devuelve un DataFrame con IDs y nombres legibles de sucursales."""
-    engine = get_engine()
-    query = text("SELECT id_sucursal, nombre, ciudad FROM sucursales ORDER BY ciudad, nombre;")
-    df = pd.read_sql(query, engine)
+    s = t_sucursales.c
+    df = read_sql_df(select(s.id_sucursal, s.nombre, s.ciudad).order_by(s.ciudad, s.nombre))
     df["label"] = df["ciudad"] + " - " + df["nombre"]
     return df[["id_sucursal", "label"]]
 
 
 def get_monthly_sales(fecha_inicio: str, fecha_fin: str, sucursales: list[str]):
-    sql = """
-        SELECT 
-            sucursal,
-            YEAR(fecha_compra) AS anio,
-            MONTH(fecha_compra) AS mes,
-            SUM(net) AS total_ventas
-        FROM ventas_totales
-        WHERE fecha_compra BETWEEN :fi AND :ff
-          AND sucursal IN :sucs
-        GROUP BY sucursal, anio, mes
-        ORDER BY anio, mes
-    """
-    params = {"fi": fecha_inicio, "ff": fecha_fin, "sucs": tuple(sucursales)}
-    # expanding=: sucs
-    df = read_sql_df(sql, params=params, expanding={"sucs": sucursales})
-    return df
+    return query_monthly_sales_window(_ts(fecha_inicio), _ts(fecha_fin), sucursales, hasta_incluido=True)
+
+def query_monthly_sales_window(desde, hasta, sucursales, hasta_incluido: bool = False):
+    """
+    Ventas por sucursal y mes con fecha_compra en [desde, hasta) (o [desde, hasta]).
+    Límites datetime exactos: data/cells.py pide meses completos con ellos.
+    Columnas: sucursal, anio, mes, total_ventas
+    """
+    a, m = anio(v.fecha_compra).label("anio"), mes(v.fecha_compra).label("mes")
+    fin = v.fecha_compra <= hasta if hasta_incluido else v.fecha_compra < hasta
+    query = (
+        select(v.sucursal, a, m, func.sum(v.net).label("total_ventas"))
+        .where(v.fecha_compra >= desde, fin, v.sucursal.in_(_ids(sucursales)))
+        .group_by(v.sucursal, a, m)
+        .order_by(a, m)
+    )
+    return read_sql_df(query)
 
 def get_monthly_total(fecha_inicio: str, fecha_fin: str, sucursales: list[str]):
-    sql = """
-        SELECT 
-            MONTH(fecha_compra) AS mes,
-            SUM(net) AS total_ventas
-        FROM ventas_totales
-        WHERE fecha_compra BETWEEN :fi AND :ff
-          AND sucursal IN :sucs
-        GROUP BY mes
-        ORDER BY mes
-    """
-    params = {"fi": fecha_inicio, "ff": fecha_fin, "sucs": tuple(sucursales)}
-    df = read_sql_df(sql, params=params, expanding={"sucs": sucursales})
-    return df
+    m = mes(v.fecha_compra).label("mes")
+    query = (
+        select(m, func.sum(v.net).label("total_ventas"))
+        .where(v.fecha_compra.between(_ts(fecha_inicio), _ts(fecha_fin)), v.sucursal.in_(_ids(sucursales)))
+        .group_by(m)
+        .order_by(m)
+    )
+    return read_sql_df(query)
 
 def get_table_range_diag():
-    sql = """
-        SELECT 
-            MIN(fecha_compra) AS min_fecha, 
-            MAX(fecha_compra) AS max_fecha, 
-            COUNT(*) AS filas 
-        FROM ventas_totales
-    """
-    return read_sql_df(sql)
+    query = select(
+        func.min(v.fecha_compra).label("min_fecha"),
+        func.max(v.fecha_compra).label("max_fecha"),
+        func.count().label("filas"),
+    )
+    return read_sql_df(query)
+
+
+def fetch_ventas():
+    """Lee todos los registros de ventas_totales directo de la base (sin caché)."""
+    return read_sql_df(select(*_HECHOS), heavy=True)
 
 
-@st.cache_data(ttl=600)
 def get_ventas():
-    """Obtiene todos los registros de ventas_totales."""
-    engine = get_engine()
-    query = text("SELECT * FROM ventas_totales;")
-    df = pd.read_sql(query, engine)
-    return df
+    """
+    Obtiene todos los registros de ventas_totales.
+    Sale del almacén columnar mapeado en memoria (data/factstore.py): todas las
+    sesiones y procesos comparten los mismos arreglos de solo lectura.
+    """
+    from .factstore import get_fact_store
+    return get_fact_store().frame()
 
-@st.cache_data(ttl=600)
 def get_sucursales():
-    """Obtiene la lista de sucursales."""
-    engine = get_engine()
-    query = text("SELECT * FROM sucursales;")
-    df = pd.read_sql(query, engine)
-    return df
+    """Obtiene la lista de sucursales (sin caché: la cachea data.dimensions)."""
+    return read_sql_df(select(t_sucursales))
+
+
+def get_pizzas():
+    """Obtiene el catálogo de pizzas (pizza_id -> pizza_type_id)."""
+    return read_sql_df(select(pizzas))
+
+
+def get_pizzas_info():
+    """Obtiene la información por tipo de pizza (nombre legible)."""
+    return read_sql_df(select(pizzas_info))
 
 
-from sqlalchemy import text
-from .connection import get_engine
+def _join_productos():
+    """ventas_totales ⋈ pizzas ⋈ pizzas_info (nombre legible de cada venta)."""
+    return ventas_totales.join(pizzas, v.pizza_id == pizzas.c.pizza_id).join(
+        pizzas_info, pizzas.c.pizza_type_id == pizzas_info.c.pizza_type_id)
 
 
 def get_top_pizzas(top_n=5, sucursales_ids=None):
@@ -90,62 +116,32 @@ def get_top_pizzas(top_n=5, sucursales_ids=None):
     mostrando el nombre desde la tabla pizzas_info.
     Si se especifican sucursales, filtra por ellas.
     """
-    engine = get_engine()
-
-    base_sql = """
-        SELECT 
-            info.name AS nombre,             -- nombre legible de la pizza
-            SUM(v.quantity) AS cantidad, 
-            SUM(v.net) AS ventas
-        FROM ventas_totales v
-        JOIN pizzas p ON v.pizza_id = p.pizza_id
-        JOIN pizzas_info info ON p.pizza_type_id = info.pizza_type_id
-        {where_clause}
-        GROUP BY info.name
-        ORDER BY ventas DESC
-        LIMIT :top_n;
-    """
-
-    params = {"top_n": top_n}
-    where_clause = ""
-
+    ventas = func.sum(v.net).label("ventas")
+    query = (
+        select(pizzas_info.c.name.label("nombre"), func.sum(v.quantity).label("cantidad"), ventas)
+        .select_from(_join_productos())
+        .group_by(pizzas_info.c.name)
+        .order_by(ventas.desc())
+        .limit(top_n)
+    )
     if sucursales_ids:
-        placeholders = ", ".join([f":suc_{i}" for i in range(len(sucursales_ids))])
-        where_clause = f"WHERE v.sucursal IN ({placeholders})"
-        for i, val in enumerate(sucursales_ids):
-            params[f"suc_{i}"] = val
-
-    sql = base_sql.format(where_clause=where_clause)
-
-    with engine.connect() as con:
-        result = con.execute(text(sql), params)
-        rows = result.fetchall()
-
-    df = pd.DataFrame(rows, columns=["nombre", "cantidad", "ventas"])
-
-    print(f"[DEBUG get_top_pizzas] sucursales_ids={sucursales_ids}, filas={len(df)}")
-    return df
+        query = query.where(v.sucursal.in_(_ids(sucursales_ids)))
+    return read_sql_df(query, heavy=True)
 
 
 def get_top5_sucursales():
-    query = text("""
-        SELECT 
-            s.id_sucursal,
-            s.nombre AS sucursal,
-            s.ciudad,
-            SUM(v.net) AS ventas_totales,
-            COUNT(DISTINCT v.order_id) AS total_ordenes,
-            SUM(v.net) / COUNT(DISTINCT v.order_id) AS ticket_promedio
-        FROM ventas_totales v
-        JOIN sucursales s 
-            ON v.id_sucursal = s.id_sucursal
-        GROUP BY s.id_sucursal, s.nombre, s.ciudad
-        ORDER BY ventas_totales DESC
-        LIMIT 5;
-    """)
-
-    df = pd.read_sql(query, engine)
-    return df
+    s = t_sucursales.c
+    ventas, ordenes = func.sum(v.net), func.count(distinct(v.order_id))
+    query = (
+        select(s.id_sucursal, s.nombre.label("sucursal"), s.ciudad,
+               ventas.label("ventas_totales"), ordenes.label("total_ordenes"),
+               (ventas / ordenes).label("ticket_promedio"))
+        .select_from(ventas_totales.join(t_sucursales, v.sucursal == s.id_sucursal))
+        .group_by(s.id_sucursal, s.nombre, s.ciudad)
+        .order_by(ventas.desc())
+        .limit(5)
+    )
+    return read_sql_df(query, heavy=True)
 
 
 
@@ -163,41 +159,181 @@ def query_branch_monthly_sales(fecha_inicio: str, fecha_fin: str, sucursales: li
     """
     if not sucursales:
         return pd.DataFrame()
+    return get_monthly_sales(fecha_inicio, fecha_fin, sucursales)
+
 
-    placeholders = ", ".join([f":s{i}" for i in range(len(sucursales))])
 
-    sql = f"""
-        SELECT
-            sucursal,
-            YEAR(fecha_compra) AS anio,
-            MONTH(fecha_compra) AS mes,
-            SUM(net) AS total_ventas
-        FROM ventas_totales
-        WHERE fecha_compra BETWEEN :fi AND :ff
-        AND sucursal IN ({placeholders})
-        GROUP BY sucursal, anio, mes
-        ORDER BY anio, mes;
+
+# =============================================
+# ⏱️ DRILL-DOWN: VENTAS DIARIAS Y POR HORA
+# =============================================
+def _rango_dias(fecha_inicio: str, fecha_fin: str):
+    """fecha_compra dentro de [inicio 00:00:00, fin 23:59:59]."""
+    return v.fecha_compra.between(_ts(fecha_inicio), _ts(fecha_fin, fin_de_dia=True))
+
+
+def query_branch_daily_sales(fecha_inicio: str, fecha_fin: str, sucursales: list):
+    """
+    Ventas diarias por sucursal dentro del rango (pensado para un mes a la vez).
+    Columnas: sucursal, fecha, total_ventas, ordenes
+    """
+    if not sucursales:
+        return pd.DataFrame()
+    fecha = dia(v.fecha_compra).label("fecha")
+    query = (
+        select(v.sucursal, fecha, func.sum(v.net).label("total_ventas"),
+               func.count(distinct(v.order_id)).label("ordenes"))
+        .where(_rango_dias(fecha_inicio, fecha_fin), v.sucursal.in_(_ids(sucursales)))
+        .group_by(v.sucursal, fecha)
+        .order_by(fecha)
+    )
+    return read_sql_df(query)
+
+
+def query_branch_hourly_sales(fecha_inicio: str, fecha_fin: str, sucursales: list):
+    """
+    Ventas por sucursal, día y hora del día dentro del rango (ventana del zoom).
+    Columnas: sucursal, fecha, hora, total_ventas, ordenes
+    """
+    if not sucursales:
+        return pd.DataFrame()
+    fecha, h = dia(v.fecha_compra).label("fecha"), hora(v.fecha_compra).label("hora")
+    query = (
+        select(v.sucursal, fecha, h, func.sum(v.net).label("total_ventas"),
+               func.count(distinct(v.order_id)).label("ordenes"))
+        .where(_rango_dias(fecha_inicio, fecha_fin), v.sucursal.in_(_ids(sucursales)))
+        .group_by(v.sucursal, fecha, h)
+        .order_by(fecha, h)
+    )
+    return read_sql_df(query)
+
+
+def query_daily_sales_since(desde: str | None = None):
+    """
+    Ventas diarias de todas las sucursales a partir de `desde` (inclusive; None = todo).
+    Alimenta las líneas base de anomalías de forma incremental; `filas` permite
+    detectar filas cargadas tarde en días anteriores a `desde`.
+    Columnas: sucursal, fecha, total_ventas, filas
     """
+    fecha = dia(v.fecha_compra).label("fecha")
+    query = select(v.sucursal, fecha, func.sum(v.net).label("total_ventas"),
+                   func.count().label("filas")).group_by(v.sucursal, fecha)
+    if desde:
+        query = query.where(v.fecha_compra >= _ts(desde))
+    return read_sql_df(query.order_by(fecha), heavy=not desde)
 
-    params = {"fi": fecha_inicio, "ff": fecha_fin}
-    for i, suc in enumerate(sucursales):
-        params[f"s{i}"] = suc
 
-    df = read_sql_df(sql, params=params)
-    return df
+# =============================================
+# 📥 EXTRACTOS CRUDOS DE ventas_totales
+# =============================================
+def _ventas_slice_where(fecha_inicio=None, fecha_fin=None, sucursales=None):
+    condiciones = []
+    if fecha_inicio:
+        condiciones.append(v.fecha_compra >= _ts(fecha_inicio))
+    if fecha_fin:
+        condiciones.append(v.fecha_compra <= _ts(fecha_fin, fin_de_dia=True))
+    if sucursales:
+        condiciones.append(v.sucursal.in_(_ids(sucursales)))
+    return and_(true(), *condiciones)
+
 
+def count_ventas_slice(fecha_inicio=None, fecha_fin=None, sucursales=None) -> int:
+    """Filas del extracto (para reportar avance)."""
+    query = select(func.count().label("filas")).where(_ventas_slice_where(fecha_inicio, fecha_fin, sucursales))
+    return int(read_sql_df(query).iloc[0, 0])
 
 
+def iter_ventas_slice(fecha_inicio=None, fecha_fin=None, sucursales=None, chunksize: int = 50_000):
+    """Filas crudas de ventas_totales filtradas, en bloques de `chunksize` (cursor de servidor)."""
+    # sin ORDER BY: MySQL empieza a enviar de inmediato
+    query = select(*_HECHOS).where(_ventas_slice_where(fecha_inicio, fecha_fin, sucursales))
+    return iter_sql_chunks(query, chunksize=chunksize, heavy=True)
+
 
 def get_pareto_productos():
-    query = """
-        SELECT 
-            info.name AS producto,
-            SUM(v.net) AS ventas
-        FROM ventas_totales v
-        JOIN pizzas p ON v.pizza_id = p.pizza_id
-        JOIN pizzas_info info ON p.pizza_type_id = info.pizza_type_id
-        GROUP BY info.name
-        ORDER BY ventas DESC;
-    """
-    return read_sql_df(query)
\ No newline at end of file
+    ventas = func.sum(v.net).label("ventas")
+    query = (
+        select(pizzas_info.c.name.label("producto"), ventas)
+        .select_from(_join_productos())
+        .group_by(pizzas_info.c.name)
+        .order_by(ventas.desc())
+    )
+    return read_sql_df(query, heavy=True)
+
+def get_kpis(fecha_inicio: str = None, fecha_fin: str = None, sucursales: list = None):
+    """
+    KPIs globales en SQL (ventas, órdenes distintas, ticket promedio),
+    opcionalmente filtrados por rango y sucursales. Una orden es un par
+    (sucursal, order_id): el mismo order_id en dos sucursales son dos órdenes.
+    """
+    filtros = []
+    if fecha_inicio and fecha_fin:
+        filtros.append(v.fecha_compra.between(_ts(fecha_inicio), _ts(fecha_fin)))
+    if sucursales:
+        filtros.append(v.sucursal.in_(_ids(sucursales)))
+
+    # Órdenes distintas por ORDER_KEY: en MySQL (producción) un solo recorrido
+    if dialect_name() == "mysql":
+        query = select(
+            func.coalesce(func.sum(v.net), 0).label("total_ventas"),
+            conteo_distinto(v.sucursal, v.order_id).label("total_ordenes"),
+        ).where(*filtros)
+    else:
+        # Una fila por orden: COUNT(DISTINCT a, b) no existe en SQLite ni DuckDB
+        ordenes = (select(v.sucursal, v.order_id, func.sum(v.net).label("net"))
+                   .where(*filtros).group_by(v.sucursal, v.order_id).subquery())
+        query = select(
+            func.coalesce(func.sum(ordenes.c.net), 0).label("total_ventas"),
+            func.count().label("total_ordenes"),
+        ).select_from(ordenes)
+    df = read_sql_df(query)
+    df["ticket_promedio"] = (df["total_ventas"] / df["total_ordenes"]).where(df["total_ordenes"] > 0, 0)
+    return df
+
+
+# =============================================
+# 🧮 CACHÉS COMPARTIDAS (Streamlit + API)
+# =============================================
+# Sin TTL: cada entrada va estampada con la versión de las tablas que lee
+# (data/cache.py) y se invalida exactamente cuando alguna cambia. Fechas y
+# sucursales llegan normalizadas (data/filters.py); las consultas con una fila
+# por sucursal se recortan de una entrada con más sucursales si ya existe.
+# Totales, KPIs y top de productos mezclan sucursales: no se pueden recortar.
+def load_fact_data():
+    """
+    Tabla de hechos lista para la vista de KPIs (ids de sucursal, sin merge de etiquetas).
+    anio/mes ya vienen materializados en el almacén; no hay copia por sesión.
+    """
+    return get_ventas()
+
+@versioned_cache("ventas_totales")
+def cached_monthly_total(fi, ff, sucs_sel):
+    return get_monthly_total(fi, ff, sucs_sel)
+
+@versioned_cache("ventas_totales", subconjunto=Subconjunto())
+def cached_monthly_sales(fi, ff, sucs_sel):
+    from .cells import monthly_sales_from_cells  # data/cells.py importa este módulo
+    return monthly_sales_from_cells(fi, ff, sucs_sel)
+
+@versioned_cache("ventas_totales", "pizzas", "pizzas_info")
+def cached_top_pizzas(top_n: int, ids: tuple):
+    return get_top_pizzas(top_n=top_n, sucursales_ids=list(ids))
+
+@versioned_cache("ventas_totales", subconjunto=Subconjunto())
+def cached_branch_monthly_sales(fi, ff, sucursales: tuple):
+    from .cells import monthly_sales_from_cells  # data/cells.py importa este módulo
+    if not sucursales:
+        return pd.DataFrame()
+    return monthly_sales_from_cells(fi, ff, sucursales)
+
+@versioned_cache("ventas_totales", subconjunto=Subconjunto(fecha="fecha"))
+def cached_branch_daily_sales(fi, ff, sucursales: tuple):
+    return query_branch_daily_sales(fi, ff, list(sucursales))
+
+@versioned_cache("ventas_totales", subconjunto=Subconjunto(fecha="fecha"))
+def cached_branch_hourly_sales(fi, ff, sucursales: tuple):
+    return query_branch_hourly_sales(fi, ff, list(sucursales))
+
+@versioned_cache("ventas_totales")
+def cached_kpis(fi, ff, sucursales: tuple):
+    return get_kpis(fi, ff, list(sucursales))
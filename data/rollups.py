@@ -0,0 +1,210 @@
+# data/rollups.py
+import numpy as np
+import pandas as pd
+
+from .cache import tenant_resource
+from .config import HLL_PRECISION
+from .queries import get_ventas
+from .schema import ORDER_KEY
+from .versioning import get_versions
+from services.sketches import hash_values, hll_registers, hll_merge_by, hll_estimate, hll_error
+
+
+def _periodo(fecha: str) -> int:
+    """'YYYY-MM-DD' -> índice de mes absoluto (anio * 12 + mes - 1)."""
+    return int(fecha[:4]) * 12 + int(fecha[5:7]) - 1
+
+
+def _cell_mask(periodos, sucs_arr, fecha_inicio=None, fecha_fin=None, sucursales=None) -> np.ndarray:
+    mask = np.ones(len(periodos), dtype=bool)
+    if fecha_inicio:
+        mask &= periodos >= _periodo(fecha_inicio)
+    if fecha_fin:
+        mask &= periodos <= _periodo(fecha_fin)
+    if sucursales:
+        mask &= np.isin(sucs_arr, list(sucursales))
+    return mask
+
+
+# ============================================
+# 📦 ROLLUP MENSUAL POR SUCURSAL
+# ============================================
+class MonthlyRollup:
+    """
+    Agregado (sucursal, anio, mes) con ventas, cantidad y líneas, más un sketch
+    HyperLogLog de órdenes (ORDER_KEY) por celda. `sketches[i]` corresponde a `table.iloc[i]`.
+    """
+
+    def __init__(self, table: pd.DataFrame, sketches: np.ndarray, p: int, version: tuple, ultimo_dia=None):
+        self.table = table.reset_index(drop=True)
+        self.sketches = sketches
+        self.p = p
+        self.version = version
+        self.ultimo_dia = ultimo_dia  # último día con ventas: el mes que lo contiene puede estar incompleto
+        self._periodos = (self.table["anio"] * 12 + self.table["mes"] - 1).to_numpy()
+        self._sucursales = self.table["sucursal"].to_numpy()
+
+    @property
+    def error(self) -> float:
+        """Error relativo estándar de los conteos de órdenes."""
+        return hll_error(self.p)
+
+    def mask(self, fecha_inicio=None, fecha_fin=None, sucursales=None) -> np.ndarray:
+        return _cell_mask(self._periodos, self._sucursales, fecha_inicio, fecha_fin, sucursales)
+
+    def distinct_orders(self, fecha_inicio=None, fecha_fin=None, sucursales=None) -> float:
+        """Órdenes distintas estimadas para cualquier combinación de rango y sucursales."""
+        sk = self.sketches[self.mask(fecha_inicio, fecha_fin, sucursales)]
+        if not len(sk):
+            return 0.0
+        return hll_estimate(sk.max(axis=0))
+
+    def branch_summary(self, fecha_inicio=None, fecha_fin=None, sucursales=None) -> pd.DataFrame:
+        """
+        Por sucursal: ventas_totales, total_ordenes (estimado) y ticket_promedio.
+        Se calcula combinando sketches, sin tocar la tabla de hechos.
+        """
+        mask = self.mask(fecha_inicio, fecha_fin, sucursales)
+        t = self.table[mask]
+        if t.empty:
+            return pd.DataFrame(columns=["sucursal", "ventas_totales", "total_ordenes", "ticket_promedio"])
+
+        codes, uniques = pd.factorize(t["sucursal"])
+        merged = hll_merge_by(self.sketches[mask], codes, len(uniques))
+        ventas = np.bincount(codes, weights=t["ventas"].to_numpy(), minlength=len(uniques))
+
+        out = pd.DataFrame({
+            "sucursal": uniques,
+            "ventas_totales": ventas,
+            "total_ordenes": np.round(hll_estimate(merged)).astype(np.int64),
+        })
+        out["ticket_promedio"] = out["ventas_totales"] / out["total_ordenes"].where(out["total_ordenes"] > 0)
+        return out
+
+    def first_periods(self) -> pd.Series:
+        """Primer mes con ventas de cada sucursal (índice de mes absoluto)."""
+        return pd.Series(self._periodos).groupby(self._sucursales).min()
+
+    def group_summary(self, grupos: dict, fecha_inicio=None, fecha_fin=None) -> pd.DataFrame:
+        """
+        Por grupo (grupos: id de sucursal -> nombre de grupo): sucursales con ventas,
+        ventas_totales, total_ordenes (estimado) y ticket_promedio.
+        """
+        mask = self.mask(fecha_inicio, fecha_fin, list(grupos))
+        t = self.table.loc[mask, ["sucursal", "ventas"]]
+        if t.empty:
+            return pd.DataFrame(columns=["grupo", "sucursales", "ventas_totales", "total_ordenes", "ticket_promedio"])
+
+        # Mismas órdenes que distinct_orders: se unen los sketches de todo el grupo
+        codes, nombres = pd.factorize(t["sucursal"].map(grupos), sort=True)
+        merged = hll_merge_by(self.sketches[mask], codes, len(nombres))
+        out = pd.DataFrame({
+            "grupo": nombres,
+            "sucursales": t.groupby(codes)["sucursal"].nunique().to_numpy(),
+            "ventas_totales": np.bincount(codes, weights=t["ventas"].to_numpy(), minlength=len(nombres)),
+            "total_ordenes": np.round(hll_estimate(merged)).astype(np.int64),
+        })
+        out["ticket_promedio"] = out["ventas_totales"] / out["total_ordenes"].where(out["total_ordenes"] > 0)
+        return out
+
+    def group_series(self, grupos: dict, fecha_inicio=None, fecha_fin=None) -> pd.DataFrame:
+        """
+        Serie mensual por grupo sumando las celdas (sucursal, mes) del rollup.
+        Columnas: grupo, anio, mes, ventas, cantidad, lineas, ordenes, sucursales_activas.
+        """
+        mask = self.mask(fecha_inicio, fecha_fin, list(grupos))
+        t = self.table.loc[mask, ["sucursal", "anio", "mes", "ventas", "cantidad", "lineas"]]
+        if t.empty:
+            return pd.DataFrame(columns=["grupo", "anio", "mes", "ventas", "cantidad", "lineas",
+                                         "ordenes", "sucursales_activas"])
+
+        t = t.assign(grupo=t["sucursal"].map(grupos).to_numpy())
+        llaves = ["grupo", "anio", "mes"]
+        out = t.groupby(llaves, as_index=False, sort=True).agg(
+            ventas=("ventas", "sum"),
+            cantidad=("cantidad", "sum"),
+            lineas=("lineas", "sum"),
+            sucursales_activas=("sucursal", "nunique"),
+        )
+        # Órdenes por (grupo, mes) uniendo los sketches de sus celdas
+        codes = t.groupby(llaves, sort=True).ngroup().to_numpy()
+        merged = hll_merge_by(self.sketches[mask], codes, len(out))
+        out.insert(6, "ordenes", np.round(hll_estimate(merged)).astype(np.int64))
+        return out
+
+
+def build_monthly_rollup(df: pd.DataFrame, p: int = HLL_PRECISION, version: tuple = ()) -> MonthlyRollup:
+    """df: hechos con columnas sucursal, fecha_compra, net, quantity, order_id."""
+    fechas = pd.to_datetime(df["fecha_compra"])
+    keys = pd.DataFrame({
+        "sucursal": df["sucursal"].to_numpy(),
+        "anio": fechas.dt.year.to_numpy(),
+        "mes": fechas.dt.month.to_numpy(),
+    })
+    codes, cells = pd.factorize(pd.MultiIndex.from_frame(keys))
+
+    table = cells.to_frame(index=False, name=["sucursal", "anio", "mes"])
+    table["ventas"] = np.bincount(codes, weights=df["net"].to_numpy(dtype=float), minlength=len(cells))
+    table["cantidad"] = np.bincount(codes, weights=df["quantity"].to_numpy(dtype=float), minlength=len(cells))
+    table["lineas"] = np.bincount(codes, minlength=len(cells))
+
+    sketches = hll_registers(hash_values(df[list(ORDER_KEY)]), codes, len(cells), p)
+
+    # Orden estable por periodo y sucursal
+    order = np.lexsort((table["sucursal"].to_numpy(), table["mes"].to_numpy(), table["anio"].to_numpy()))
+    ultimo_dia = fechas.max().normalize() if len(fechas) else None
+    return MonthlyRollup(table.iloc[order], sketches[order], p, version, ultimo_dia)
+
+
+# ============================================
+# 🍕 ROLLUP MENSUAL POR PRODUCTO
+# ============================================
+class ProductRollup:
+    """Agregado (sucursal, anio, mes, pizza_id) con ventas y cantidad."""
+
+    def __init__(self, table: pd.DataFrame, version: tuple):
+        self.table = table.reset_index(drop=True)
+        self.version = version
+        self._periodos = (self.table["anio"] * 12 + self.table["mes"] - 1).to_numpy()
+        self._sucursales = self.table["sucursal"].to_numpy()
+
+    def mask(self, fecha_inicio=None, fecha_fin=None, sucursales=None) -> np.ndarray:
+        return _cell_mask(self._periodos, self._sucursales, fecha_inicio, fecha_fin, sucursales)
+
+
+def build_product_rollup(df: pd.DataFrame, version: tuple = ()) -> ProductRollup:
+    """df: hechos con columnas sucursal, fecha_compra, pizza_id, net, quantity."""
+    fechas = pd.to_datetime(df["fecha_compra"])
+    table = (
+        pd.DataFrame({
+            "sucursal": df["sucursal"].to_numpy(),
+            "anio": fechas.dt.year.to_numpy(),
+            "mes": fechas.dt.month.to_numpy(),
+            "pizza_id": df["pizza_id"].to_numpy(),
+            "ventas": df["net"].to_numpy(dtype=float),
+            "cantidad": df["quantity"].to_numpy(dtype=float),
+        })
+        .groupby(["anio", "mes", "sucursal", "pizza_id"], as_index=False, sort=True)
+        .sum()
+    )
+    return ProductRollup(table, version)
+
+
+@tenant_resource
+def _build_rollup(version: tuple) -> MonthlyRollup:
+    return build_monthly_rollup(get_ventas(), HLL_PRECISION, version)
+
+
+def get_monthly_rollup() -> MonthlyRollup:
+    """Rollup compartido entre sesiones; se reconstruye solo si cambia ventas_totales."""
+    return _build_rollup(get_versions("ventas_totales"))
+
+
+@tenant_resource
+def _build_product_rollup(version: tuple) -> ProductRollup:
+    return build_product_rollup(get_ventas(), version)
+
+
+def get_product_rollup() -> ProductRollup:
+    """Rollup de productos compartido entre sesiones (misma política que get_monthly_rollup)."""
+    return _build_product_rollup(get_versions("ventas_totales"))
@@ -0,0 +1,122 @@
+# data/schema.py
+from sqlalchemy import Column, Date, DateTime, Float, Integer, MetaData, String, Table, extract
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.exc import CompileError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+# ============================================
+# 🗂️ ESQUEMA (SQLAlchemy Core)
+# ============================================
+# Las consultas de data/queries.py se arman con estas tablas en lugar de SQL
+# crudo: el mismo código compila para MySQL (producción), SQLite o DuckDB (local,
+# CI y benchmarks). Solo se declaran las columnas que usa el tablero.
+
+metadata = MetaData()
+
+# En SQLite las fechas son texto: sin microsegundos, igual que el adaptador por
+# defecto de sqlite3 y el formato de MySQL, para que las comparaciones coincidan.
+_FECHA_HORA = DateTime().with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d "
+                                   "%(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite",
+)
+
+sucursales = Table(
+    "sucursales", metadata,
+    Column("id_sucursal", Integer, primary_key=True),
+    Column("nombre", String(100)),
+    Column("ciudad", String(100)),
+)
+
+pizzas_info = Table(
+    "pizzas_info", metadata,
+    Column("pizza_type_id", String(50), primary_key=True),
+    Column("name", String(100)),
+    Column("category", String(50)),
+)
+
+pizzas = Table(
+    "pizzas", metadata,
+    Column("pizza_id", String(50), primary_key=True),
+    Column("pizza_type_id", String(50), index=True),
+    Column("size", String(5)),
+    Column("price", Float),
+)
+
+# id_linea identifica cada renglón: una orden puede repetir pizza_id (y hasta la
+# fila completa), así que sin él no hay llave única para paginar por llave. En
+# MySQL: ALTER TABLE ventas_totales ADD id_linea BIGINT AUTO_INCREMENT PRIMARY KEY.
+ventas_totales = Table(
+    "ventas_totales", metadata,
+    Column("id_linea", Integer, primary_key=True),
+    Column("sucursal", Integer, index=True),
+    Column("order_id", Integer),
+    Column("pizza_id", String(50)),
+    Column("quantity", Integer),
+    Column("net", Float),
+    Column("fecha_compra", _FECHA_HORA, index=True),
+)
+
+# Identidad de una orden: cada caja numera order_id por separado, así que el mismo
+# número se repite entre sucursales. Todo conteo de órdenes distintas usa el par.
+ORDER_KEY = ("sucursal", "order_id")
+
+
+# ============================================
+# 📅 PARTES DE FECHA PORTABLES
+# ============================================
+# extract() ya compila por dialecto (EXTRACT en MySQL/DuckDB, STRFTIME en SQLite).
+# DATE() no existe en todos: `dia` lo traduce.
+
+class dia(FunctionElement):
+    """Día calendario de un datetime (DATE(x) en MySQL/SQLite, CAST(x AS DATE) en el resto)."""
+    type = Date()
+    name = "dia"
+    inherit_cache = True
+
+
+@compiles(dia)
+def _dia_default(element, compiler, **kw):
+    return f"CAST({compiler.process(element.clauses, **kw)} AS DATE)"
+
+
+@compiles(dia, "mysql")
+@compiles(dia, "sqlite")
+def _dia_date(element, compiler, **kw):
+    return f"DATE({compiler.process(element.clauses, **kw)})"
+
+
+# ============================================
+# 🔢 CONTEO DE PARES DISTINTOS
+# ============================================
+# COUNT(DISTINCT a, b) es de MySQL: SQLite y DuckDB solo cuentan una expresión
+# distinta. Fuera de MySQL se cuenta sobre una subconsulta agrupada por el par.
+
+class conteo_distinto(FunctionElement):
+    """COUNT(DISTINCT a, b, ...) (solo MySQL)."""
+    type = Integer()
+    name = "conteo_distinto"
+    inherit_cache = True
+
+
+@compiles(conteo_distinto)
+def _conteo_distinto_default(element, compiler, **kw):
+    raise CompileError(f"COUNT(DISTINCT ...) de varias columnas no existe en {compiler.dialect.name}")
+
+
+@compiles(conteo_distinto, "mysql")
+def _conteo_distinto_mysql(element, compiler, **kw):
+    return f"COUNT(DISTINCT {compiler.process(element.clauses, **kw)})"
+
+
+def anio(col):
+    return extract("year", col)
+
+
+def mes(col):
+    return extract("month", col)
+
+
+def hora(col):
+    return extract("hour", col)
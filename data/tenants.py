@@ -0,0 +1,73 @@
+# data/tenants.py
+import contextlib
+import contextvars
+
+from .config import DB_HOST, DB_PASS, DB_PORT, DB_URL, DB_USER, DEFAULT_TENANT, TENANTS
+
+# ============================================
+# 🏢 FRANQUICIAS (MULTI-TENANT)
+# ============================================
+# Cada franquicia tiene su propia base (mismo esquema). Un solo despliegue las
+# sirve a todas: el motor se elige por franquicia (data/connection.py) y las
+# versiones de datos la incluyen, así cada caché queda particionada por franquicia.
+
+SESSION_KEY = "tenant"  # franquicia elegida en st.session_state
+
+
+def _parse(spec: str) -> dict:
+    """"norte=pizzas_norte,sur=mysql+pymysql://..." -> {"norte": url, "sur": url}."""
+    tenants = {}
+    for item in filter(None, (p.strip() for p in spec.split(","))):
+        nombre, _, destino = item.partition("=")
+        nombre, destino = nombre.strip(), destino.strip()
+        if not nombre or not destino:
+            raise ValueError(f"TENANTS mal formado: {item!r} (se espera nombre=base o nombre=url)")
+        if "://" not in destino:
+            destino = f"mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{destino}"
+        tenants[nombre] = destino
+    return tenants
+
+
+TENANT_URLS = _parse(TENANTS) or {DEFAULT_TENANT: DB_URL}
+DEFAULT = DEFAULT_TENANT if DEFAULT_TENANT in TENANT_URLS else next(iter(TENANT_URLS))
+
+# Franquicia explícita del contexto actual (API, scripts, hilos del warmer)
+_tenant = contextvars.ContextVar("tenant", default=None)
+
+
+def tenant_names() -> list:
+    return list(TENANT_URLS)
+
+
+def tenant_url(nombre: str) -> str:
+    if nombre not in TENANT_URLS:
+        raise ValueError(f"Franquicia desconocida: {nombre}")
+    return TENANT_URLS[nombre]
+
+
+def current_tenant() -> str:
+    """
+    Franquicia activa: la fijada con use_tenant() en este contexto; si no, la de la
+    sesión de Streamlit (sobrevive a reruns de fragmentos, que corren en otro hilo);
+    si no, la predeterminada.
+    """
+    nombre = _tenant.get()
+    if nombre is not None:
+        return nombre
+    import streamlit as st
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    if get_script_run_ctx(suppress_warning=True) is not None:
+        return st.session_state.get(SESSION_KEY, DEFAULT)
+    return DEFAULT
+
+
+@contextlib.contextmanager
+def use_tenant(nombre: str | None):
+    """Ejecuta el bloque contra la base de `nombre` (None = la predeterminada)."""
+    nombre = nombre or DEFAULT
+    tenant_url(nombre)  # valida
+    token = _tenant.set(nombre)
+    try:
+        yield
+    finally:
+        _tenant.reset(token)
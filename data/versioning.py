@@ -0,0 +1,61 @@
+# data/versioning.py
+import streamlit as st
+from .config import VERSION_PROBE_TTL
+from .connection import dialect_name, read_sql_df
+from .tenants import current_tenant
+
+# ============================================
+# 🔖 SONDAS DE VERSIÓN POR TABLA
+# ============================================
+# Consultas baratas (COUNT + MAX sobre la llave) que cambian cuando la tabla cambia.
+# Las columnas después de `filas` se agregan a la versión en el orden del SELECT.
+TABLE_PROBES = {
+    "sucursales": "SELECT COUNT(*) AS filas, MAX(id_sucursal) AS max_key FROM sucursales",
+    "pizzas": "SELECT COUNT(*) AS filas, MAX(pizza_id) AS max_key FROM pizzas",
+    "pizzas_info": "SELECT COUNT(*) AS filas, MAX(pizza_type_id) AS max_key FROM pizzas_info",
+    "ventas_totales": "SELECT COUNT(*) AS filas, MAX(fecha_compra) AS max_key, MAX(id_linea) AS max_id, "
+                      "COALESCE(ROUND(SUM(net), 2), 0) AS ventas, COALESCE(SUM(quantity), 0) AS unidades "
+                      "FROM ventas_totales",
+}
+
+# ventas_totales es demasiado grande para CHECKSUM TABLE en cada sonda. Sus marcas
+# viajan en el mismo recorrido que el COUNT(*):
+#   - MAX(id_linea) cambia con cada alta, aunque se borre otra fila a la vez;
+#   - SUM(net) y SUM(quantity) cambian con un UPDATE de importe o cantidad.
+# Queda fuera un UPDATE que solo mueva una fila de fecha, sucursal o pizza sin
+# tocar importe ni cantidad: tras una corrección así hay que limpiar las cachés.
+
+# Catálogos chicos: además se suma su CHECKSUM, así una edición (p. ej. renombrar
+# una sucursal) cambia la versión aunque no cambien filas ni llave máxima.
+# CHECKSUM TABLE es de MySQL; en otros motores basta COUNT + MAX.
+CHECKSUM_TABLES = {"sucursales", "pizzas", "pizzas_info"}
+
+
+# La sonda misma se cachea VERSION_PROBE_TTL segundos: es el único reloj que queda;
+# todo lo demás se invalida por cambio de versión, no por tiempo.
+@st.cache_data(ttl=VERSION_PROBE_TTL, show_spinner=False)
+def _probe(tenant: str, tabla: str) -> tuple:
+    row = read_sql_df(TABLE_PROBES[tabla]).iloc[0]
+    version = (int(row["filas"]),) + tuple(str(x) for x in row.iloc[1:])
+    if tabla in CHECKSUM_TABLES and dialect_name() == "mysql":
+        version += (str(read_sql_df(f"CHECKSUM TABLE {tabla}").iloc[0, -1]),)
+    return version
+
+
+def get_table_version(tabla: str) -> tuple:
+    """
+    Devuelve una tupla (filas, max_key[, ...]) que identifica el estado actual de la
+    tabla: (filas, max_key, checksum) en catálogos con MySQL y (filas, max_key,
+    max_id, ventas, unidades) en ventas_totales.
+    """
+    if tabla not in TABLE_PROBES:
+        raise ValueError(f"Tabla sin sonda de versión: {tabla}")
+    return _probe(current_tenant(), tabla)
+
+
+def get_versions(*tablas: str) -> tuple:
+    """
+    Versión combinada de varias tablas, útil como llave de caché. Empieza por la
+    franquicia activa: dos bases con los mismos conteos no comparten entradas.
+    """
+    return (("tenant", current_tenant()),) + tuple((t, get_table_version(t)) for t in tablas)
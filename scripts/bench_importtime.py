@@ -0,0 +1,85 @@
+# scripts/bench_importtime.py
+"""
+Benchmark de arranque en frío basado en `python -X importtime`.
+
+Importa los mismos módulos que app.py carga al iniciar y falla (exit 1) si:
+  - la mediana de varias corridas supera IMPORT_BUDGET_MS, o
+  - se cargó algún módulo que debe ser perezoso (scipy, altair, charts, pymysql).
+
+Una sola corrida varía ±30 % según el estado del disco y la CPU; la mediana de
+IMPORT_BENCH_RUNS corridas con margen sobre el valor típico (~900 ms) evita que
+el mismo árbol pase y falle según el momento.
+
+Uso:  python scripts/bench_importtime.py [--budget 1500] [--runs 5] [--top 15]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_MODULES = ["data.config", "ui.filters", "ui.views", "services.warmer"]
+LAZY_MODULES = ["scipy", "altair", "charts.sales_charts", "pymysql"]
+DEFAULT_BUDGET_MS = int(os.getenv("IMPORT_BUDGET_MS", "1500"))
+DEFAULT_RUNS = int(os.getenv("IMPORT_BENCH_RUNS", "5"))
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(modules=STARTUP_MODULES) -> list[tuple[str, int, int, int]]:
+    """Devuelve [(modulo, self_us, cumulative_us, nivel)] de un intérprete limpio."""
+    code = "; ".join(f"import {m}" for m in modules)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True,
+        env=dict(os.environ, WARMER_ENABLED="0"),
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"No se pudieron importar los módulos de arranque: {modules}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            self_us, cum_us, indent, name = m.groups()
+            rows.append((name, int(self_us), int(cum_us), len(indent) // 2))
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget", type=int, default=DEFAULT_BUDGET_MS, help="presupuesto (mediana) en ms")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="corridas de las que se toma la mediana")
+    parser.add_argument("--top", type=int, default=15, help="módulos más lentos a listar")
+    args = parser.parse_args(argv)
+
+    corridas = []
+    for _ in range(max(args.runs, 1)):
+        rows = measure()
+        corridas.append((sum(cum for _, _, cum, level in rows if level == 0) / 1000, rows))
+    corridas.sort(key=lambda c: c[0])
+    total_ms = statistics.median(t for t, _ in corridas)
+    rows = corridas[(len(corridas) - 1) // 2][1]  # detalle de la corrida mediana
+    loaded = {name for _, filas in corridas for name, *_ in filas}
+
+    print(f"Arranque en frío: {total_ms:,.0f} ms mediana de {len(corridas)} "
+          f"(min {corridas[0][0]:,.0f}, max {corridas[-1][0]:,.0f}; presupuesto {args.budget:,} ms)")
+    print(f"{'cumulative ms':>14}  módulo")
+    for name, _, cum, level in sorted((r for r in rows if r[3] <= 1), key=lambda r: -r[2])[: args.top]:
+        print(f"{cum / 1000:>14,.1f}  {'  ' * level}{name}")
+
+    errores = [f"'{m}' se importa en el arranque (debe ser perezoso)" for m in LAZY_MODULES if m in loaded]
+    if total_ms > args.budget:
+        errores.append(f"{total_ms:,.0f} ms excede el presupuesto de {args.budget:,} ms")
+
+    for e in errores:
+        print("❌", e)
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
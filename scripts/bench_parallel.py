@@ -0,0 +1,89 @@
+# scripts/bench_parallel.py
+"""
+Benchmark de services/parallel.aggregate_facts: camino en serie contra el pool.
+
+Genera un frame sintético, lo materializa con el almacén columnar (como lo ve la
+vista KPIs, con los .npy mapeados en memoria), comprueba que ambos caminos den lo
+mismo y reporta la mediana de varias corridas de cada uno. Falla (exit 1) si los
+resultados difieren o si, con más de un núcleo, el pool no le gana a la serie.
+Con un solo núcleo no hay paralelismo posible: solo se reporta.
+
+Uso:  python scripts/bench_parallel.py [--filas 3000000] [--workers N] [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def hechos(filas: int, sucursales: int = 12, semilla: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(semilla)
+    fecha = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 730 * 86400, filas), unit="s")
+    df = pd.DataFrame({
+        "sucursal": rng.integers(1, sucursales + 1, filas),
+        "order_id": rng.integers(1, filas // 3 + 2, filas),
+        "net": np.round(rng.uniform(10, 60, filas), 2),
+        "fecha_compra": fecha,
+    })
+    df["anio"] = df["fecha_compra"].dt.year.astype(np.int16)
+    return df
+
+
+def medir(fn, runs: int) -> float:
+    tiempos = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        tiempos.append(time.perf_counter() - t0)
+    return statistics.median(tiempos)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--filas", type=int, default=3_000_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    from data.factstore import FactStore, write_store
+    from services.parallel import aggregate_facts
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = write_store(hechos(args.filas), os.path.join(tmp, "bench"), ("bench",))
+        df = FactStore(ruta).frame()
+
+        serie = aggregate_facts(df, workers=1)
+        pool = aggregate_facts(df, workers=args.workers, min_rows=0)  # también levanta el pool
+        iguales = (serie["total_ordenes"] == pool["total_ordenes"]
+                   and np.isclose(serie["total_ventas"], pool["total_ventas"])
+                   and serie["por_sucursal"]["total_ordenes"].equals(pool["por_sucursal"]["total_ordenes"]))
+
+        t_serie = medir(lambda: aggregate_facts(df, workers=1), args.runs)
+        t_pool = medir(lambda: aggregate_facts(df, workers=args.workers, min_rows=0), args.runs)
+
+    print(f"{args.filas:,} filas · {args.workers} workers · mediana de {args.runs} corridas")
+    print(f"  serie: {t_serie * 1000:8.0f} ms")
+    print(f"  pool:  {t_pool * 1000:8.0f} ms  ({t_serie / t_pool:.2f}x)")
+    if not iguales:
+        print("❌ El pool y la serie no coinciden")
+        return 1
+    if (os.cpu_count() or 1) < 2 or args.workers < 2:
+        print("ℹ️ Un solo núcleo o worker: no hay paralelismo que medir")
+        return 0
+    if t_pool >= t_serie:
+        print("❌ El pool no le gana a la serie: subir PARALLEL_MIN_ROWS o bajar PARALLEL_WORKERS")
+        return 1
+    print("✅ El pool le gana a la serie")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+# scripts/check_pagination.py
+"""
+Recorre por llave un recorte de ventas_totales y falla (exit 1) si las páginas
+no suman exactamente count() o si alguna fila sale repetida.
+
+Una llave de desempate que no es única (p. ej. una orden con dos renglones de la
+misma pizza) hace que el seek `(orden, llave...) > cursor` salte filas justo en
+el borde de página; este recorrido lo detecta para cada columna de orden.
+
+Uso:  DB_URL=sqlite:///.cache/dev.db python scripts/check_pagination.py
+          [--desde 2024-03-01] [--hasta 2024-03-10] [--limite 50]
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def recorrer(fuente, orden: str, desc: bool, limite: int, **filtros) -> list:
+    """Ids de línea de todas las páginas, en el orden en que se entregaron."""
+    ids, cursor = [], None
+    while True:
+        pagina = fuente.page(orden, desc, cursor, limite, **filtros)
+        ids.extend(pagina["id_linea"].iloc[:limite])
+        if len(pagina) <= limite:
+            return ids
+        cursor = fuente.cursor_of(pagina.iloc[limite - 1], orden)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--desde", default="2024-03-01")
+    parser.add_argument("--hasta", default="2024-03-10")
+    parser.add_argument("--limite", type=int, default=50, help="filas por página")
+    args = parser.parse_args(argv)
+
+    from data.pagination import FUENTES
+
+    fuente = FUENTES["ventas"]
+    filtros = {"fecha_inicio": args.desde, "fecha_fin": args.hasta}
+    total = fuente.count(**filtros)
+    fallas = 0
+    for orden in ("fecha_compra", "order_id", "pizza_id", "net"):
+        for desc in (False, True):
+            ids = recorrer(fuente, orden, desc, args.limite, **filtros)
+            ok = len(ids) == total and len(set(ids)) == total
+            fallas += not ok
+            print(f"{'✅' if ok else '❌'} {orden:<13} {'desc' if desc else 'asc ':<4} "
+                  f"{len(ids):,} filas paginadas / {total:,} en count()")
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+# scripts/generate_reports.py
+"""
+Genera el paquete semanal de KPIs (total, cada ciudad y cada sucursal) sin Streamlit.
+
+Por defecto toma la última semana completa con datos y escribe HTML en
+REPORTS_DIR/<fecha_fin>/ (REPORTS_DIR/<franquicia>/<fecha_fin>/ si hay varias
+franquicias en TENANTS). PDF requiere weasyprint y gráficos estáticos vl-convert-python.
+
+Uso:  python scripts/generate_reports.py [--desde 2024-12-23 --hasta 2024-12-29]
+                                         [--formatos html,pdf] [--workers 8] [--alcance general]
+                                         [--franquicia norte]
+Cron (lunes 6:00):
+      0 6 * * 1  cd /ruta/al/proyecto && python scripts/generate_reports.py
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main(argv=None) -> int:
+    from data.config import REPORT_WORKERS, REPORTS_DIR
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--desde", help="YYYY-MM-DD (por defecto: lunes de la última semana completa)")
+    parser.add_argument("--hasta", help="YYYY-MM-DD (por defecto: domingo de la última semana completa)")
+    parser.add_argument("--formatos", default="html", help="html, pdf o html,pdf")
+    parser.add_argument("--workers", type=int, default=REPORT_WORKERS)
+    parser.add_argument("--salida", default=REPORTS_DIR)
+    parser.add_argument("--alcance", action="append", help="slug a generar (repetible); por defecto todos")
+    parser.add_argument("--franquicia", action="append", help="franquicia (repetible); por defecto todas")
+    args = parser.parse_args(argv)
+    if (args.desde is None) != (args.hasta is None):
+        parser.error("indica --desde y --hasta juntos")
+
+    from data.tenants import tenant_names, use_tenant
+    franquicias = args.franquicia or tenant_names()
+    desconocidas = set(franquicias) - set(tenant_names())
+    if desconocidas:
+        parser.error(f"franquicias desconocidas: {', '.join(sorted(desconocidas))}")
+
+    # Las cachés de Streamlit funcionan sin servidor; solo se silencia su aviso
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    from services.reports import generate_reports
+
+    t0 = time.perf_counter()
+    resultados = []
+    for franquicia in franquicias:
+        salida = os.path.join(args.salida, franquicia) if len(tenant_names()) > 1 else args.salida
+        with use_tenant(franquicia):
+            parciales = generate_reports(args.desde, args.hasta, formatos=tuple(args.formatos.split(",")),
+                                         workers=args.workers, salida=salida, alcances=args.alcance)
+        if len(franquicias) > 1:
+            print(f"🏢 {franquicia}")
+        for r in parciales:
+            archivos = ", ".join(f"{k}: {v}" for k, v in r["archivos"].items() if v) or "sin archivos"
+            print(f"  {r['alcance']:<24} {r['segundos']:>6.2f} s  {archivos}")
+        resultados += parciales
+    faltan_pdf = "pdf" in args.formatos and any(r["archivos"].get("pdf") is None for r in resultados)
+    if faltan_pdf:
+        print("⚠️ PDF omitido: requiere weasyprint y vl-convert-python instalados")
+    print(f"✅ {len(resultados)} reportes en {time.perf_counter() - t0:,.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
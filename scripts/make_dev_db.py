@@ -0,0 +1,110 @@
+# scripts/make_dev_db.py
+"""
+Crea una base de datos sintética con el esquema del tablero (data/schema.py) en
+SQLite o DuckDB, para correr la app, la API y los benchmarks sin servidor MySQL.
+
+Uso:  python scripts/make_dev_db.py [--url sqlite:///.cache/dev.db] [--ordenes 200000]
+                                     [--sucursales 12] [--desde 2023-01-01 --hasta 2024-12-31]
+Luego: DB_URL=sqlite:///.cache/dev.db streamlit run app.py
+DuckDB requiere el paquete duckdb-engine (URL duckdb:///.cache/dev.duckdb).
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CIUDADES = ["CDMX", "Guadalajara", "Monterrey", "Puebla", "Querétaro", "Mérida"]
+TIPOS = {
+    "classic": ["bbq_ckn", "cali_ckn", "hawaiian", "pepperoni", "big_meat", "mexicana"],
+    "veggie": ["four_cheese", "mediterraneo", "veggie_veg", "spinach_fet", "green_garden"],
+    "supreme": ["soppressata", "spicy_ital", "calabrese", "ital_supr", "prsc_argla"],
+}
+TAMANOS = {"S": 12.0, "M": 16.0, "L": 20.5}
+HORAS = np.arange(11, 24)
+PESO_HORA = np.array([6, 10, 8, 5, 4, 5, 8, 10, 9, 7, 5, 3, 2], dtype=float)
+
+
+def catalogos(n_sucursales: int, rng):
+    sucursales = pd.DataFrame({
+        "id_sucursal": np.arange(1, n_sucursales + 1),
+        "nombre": [f"Sucursal {i + 1}" for i in range(n_sucursales)],
+        "ciudad": [CIUDADES[i % len(CIUDADES)] for i in range(n_sucursales)],
+    })
+    info = pd.DataFrame([(t, t.replace("_", " ").title(), c) for c, ts in TIPOS.items() for t in ts],
+                        columns=["pizza_type_id", "name", "category"])
+    pizzas = pd.DataFrame([(f"{t}_{s.lower()}", t, s, round(p * rng.uniform(0.9, 1.2), 2))
+                           for t in info["pizza_type_id"] for s, p in TAMANOS.items()],
+                          columns=["pizza_id", "pizza_type_id", "size", "price"])
+    return sucursales, pizzas, info
+
+
+def ventas(sucursales, pizzas, n_ordenes: int, desde: str, hasta: str, rng) -> pd.DataFrame:
+    """Órdenes de 1–4 líneas con estacionalidad semanal y horaria y peso por sucursal."""
+    dias = pd.date_range(desde, hasta, freq="D")
+    peso_dia = np.where(dias.dayofweek >= 4, 1.4, 1.0)
+    peso_suc = rng.uniform(0.5, 1.5, len(sucursales))
+
+    dia = rng.choice(len(dias), n_ordenes, p=peso_dia / peso_dia.sum())
+    hora = rng.choice(HORAS, n_ordenes, p=PESO_HORA / PESO_HORA.sum())
+    segundos = hora * 3600 + rng.integers(0, 3600, n_ordenes)
+    fecha = dias.values[dia] + segundos.astype("timedelta64[s]")
+    suc = rng.choice(len(sucursales), n_ordenes, p=peso_suc / peso_suc.sum())
+
+    lineas = rng.integers(1, 5, n_ordenes)
+    orden = np.repeat(np.arange(n_ordenes), lineas)
+    pizza = rng.integers(0, len(pizzas), len(orden))
+    cantidad = rng.choice([1, 1, 1, 2, 2, 3], len(orden))
+    # order_id es único por sucursal (como en las cajas reales)
+    order_id = pd.Series(suc).groupby(suc).cumcount().to_numpy() + 1
+    return pd.DataFrame({
+        "sucursal": sucursales["id_sucursal"].to_numpy()[suc[orden]],
+        "order_id": order_id[orden],
+        "pizza_id": pizzas["pizza_id"].to_numpy()[pizza],
+        "quantity": cantidad,
+        "net": np.round(cantidad * pizzas["price"].to_numpy()[pizza], 2),
+        "fecha_compra": pd.Series(fecha[orden]).dt.strftime("%Y-%m-%d %H:%M:%S").to_numpy(),
+    })
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=f"sqlite:///{os.path.join(ROOT, '.cache', 'dev.db')}")
+    parser.add_argument("--ordenes", type=int, default=200_000)
+    parser.add_argument("--sucursales", type=int, default=12)
+    parser.add_argument("--desde", default="2023-01-01")
+    parser.add_argument("--hasta", default="2024-12-31")
+    parser.add_argument("--semilla", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    from sqlalchemy import create_engine
+    from data.schema import metadata
+
+    if args.url.startswith("sqlite:///"):
+        os.makedirs(os.path.dirname(os.path.abspath(args.url[len("sqlite:///"):])), exist_ok=True)
+
+    t0 = time.perf_counter()
+    rng = np.random.default_rng(args.semilla)
+    sucursales, pizzas, info = catalogos(args.sucursales, rng)
+    hechos = ventas(sucursales, pizzas, args.ordenes, args.desde, args.hasta, rng)
+
+    engine = create_engine(args.url)
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    with engine.begin() as con:
+        for nombre, df in (("sucursales", sucursales), ("pizzas_info", info), ("pizzas", pizzas),
+                           ("ventas_totales", hechos)):
+            df.to_sql(nombre, con, if_exists="append", index=False, chunksize=50_000)
+    engine.dispose()
+    print(f"✅ {len(hechos):,} filas de ventas en {args.url} ({time.perf_counter() - t0:,.1f} s)")
+    print(f"   DB_URL={args.url}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
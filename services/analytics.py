@@ -1,9 +1,10 @@
 # services/analytics.py
 import math
 import pandas as pd
-from scipy import stats 
 import calendar
 
+# scipy se importa dentro de las funciones estadísticas: cuesta ~0.5 s en el arranque
+
 
 def monthly_means_by_branch(df: pd.DataFrame) -> pd.Series:
     # df esperado: sucursal, anio, mes, total_ventas (0 rellenado si faltan meses)
@@ -52,6 +53,7 @@ def t_test_two_branches(df: pd.DataFrame, a: str, b: str):
     if sales_a.empty or sales_b.empty:
         return {"t_stat": None, "p_value": None}
 
+    from scipy import stats
     t_stat, p_value = stats.ttest_ind(sales_a, sales_b, equal_var=False)  
     # equal_var=False = versión de Welch (más robusta)
     return {"t_stat": t_stat, "p_value": p_value}
@@ -104,8 +106,21 @@ import pandas as pd
 
 def calcular_kpis_generales(df: pd.DataFrame):
     """Calcula KPIs globales básicos."""
+    from data.schema import ORDER_KEY
     total_ventas = df["net"].sum()
-    total_ordenes = df["order_id"].nunique()
+    total_ordenes = df.groupby(list(ORDER_KEY)).ngroups
+    ticket_promedio = total_ventas / total_ordenes if total_ordenes > 0 else 0
+    return total_ventas, total_ordenes, ticket_promedio
+
+
+def calcular_kpis_aproximados(rollup, fecha_inicio=None, fecha_fin=None, sucursales=None):
+    """
+    Igual que calcular_kpis_generales pero desde el rollup mensual:
+    las órdenes se estiman combinando sketches HyperLogLog (error ~ rollup.error).
+    """
+    mask = rollup.mask(fecha_inicio, fecha_fin, sucursales)
+    total_ventas = float(rollup.table.loc[mask, "ventas"].sum())
+    total_ordenes = int(round(rollup.distinct_orders(fecha_inicio, fecha_fin, sucursales)))
     ticket_promedio = total_ventas / total_ordenes if total_ordenes > 0 else 0
     return total_ventas, total_ordenes, ticket_promedio
 
@@ -116,8 +131,8 @@ def calcular_kpis_generales(df: pd.DataFrame):
 # Comparar sucursales
 # =============================================
 def get_branch_comparison_data(fecha_inicio, fecha_fin, sucursales):
-    from data.queries import query_branch_monthly_sales
-    df = query_branch_monthly_sales(fecha_inicio, fecha_fin, sucursales)
+    from data.queries import cached_branch_monthly_sales
+    df = cached_branch_monthly_sales(fecha_inicio, fecha_fin, tuple(sorted(sucursales)))
 
     if df.empty:
         return df
@@ -155,16 +170,58 @@ def calcular_crecimiento_anual(df):
     Calcula ventas por año y porcentaje de crecimiento YoY.
     df: DataFrame con columna 'fecha_compra' y 'net'
     """
-    df = df.copy()
-    df["anio"] = df["fecha_compra"].dt.year
+    tabla = totales_anuales_comparables(df["fecha_compra"], df["net"])
+    return calcular_crecimiento_anual_desde_totales(tabla)
 
-    tabla = (
-        df.groupby("anio", as_index=False)["net"]
-          .sum()
-          .rename(columns={"net": "ventas"})
-    )
 
-    tabla["crecimiento"] = tabla["ventas"].pct_change() * 100
+def totales_anuales_comparables(fechas, ventas):
+    """
+    Ventas por año y, para el crecimiento, las del mismo tramo de días en el año
+    anterior: un año en curso (o el primero, si la historia empieza a mitad de año)
+    no se compara contra un año completo.
+    Devuelve anio, ventas, ventas_comparable, anterior_comparable, parcial.
+    """
+    fechas = pd.to_datetime(pd.Series(fechas).reset_index(drop=True))
+    ventas = pd.Series(ventas).reset_index(drop=True)
+    cols = ["anio", "ventas", "ventas_comparable", "anterior_comparable", "parcial"]
+    if fechas.empty:
+        return pd.DataFrame(columns=cols)
+
+    # Día del año como MMDD para que los bisiestos no desplacen el corte
+    diario = ventas.groupby([fechas.dt.year.rename("anio"), (fechas.dt.month * 100 + fechas.dt.day).rename("dia")]).sum()
+    inicio, fin = fechas.min(), fechas.max()
+    k_ini, k_fin = inicio.month * 100 + inicio.day, fin.month * 100 + fin.day
+
+    filas = []
+    for anio in range(inicio.year, fin.year + 1):
+        lo = k_ini if anio - 1 == inicio.year else 101
+        hi = k_fin if anio == fin.year else 1231
+        actual = diario.get(anio, pd.Series(dtype=float))
+        previo = diario.get(anio - 1, pd.Series(dtype=float)) if anio > inicio.year else None
+        en = lambda d: d[(d.index >= lo) & (d.index <= hi)].sum()
+        filas.append({
+            "anio": anio,
+            "ventas": float(actual.sum()),
+            "ventas_comparable": float(en(actual)),
+            "anterior_comparable": float(en(previo)) if previo is not None else float("nan"),
+            "parcial": (anio == inicio.year and k_ini != 101) or (anio == fin.year and k_fin != 1231),
+        })
+    return pd.DataFrame(filas, columns=cols)
+
+
+def calcular_crecimiento_anual_desde_totales(tabla):
+    """
+    Igual que calcular_crecimiento_anual pero a partir de ventas ya agregadas.
+    tabla: DataFrame con columnas 'anio' y 'ventas'. Si además trae
+    'ventas_comparable' y 'anterior_comparable' (mismo tramo del año anterior),
+    el crecimiento se calcula con ellas en lugar de años calendario completos.
+    """
+    tabla = tabla.sort_values("anio").reset_index(drop=True)
+    if {"ventas_comparable", "anterior_comparable"} <= set(tabla.columns):
+        base = tabla["anterior_comparable"].astype(float)
+        tabla["crecimiento"] = (tabla["ventas_comparable"] / base.where(base > 0) - 1) * 100
+    else:
+        tabla["crecimiento"] = tabla["ventas"].pct_change() * 100
     tabla["ventas_formato"] = tabla["ventas"].apply(lambda x: f"${x:,.2f}")
     tabla["crecimiento_formato"] = tabla["crecimiento"].apply(
         lambda x: "---" if pd.isna(x) else f"{x:.2f}%"
@@ -189,8 +246,9 @@ def calcular_pareto_productos(df):
 
 import pandas as pd
 
-def comparar_dos_sucursales(df_resumen):
+def comparar_dos_sucursales(df_resumen, formato: bool = True):
     # df_resumen TIENE columnas: "Sucursal" y "Ventas Totales"
+    # formato=False deja los importes y porcentajes numéricos (API)
     
     a = df_resumen.iloc[0]
     b = df_resumen.iloc[1]
@@ -201,7 +259,7 @@ def comparar_dos_sucursales(df_resumen):
     
 
     diferencia = ventas_a - ventas_b
-    porcentaje = (diferencia / ventas_b) * 100 if ventas_b != 0 else None
+    porcentaje = (diferencia / ventas_b) * 100 if ventas_b != 0 else float("nan")
     mejor = a["Sucursal"] if ventas_a > ventas_b else b["Sucursal"]
 
     tabla = pd.DataFrame([{
@@ -213,10 +271,45 @@ def comparar_dos_sucursales(df_resumen):
         "% Diferencia": round(porcentaje, 2),
         "Mejor Sucursal": mejor
     }])
+    if not formato:
+        return tabla
     
     tabla["Ventas A"] = tabla["Ventas A"].apply(lambda x: f"${x:,.2f}")
     tabla["Ventas B"] = tabla["Ventas B"].apply(lambda x: f"${x:,.2f}")
     tabla["Diferencia"] = tabla["Diferencia"].apply(lambda x: f"${x:,.2f}")
-    tabla["% Diferencia"] = tabla["% Diferencia"].apply(lambda x: f"{x:.2f}%")
+    tabla["% Diferencia"] = tabla["% Diferencia"].apply(lambda x: "---" if pd.isna(x) else f"{x:.2f}%")
+
+    return tabla
 
-    return tabla
\ No newline at end of file
+def comparar_n_sucursales(df_resumen, formato: bool = True):
+    """
+    Versión N-vías de comparar_dos_sucursales: cada sucursal contra la líder y
+    contra el promedio. df_resumen: columnas "Sucursal" y "Ventas Totales".
+    formato=False deja importes y porcentajes numéricos (API); NaN donde no aplica.
+    """
+    tabla = df_resumen.sort_values("Ventas Totales", ascending=False).reset_index(drop=True)
+    ventas = tabla["Ventas Totales"].astype(float)
+    lider = ventas.iloc[0]
+    promedio = ventas.mean()
+
+    tabla = pd.DataFrame({
+        "Rango": range(1, len(tabla) + 1),
+        "Sucursal": tabla["Sucursal"],
+        "Ventas": ventas,
+        "Participación": ventas / ventas.sum() * 100,
+        "Diferencia vs Líder": ventas - lider,
+        "% vs Líder": (ventas / lider - 1) * 100 if lider else ventas * float("nan"),
+        "% vs Promedio": (ventas / promedio - 1) * 100 if promedio else ventas * float("nan"),
+    })
+    if not formato:
+        return tabla
+
+    pesos = lambda x: f"${x:,.2f}"
+    pct = lambda x: "---" if pd.isna(x) else f"{x:.2f}%"
+    return tabla.assign(**{
+        "Ventas": tabla["Ventas"].apply(pesos),
+        "Participación": tabla["Participación"].apply(pct),
+        "Diferencia vs Líder": tabla["Diferencia vs Líder"].apply(pesos),
+        "% vs Líder": tabla["% vs Líder"].apply(pct),
+        "% vs Promedio": tabla["% vs Promedio"].apply(pct),
+    })
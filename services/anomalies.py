@@ -0,0 +1,217 @@
+# services/anomalies.py
+import threading
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from data.cache import tenant_resource
+from data.config import ANOMALY_MIN_REL, ANOMALY_THRESHOLD, ANOMALY_WEEKS
+from data.queries import query_daily_sales_since
+from data.versioning import get_table_version
+
+DIAS_SEMANA = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+MAD_A_SIGMA = 1.4826  # MAD → desviación estándar bajo normalidad
+# La sonda redondea SUM(net) a centavos y las sumas por día acumulan error de
+# punto flotante: diferencias menores no cuentan como edición
+TOLERANCIA_VENTAS = 0.05
+
+
+def _ventas(version: tuple) -> float:
+    """SUM(net) de la versión de ventas_totales (filas, max_key, max_id, ventas, unidades)."""
+    return float(version[3])
+
+
+# =============================================
+# Líneas base robustas por sucursal y día de la semana
+# =============================================
+# Las ventas diarias viven en una matriz sucursales × días. La línea base de un día
+# es la mediana (y la MAD) de los mismos días de la semana en las `weeks` semanas
+# previas, así que depende solo del pasado: al llegar filas nuevas basta con volver
+# a puntuar desde el primer día que cambió. Todas las sucursales se puntúan juntas.
+
+class AnomalyDetector:
+    """Estado incremental de ventas diarias, líneas base y z robustos."""
+
+    def __init__(self, weeks: int = ANOMALY_WEEKS, min_obs: int | None = None):
+        self.weeks = weeks
+        self.min_obs = min_obs or max(3, weeks // 2)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.sucursales = np.array([], dtype=object)
+        self.d0 = None                      # np.datetime64 del primer día
+        self.Y = np.empty((0, 0))           # ventas; NaN antes de la apertura de la sucursal
+        self.mediana = np.empty((0, 0))
+        self.escala = np.empty((0, 0))
+        self.z = np.empty((0, 0))
+        self.version = None
+        self.filas_previas = 0              # filas de ventas_totales anteriores a ultimo_dia
+        self.ventas_previas = 0.0           # y su importe (un UPDATE de net no cambia las filas)
+
+    # ---------- ingesta ----------
+    @property
+    def ultimo_dia(self):
+        return None if self.d0 is None else self.d0 + (self.Y.shape[1] - 1)
+
+    def _grow(self, sucursales, d_min, d_max):
+        nuevas = np.setdiff1d(np.asarray(sucursales, dtype=object), self.sucursales)
+        if len(nuevas):
+            self.sucursales = np.concatenate([self.sucursales, nuevas])
+        start = d_min if self.d0 is None else min(self.d0, d_min)
+        end = d_max if self.d0 is None else max(self.ultimo_dia, d_max)
+        shape = (len(self.sucursales), int((end - start).astype(int)) + 1)
+        if shape == self.Y.shape and start == self.d0:
+            return
+        off = 0 if self.d0 is None else int((self.d0 - start).astype(int))
+        for name in ("Y", "mediana", "escala", "z"):
+            old = getattr(self, name)
+            new = np.full(shape, np.nan)
+            new[:old.shape[0], off:off + old.shape[1]] = old
+            setattr(self, name, new)
+        self.d0 = start
+
+    def ingest(self, df: pd.DataFrame) -> int:
+        """
+        Escribe las ventas diarias (sucursal, fecha, total_ventas) en la matriz.
+        Devuelve la primera columna modificada (desde ahí hay que volver a puntuar).
+        """
+        if df.empty:
+            return self.Y.shape[1]
+        fechas = pd.to_datetime(df["fecha"]).to_numpy().astype("datetime64[D]")
+        self._grow(df["sucursal"].unique(), fechas.min(), fechas.max())
+
+        pos = {s: i for i, s in enumerate(self.sucursales)}
+        filas = df["sucursal"].map(pos).to_numpy(dtype=int)
+        cols = (fechas - self.d0).astype(int)
+        self.Y[filas, cols] = df["total_ventas"].to_numpy(dtype=float)
+
+        # Días sin ventas después de la apertura cuentan como 0 (p. ej. caída del POS)
+        abierta = np.fmax.accumulate(~np.isnan(self.Y), axis=1)
+        self.Y[abierta & np.isnan(self.Y)] = 0.0
+        return int(cols.min())
+
+    # ---------- puntuación ----------
+    def score_from(self, start: int = 0):
+        """Recalcula mediana, escala y z robusto para las columnas >= start."""
+        T = self.Y.shape[1]
+        if start >= T:
+            return
+        t = np.arange(start, T)
+        idx = t[None, :] - 7 * np.arange(1, self.weeks + 1)[:, None]   # (W, T')
+        hist = self.Y[:, np.clip(idx, 0, None)]                          # (B, W, T')
+        hist[:, idx < 0] = np.nan
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # ventanas sin historia
+            mediana = np.nanmedian(hist, axis=1)
+            mad = np.nanmedian(np.abs(hist - mediana[:, None, :]), axis=1)
+
+        # Con pocas semanas la MAD puede salir casi cero por azar: se acota por abajo
+        escala = np.maximum(MAD_A_SIGMA * mad, ANOMALY_MIN_REL * np.abs(mediana))
+        escala[(escala == 0) | ((~np.isnan(hist)).sum(axis=1) < self.min_obs)] = np.nan
+
+        self.mediana[:, start:] = mediana
+        self.escala[:, start:] = escala
+        self.z[:, start:] = (self.Y[:, start:] - mediana) / escala
+
+    def refresh(self, version: tuple):
+        """
+        Pone el estado al día con la versión de ventas_totales. Solo se consultan los
+        días desde el último cargado (que pudo estar incompleto). Si las filas o el
+        importe anteriores a ese día ya no suman lo mismo (ventas subidas tarde tras
+        una caída del POS, borrados, importes corregidos) o la tabla perdió filas,
+        se reconstruye todo.
+        """
+        with self._lock:
+            if version == self.version:
+                return
+            df = None
+            if self.d0 is not None and self.version is not None and version[0] >= self.version[0]:
+                df = query_daily_sales_since(str(self.ultimo_dia))
+                # version[0] se sondeó antes de la consulta: si entraron filas entre
+                # ambas, la cuenta no cuadra y se reconstruye (caro, pero correcto)
+                if (version[0] - int(df["filas"].sum()) != self.filas_previas
+                        or abs(_ventas(version) - float(df["total_ventas"].sum()) - self.ventas_previas)
+                        > TOLERANCIA_VENTAS):
+                    df = None
+            if df is None:
+                self._reset()
+                df = query_daily_sales_since(None)
+            start = self.ingest(df)
+            if not df.empty:
+                tope = pd.Timestamp(self.ultimo_dia)
+                previas = df[pd.to_datetime(df["fecha"]) < tope]
+                self.filas_previas += int(previas["filas"].sum())
+                self.ventas_previas += float(previas["total_ventas"].sum())
+            self.score_from(start)
+            self.version = version
+
+    # ---------- consultas ----------
+    def _cols(self, fecha_inicio=None, fecha_fin=None) -> slice:
+        if self.d0 is None:
+            return slice(0, 0)
+        lo = 0 if fecha_inicio is None else max(0, int((np.datetime64(fecha_inicio, "D") - self.d0).astype(int)))
+        hi = self.Y.shape[1] if fecha_fin is None else int((np.datetime64(fecha_fin, "D") - self.d0).astype(int)) + 1
+        return slice(lo, max(lo, hi))
+
+    def _rows(self, sucursales=None) -> np.ndarray:
+        if sucursales is None:
+            return np.arange(len(self.sucursales))
+        return np.flatnonzero(np.isin(self.sucursales, list(sucursales)))
+
+    def anomalies(self, fecha_inicio=None, fecha_fin=None, sucursales=None,
+                  threshold: float = ANOMALY_THRESHOLD) -> pd.DataFrame:
+        """
+        Días marcados (|z| >= threshold). Columnas: sucursal, fecha, dia_semana,
+        ventas, esperado, z, tipo ("pico" / "caída").
+        """
+        cols, rows = self._cols(fecha_inicio, fecha_fin), self._rows(sucursales)
+        z = self.z[rows, cols]
+        with np.errstate(invalid="ignore"):
+            r, c = np.nonzero(np.abs(z) >= threshold)
+        fechas = self.d0 + (cols.start + c) if len(c) else np.array([], dtype="datetime64[D]")
+        out = pd.DataFrame({
+            "sucursal": self.sucursales[rows[r]],
+            "fecha": pd.to_datetime(fechas),
+            "ventas": self.Y[rows, cols][r, c],
+            "esperado": self.mediana[rows, cols][r, c],
+            "z": z[r, c],
+        })
+        out.insert(2, "dia_semana", out["fecha"].dt.dayofweek.map(dict(enumerate(DIAS_SEMANA))))
+        out["tipo"] = np.where(out["z"] > 0, "pico", "caída")
+        return out.sort_values("fecha", ascending=False).reset_index(drop=True)
+
+    def series(self, sucursal, fecha_inicio=None, fecha_fin=None,
+               threshold: float = ANOMALY_THRESHOLD) -> pd.DataFrame:
+        """Serie diaria de una sucursal con su banda esperada. Columnas: fecha, ventas, esperado, banda_inf, banda_sup, z."""
+        cols, rows = self._cols(fecha_inicio, fecha_fin), self._rows([sucursal])
+        if not len(rows):
+            return pd.DataFrame(columns=["fecha", "ventas", "esperado", "banda_inf", "banda_sup", "z"])
+        i = rows[0]
+        esperado, escala = self.mediana[i, cols], self.escala[i, cols]
+        out = pd.DataFrame({
+            "fecha": pd.to_datetime(self.d0 + np.arange(cols.start, cols.stop)),
+            "ventas": self.Y[i, cols],
+            "esperado": esperado,
+            "banda_inf": np.maximum(esperado - threshold * escala, 0),
+            "banda_sup": esperado + threshold * escala,
+            "z": self.z[i, cols],
+        })
+        return out.dropna(subset=["ventas"]).reset_index(drop=True)
+
+
+@tenant_resource
+def _detector() -> AnomalyDetector:
+    return AnomalyDetector()
+
+
+def get_anomaly_detector() -> AnomalyDetector:
+    """Detector compartido por las sesiones de la franquicia, al día con la versión vigente de ventas_totales."""
+    det = _detector()
+    version = get_table_version("ventas_totales")
+    if det.version != version:
+        det.refresh(version)
+        _detector.remedir()  # la matriz crece en su lugar: se vuelve a medir para el presupuesto
+    return det
@@ -0,0 +1,165 @@
+# services/basket.py
+import numpy as np
+import pandas as pd
+
+from data.cache import versioned_cache
+from data.dimensions import get_dimensions
+from data.factstore import get_fact_store
+
+MIN_SUPPORT = 0.005   # fracción mínima de órdenes que deben contener el conjunto
+MAX_PARES_TRIPLES = 2000  # pares frecuentes (los de mayor soporte) que se extienden a triples
+
+
+# =============================================
+# Matriz dispersa orden × tipo de pizza
+# =============================================
+def basket_matrix(df: pd.DataFrame, items: np.ndarray):
+    """
+    Matriz binaria CSR (órdenes × productos): 1 si la orden contiene el producto.
+    Una orden es el par (sucursal, order_id). `items` trae el producto de cada fila de `df`.
+    Devuelve (matriz, nombres_de_productos).
+    """
+    from scipy import sparse
+
+    ordenes = df.groupby(["sucursal", "order_id"], sort=False).ngroup().to_numpy()
+    item_codes, nombres = pd.factorize(pd.Series(items), sort=True)
+    conocido = item_codes >= 0  # pizzas sin catálogo no entran a la canasta
+    ordenes, item_codes = pd.factorize(ordenes[conocido])[0], item_codes[conocido]
+    X = sparse.csr_matrix(
+        (np.ones(len(ordenes), dtype=np.int32), (ordenes, item_codes)),
+        shape=(int(ordenes.max()) + 1 if len(ordenes) else 0, len(nombres)),
+    )
+    X.sum_duplicates()
+    X.data[:] = 1  # varias líneas del mismo producto cuentan una vez
+    return X, np.asarray(nombres, dtype=object)
+
+
+# =============================================
+# Conjuntos frecuentes (Apriori de dos niveles)
+# =============================================
+class BasketResult:
+    """
+    Soportes de productos, pares y triples frecuentes de un conjunto de órdenes.
+    Los pares salen de XᵀX; los triples solo se cuentan para pares frecuentes
+    (propiedad Apriori: todo subconjunto de un conjunto frecuente es frecuente).
+    """
+
+    def __init__(self, X, nombres: np.ndarray, min_support: float = MIN_SUPPORT):
+        self.nombres = nombres
+        self.n_ordenes = X.shape[0]
+        self.min_support = min_support
+        min_count = max(1, int(np.ceil(min_support * self.n_ordenes)))
+
+        XT = X.T.tocsr()
+        self.conteo_item = np.asarray(X.sum(axis=0)).ravel()
+
+        # Pares: coocurrencias de todos los productos en un solo producto disperso
+        C = (XT @ X).toarray()
+        a, b = np.nonzero(np.triu(C, k=1) >= min_count)
+        self.pares = pd.DataFrame({"a": a, "b": b, "conteo": C[a, b]})
+
+        # Triples: órdenes con el par (producto elemento a elemento de columnas) × X
+        self.triples = pd.DataFrame(columns=["a", "b", "c", "conteo"], dtype=int)
+        frecuentes = self.conteo_item >= min_count
+        pares = self.pares.nlargest(MAX_PARES_TRIPLES, "conteo")
+        if len(pares):
+            XC = X.tocsc()
+            P = XC[:, pares["a"].to_numpy()].multiply(XC[:, pares["b"].to_numpy()])
+            T = (P.T.tocsr() @ X).toarray()                 # (pares, productos)
+            T[:, ~frecuentes] = 0
+            # c > b evita contar el mismo triple tres veces
+            T[np.arange(T.shape[1])[None, :] <= pares["b"].to_numpy()[:, None]] = 0
+            fila, c = np.nonzero(T >= min_count)
+            self.triples = pd.DataFrame({
+                "a": pares["a"].to_numpy()[fila],
+                "b": pares["b"].to_numpy()[fila],
+                "c": c,
+                "conteo": T[fila, c],
+            })
+
+    def _soporte(self, conteo):
+        return conteo / self.n_ordenes if self.n_ordenes else np.zeros(len(conteo))
+
+    def pairs(self) -> pd.DataFrame:
+        """Pares frecuentes. Columnas: producto_a, producto_b, ordenes, soporte, lift."""
+        p = self.pares
+        sa, sb = self._soporte(self.conteo_item[p["a"]]), self._soporte(self.conteo_item[p["b"]])
+        soporte = self._soporte(p["conteo"].to_numpy())
+        return pd.DataFrame({
+            "producto_a": self.nombres[p["a"]],
+            "producto_b": self.nombres[p["b"]],
+            "ordenes": p["conteo"].to_numpy(),
+            "soporte": soporte,
+            "lift": soporte / (sa * sb),
+        }).sort_values("soporte", ascending=False, ignore_index=True)
+
+    def rules(self, min_confidence: float = 0.0, min_lift: float = 0.0) -> pd.DataFrame:
+        """
+        Reglas antecedente → consecuente de pares (en ambos sentidos) y triples ({a, b} → c, etc.).
+        Columnas: antecedente, consecuente, tamano, ordenes, soporte, confianza, lift.
+        """
+        partes = []
+        p = self.pares
+        for ant, con in (("a", "b"), ("b", "a")):
+            partes.append(pd.DataFrame({
+                "ant": [(i,) for i in p[ant]],
+                "con": p[con].to_numpy(),
+                "conteo": p["conteo"].to_numpy(),
+                "conteo_ant": self.conteo_item[p[ant]],
+            }))
+
+        t = self.triples
+        if len(t):
+            C = pd.Series(self.pares["conteo"].to_numpy(),
+                          index=pd.MultiIndex.from_arrays([self.pares["a"], self.pares["b"]]))
+            for x, y, con in (("a", "b", "c"), ("a", "c", "b"), ("b", "c", "a")):
+                llaves = pd.MultiIndex.from_arrays([t[x], t[y]])
+                partes.append(pd.DataFrame({
+                    "ant": list(zip(t[x], t[y])),
+                    "con": t[con].to_numpy(),
+                    "conteo": t["conteo"].to_numpy(),
+                    "conteo_ant": C.reindex(llaves).to_numpy(),
+                }))
+
+        r = pd.concat(partes, ignore_index=True).dropna(subset=["conteo_ant"])
+        if r.empty:
+            return pd.DataFrame(columns=["antecedente", "consecuente", "tamano", "ordenes",
+                                         "soporte", "confianza", "lift"])
+        confianza = r["conteo"].to_numpy() / r["conteo_ant"].to_numpy(dtype=float)
+        lift = confianza / self._soporte(self.conteo_item[r["con"].to_numpy()])
+        out = pd.DataFrame({
+            "antecedente": [" + ".join(self.nombres[list(a)]) for a in r["ant"]],
+            "consecuente": self.nombres[r["con"].to_numpy()],
+            "tamano": r["ant"].map(len).to_numpy() + 1,
+            "ordenes": r["conteo"].to_numpy(),
+            "soporte": self._soporte(r["conteo"].to_numpy()),
+            "confianza": confianza,
+            "lift": lift,
+        })
+        out = out[(out["confianza"] >= min_confidence) & (out["lift"] >= min_lift)]
+        return out.sort_values(["lift", "confianza"], ascending=False, ignore_index=True)
+
+
+# =============================================
+# Resultados precalculados por versión de datos y filtros
+# =============================================
+@versioned_cache("ventas_totales", "pizzas", "pizzas_info")
+def _basket(fecha_inicio, fecha_fin, sucursales: tuple, min_support: float) -> BasketResult:
+    df = get_fact_store().frame(["sucursal", "order_id", "pizza_id", "fecha_compra"])
+    mask = np.ones(len(df), dtype=bool)
+    if fecha_inicio:
+        mask &= (df["fecha_compra"] >= pd.Timestamp(fecha_inicio)).to_numpy()
+    if fecha_fin:
+        mask &= (df["fecha_compra"] < pd.Timestamp(fecha_fin) + pd.Timedelta(days=1)).to_numpy()
+    if sucursales:
+        mask &= df["sucursal"].isin(sucursales).to_numpy()
+    df = df[mask]
+
+    X, nombres = basket_matrix(df, get_dimensions().pizza_names(df["pizza_id"]))
+    return BasketResult(X, nombres, min_support)
+
+
+def get_basket_analysis(fecha_inicio=None, fecha_fin=None, sucursales=None,
+                        min_support: float = MIN_SUPPORT) -> BasketResult:
+    """Análisis de canasta (tipos de pizza comprados juntos) para el filtro dado."""
+    return _basket(fecha_inicio, fecha_fin, sucursales, float(min_support))
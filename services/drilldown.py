@@ -0,0 +1,64 @@
+# services/drilldown.py
+from calendar import monthrange
+
+import pandas as pd
+
+from data.queries import cached_branch_daily_sales, cached_branch_hourly_sales
+from data.rollups import get_monthly_rollup
+
+# =============================================
+# Jerarquía de agregados: mes → día → hora
+# =============================================
+# El nivel "mes" sale del rollup en memoria (sin consulta). Los niveles finos solo
+# se consultan para la ventana del zoom (un mes, o un día) y quedan cacheados por
+# ventana, así la vista por defecto no paga el detalle diario/horario.
+
+NIVELES = ("mes", "dia", "hora")
+
+
+def month_window(anio: int, mes: int) -> tuple[str, str]:
+    """Primer y último día del mes como 'YYYY-MM-DD'."""
+    return f"{anio}-{mes:02d}-01", f"{anio}-{mes:02d}-{monthrange(anio, mes)[1]:02d}"
+
+
+def monthly_level(fecha_inicio: str, fecha_fin: str, sucursales) -> pd.DataFrame:
+    """Columnas: sucursal, anio, mes, periodo, total_ventas."""
+    rollup = get_monthly_rollup()
+    t = rollup.table[rollup.mask(fecha_inicio, fecha_fin, sucursales)]
+    out = t[["sucursal", "anio", "mes"]].copy()
+    out["total_ventas"] = t["ventas"].to_numpy()
+    out["periodo"] = out["anio"].astype(str) + "-" + out["mes"].astype(str).str.zfill(2)
+    return out.reset_index(drop=True)
+
+
+def daily_level(anio: int, mes: int, sucursales) -> pd.DataFrame:
+    """Ventas diarias del mes elegido. Columnas: sucursal, fecha, total_ventas, ordenes."""
+    fi, ff = month_window(anio, mes)
+    df = cached_branch_daily_sales(fi, ff, tuple(sorted(sucursales)))
+    if not df.empty:
+        df["fecha"] = pd.to_datetime(df["fecha"])
+    return df
+
+
+def hourly_level(fecha_inicio: str, fecha_fin: str, sucursales) -> pd.DataFrame:
+    """Ventas por día y hora en la ventana del zoom. Columnas: sucursal, fecha, hora, total_ventas, ordenes."""
+    df = cached_branch_hourly_sales(fecha_inicio, fecha_fin, tuple(sorted(sucursales)))
+    if not df.empty:
+        df["fecha"] = pd.to_datetime(df["fecha"])
+        df["hora"] = df["hora"].astype(int)
+    return df
+
+
+def peak_hours(df_hora: pd.DataFrame, top: int = 3) -> pd.DataFrame:
+    """Horas con más ventas promedio por día, por sucursal (para hornos y personal)."""
+    if df_hora.empty:
+        return df_hora
+    dias = df_hora.groupby("sucursal")["fecha"].nunique()
+    por_hora = df_hora.groupby(["sucursal", "hora"], as_index=False)["total_ventas"].sum()
+    por_hora["promedio_diario"] = por_hora["total_ventas"] / por_hora["sucursal"].map(dias)
+    return (
+        por_hora.sort_values(["sucursal", "promedio_diario"], ascending=[True, False])
+        .groupby("sucursal")
+        .head(top)
+        .reset_index(drop=True)
+    )
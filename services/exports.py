@@ -0,0 +1,227 @@
+# services/exports.py
+import io
+import os
+import tempfile
+from typing import Callable, Iterable, Iterator
+
+import pandas as pd
+
+from data.config import CACHE_DIR
+
+EXPORT_DIR = os.path.join(CACHE_DIR, "exports")
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "50000"))
+EXCEL_MAX_ROWS = int(os.getenv("EXCEL_MAX_ROWS", "100000"))  # Excel solo para resultados chicos
+
+# formato -> (mime, extensión)
+FORMATOS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+
+class ExportError(ValueError):
+    """Exportación no posible (formato desconocido, demasiado grande para Excel, etc.)."""
+
+
+# ============================================
+# 🧱 CODIFICADORES POR BLOQUES
+# ============================================
+# Todos reciben un iterable de DataFrames y entregan bytes conforme avanzan, así
+# un extracto de millones de filas nunca vive completo en memoria (salvo Excel,
+# que por formato se arma al final y por eso se limita a EXCEL_MAX_ROWS).
+
+def _iter_csv(chunks: Iterable[pd.DataFrame]) -> Iterator[bytes]:
+    primero = True
+    for df in chunks:
+        # BOM en el primer bloque para que Excel abra bien los acentos
+        yield df.to_csv(index=False, header=primero).encode("utf-8-sig" if primero else "utf-8")
+        primero = False
+
+
+class _Drain(io.RawIOBase):
+    """Sumidero de escritura que se vacía cada vez que se leen sus bytes."""
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._buf += b
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._pos
+
+    def take(self) -> bytes:
+        data, self._buf = bytes(self._buf), bytearray()
+        return data
+
+
+def _iter_parquet(chunks: Iterable[pd.DataFrame]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink, writer = _Drain(), None
+    try:
+        for df in chunks:
+            if writer is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                writer = pq.ParquetWriter(sink, table.schema, compression="snappy")
+            else:
+                table = pa.Table.from_pandas(df, schema=writer.schema, preserve_index=False)
+            writer.write_table(table)  # un row group por bloque
+            yield sink.take()
+    finally:
+        if writer is not None:
+            writer.close()
+    yield sink.take()
+
+
+def _iter_xlsx(chunks: Iterable[pd.DataFrame]) -> Iterator[bytes]:
+    partes, filas = [], 0
+    for df in chunks:
+        filas += len(df)
+        if filas > EXCEL_MAX_ROWS:
+            raise ExportError(f"Excel admite hasta {EXCEL_MAX_ROWS:,} filas; usa CSV o Parquet")
+        partes.append(df)
+    buf = io.BytesIO()
+    try:
+        with pd.ExcelWriter(buf) as writer:
+            (pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()).to_excel(
+                writer, index=False, sheet_name="datos")
+    except ImportError:
+        raise ExportError("Excel requiere openpyxl o xlsxwriter instalado")
+    yield buf.getvalue()
+
+
+_ENCODERS = {"csv": _iter_csv, "parquet": _iter_parquet, "xlsx": _iter_xlsx}
+
+
+def encode_chunks(chunks: Iterable[pd.DataFrame], formato: str,
+                  progress: Callable[[int, int | None], None] | None = None,
+                  total: int | None = None) -> Iterator[bytes]:
+    """
+    Codifica bloques de DataFrame en `formato` (csv, parquet, xlsx).
+    `progress(filas_procesadas, total)` se llama después de cada bloque.
+    """
+    if formato not in _ENCODERS:
+        raise ExportError(f"Formato desconocido: {formato}. Usa uno de {tuple(FORMATOS)}")
+
+    def contados():
+        filas = 0
+        for df in chunks:
+            filas += len(df)
+            yield df
+            if progress:
+                progress(filas, total)
+
+    return _ENCODERS[formato](contados())
+
+
+def frame_chunks(df: pd.DataFrame, size: int = EXPORT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    for start in range(0, max(len(df), 1), size):
+        yield df.iloc[start:start + size]
+
+
+def file_name(base: str, formato: str) -> str:
+    return f"{base}.{FORMATOS[formato][1]}"
+
+
+# ============================================
+# 📊 DATOS DE CADA VISTA
+# ============================================
+def _participacion(fecha_inicio=None, fecha_fin=None, sucursales=(), top_n=5):
+    from data.config import DISTINCT_MODE
+    from data.dimensions import get_dimensions
+    if DISTINCT_MODE == "hll" or fecha_inicio or sucursales:
+        from data.rollups import get_monthly_rollup
+        df = get_monthly_rollup().branch_summary(fecha_inicio, fecha_fin, sucursales)
+    else:
+        from data.queries import get_ventas
+        from services.parallel import aggregate_facts
+        df = aggregate_facts(get_ventas())["por_sucursal"]
+    dims = get_dimensions()
+    df = df.copy()
+    df.insert(1, "nombre", dims.branch_labels(df["sucursal"], "nombre"))
+    df.insert(2, "ciudad", dims.branch_labels(df["sucursal"], "ciudad"))
+    df["porcentaje"] = df["ventas_totales"] / df["ventas_totales"].sum() * 100
+    return df
+
+
+def _pareto_productos(fecha_inicio=None, fecha_fin=None, sucursales=(), top_n=5):
+    from services.pareto import get_pareto_productos_abc
+    return get_pareto_productos_abc(fecha_inicio, fecha_fin, sucursales).to_frame()
+
+
+def _pareto_sucursales(fecha_inicio=None, fecha_fin=None, sucursales=(), top_n=5):
+    from services.pareto import get_pareto_sucursales_abc
+    return get_pareto_sucursales_abc(fecha_inicio, fecha_fin, sucursales).to_frame(name_col="nombre")
+
+
+def _comparacion(fecha_inicio=None, fecha_fin=None, sucursales=(), top_n=5):
+    from data.dimensions import get_dimensions
+    from services.analytics import get_branch_comparison_data
+    if not (fecha_inicio and sucursales):
+        raise ExportError("La comparación requiere rango de fechas y sucursales")
+    df = get_branch_comparison_data(fecha_inicio, fecha_fin, list(sucursales))
+    if not df.empty:
+        df.insert(1, "nombre", get_dimensions().branch_labels(df["sucursal"], "nombre"))
+    return df
+
+
+def _top_pizzas(fecha_inicio=None, fecha_fin=None, sucursales=(), top_n=5):
+    from data.queries import cached_top_pizzas
+    return cached_top_pizzas(int(top_n), tuple(sorted(sucursales)))
+
+
+VISTAS = {
+    "participacion": _participacion,
+    "pareto_productos": _pareto_productos,
+    "pareto_sucursales": _pareto_sucursales,
+    "comparacion": _comparacion,
+    "top_pizzas": _top_pizzas,
+}
+
+
+def export_view(vista: str, formato: str, fecha_inicio=None, fecha_fin=None,
+                sucursales=(), top_n: int = 5) -> Iterator[bytes]:
+    """Bytes del agregado que muestra `vista` (ver VISTAS) con los mismos filtros."""
+    if vista not in VISTAS:
+        raise ExportError(f"Vista desconocida: {vista}. Usa una de {tuple(VISTAS)}")
+    df = VISTAS[vista](fecha_inicio, fecha_fin, tuple(sucursales), top_n)
+    return encode_chunks(frame_chunks(df), formato, total=len(df))
+
+
+# ============================================
+# 📥 EXTRACTO CRUDO DE ventas_totales
+# ============================================
+def export_ventas(formato: str, fecha_inicio=None, fecha_fin=None, sucursales=(),
+                  progress: Callable[[int, int | None], None] | None = None,
+                  chunksize: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+    """Filas crudas filtradas, leídas con cursor de servidor y codificadas por bloques."""
+    from data.queries import count_ventas_slice, iter_ventas_slice
+    total = count_ventas_slice(fecha_inicio, fecha_fin, sucursales) if progress else None
+    if formato == "xlsx" and (total if total is not None else count_ventas_slice(
+            fecha_inicio, fecha_fin, sucursales)) > EXCEL_MAX_ROWS:
+        raise ExportError(f"Excel admite hasta {EXCEL_MAX_ROWS:,} filas; usa CSV o Parquet")
+    chunks = iter_ventas_slice(fecha_inicio, fecha_fin, sucursales, chunksize=chunksize)
+    return encode_chunks(chunks, formato, progress=progress, total=total)
+
+
+def spool_to_file(data: Iterable[bytes], suffix: str = "") -> str:
+    """Escribe el flujo a un archivo temporal en disco (para st.download_button) y devuelve su ruta."""
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix="export-", suffix=suffix, dir=EXPORT_DIR)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            for parte in data:
+                fh.write(parte)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
@@ -0,0 +1,182 @@
+# services/forecast.py
+import numpy as np
+import pandas as pd
+
+from data.cache import tenant_resource
+from data.rollups import get_monthly_rollup
+
+MODELOS = ("seasonal_naive", "holt", "tendencia_lineal")
+_GRID = np.linspace(0.05, 0.95, 10)
+SEASON = 12
+
+
+# =============================================
+# Serie mensual por sucursal como matriz
+# =============================================
+def ultimo_periodo_completo(rollup):
+    """Último mes completo del rollup: el del último día con ventas cuenta solo si ese día cierra el mes."""
+    periodo = int((rollup.table["anio"] * 12 + rollup.table["mes"] - 1).max())
+    if rollup.ultimo_dia is not None and not pd.Timestamp(rollup.ultimo_dia).is_month_end:
+        periodo -= 1
+    return periodo
+
+
+def branch_month_matrix(table: pd.DataFrame, ultimo_periodo: int | None = None):
+    """
+    Convierte el rollup (sucursal, anio, mes, ventas) en una matriz sucursales × meses
+    contigua hasta `ultimo_periodo` (meses sin ventas = 0; antes de la apertura de
+    cada sucursal, NaN). Sucursales sin ningún mes quedan fuera.
+    Devuelve (matriz, sucursales, primer_periodo).
+    """
+    periodo = (table["anio"] * 12 + table["mes"] - 1).to_numpy()
+    if ultimo_periodo is not None:
+        table, periodo = table[periodo <= ultimo_periodo], periodo[periodo <= ultimo_periodo]
+    if not len(periodo):
+        return np.empty((0, 0)), np.array([]), 0
+    p0 = int(periodo.min())
+    suc_codes, sucursales = pd.factorize(table["sucursal"], sort=True)
+    Y = np.zeros((len(sucursales), int(periodo.max()) - p0 + 1))
+    np.add.at(Y, (suc_codes, periodo - p0), table["ventas"].to_numpy(dtype=float))
+
+    # Antes del primer mes con ventas la sucursal no existía: no es una venta de 0
+    abierta = np.maximum.accumulate(Y != 0, axis=1)
+    Y[~abierta] = np.nan
+    con_historia = abierta.any(axis=1)
+    return Y[con_historia], np.asarray(sucursales)[con_historia], p0
+
+
+def _inicio(Y: np.ndarray) -> np.ndarray:
+    """Primer mes observado de cada sucursal (columnas previas en NaN)."""
+    return np.argmax(~np.isnan(Y), axis=1)
+
+
+# =============================================
+# Modelos vectorizados (todas las sucursales a la vez)
+# =============================================
+def fit_seasonal_naive(Y: np.ndarray) -> dict:
+    base = Y[:, -SEASON:] if Y.shape[1] >= SEASON else Y[:, -1:]
+    # Sucursal con menos de una temporada: los meses sin historia repiten el último
+    return {"ultima_temporada": np.where(np.isnan(base), Y[:, -1:], base)}
+
+
+def predict_seasonal_naive(params: dict, h: int) -> np.ndarray:
+    base = params["ultima_temporada"]
+    idx = np.arange(h) % base.shape[1]
+    return base[:, idx]
+
+
+def fit_linear_trend(Y: np.ndarray) -> dict:
+    """Mínimos cuadrados por sucursal sobre sus meses observados."""
+    obs = ~np.isnan(Y)
+    y = np.where(obs, Y, 0.0)
+    t = np.broadcast_to(np.arange(Y.shape[1], dtype=float), Y.shape)
+    n = obs.sum(axis=1)
+    t_media = (t * obs).sum(axis=1) / n
+    y_media = y.sum(axis=1) / n
+    tc = np.where(obs, t - t_media[:, None], 0.0)
+    den = (tc ** 2).sum(axis=1)
+    pendiente = np.divide((tc * (y - y_media[:, None])).sum(axis=1), den,
+                          out=np.zeros(len(Y)), where=den > 0)
+    intercepto = y_media - pendiente * t_media
+    return {"pendiente": pendiente, "intercepto": intercepto, "n": Y.shape[1]}
+
+
+def predict_linear_trend(params: dict, h: int) -> np.ndarray:
+    t = params["n"] + np.arange(h)
+    return params["intercepto"][:, None] + params["pendiente"][:, None] * t[None, :]
+
+
+def fit_holt(Y: np.ndarray, grid: np.ndarray = _GRID) -> dict:
+    """
+    Suavizamiento exponencial de Holt (nivel + tendencia). Se prueban todas las
+    combinaciones (alpha, beta) de `grid` en paralelo con broadcasting y se elige,
+    por sucursal, la de menor error cuadrático a un paso. Cada sucursal arranca
+    en su primer mes observado.
+    """
+    n_b, T = Y.shape
+    a = grid[:, None, None]           # (G, 1, 1)
+    b = grid[None, :, None]           # (1, G, 1)
+    shape = (len(grid), len(grid), n_b)
+
+    filas, t0 = np.arange(n_b), _inicio(Y)
+    t1 = np.minimum(t0 + 1, T - 1)
+    y0 = Y[filas, t0]
+    nivel = np.broadcast_to(y0, shape).copy()
+    tendencia = np.broadcast_to(np.where(t1 > t0, Y[filas, t1] - y0, 0.0), shape).copy()
+    sse = np.zeros(shape)
+
+    for t in range(1, T):
+        activa = t > t0               # (B,): antes del arranque el estado no se mueve
+        y = Y[:, t]
+        pred = nivel + tendencia
+        sse += np.where(activa, (y - pred) ** 2, 0.0)
+        nuevo_nivel = a * y + (1 - a) * pred
+        tendencia = np.where(activa, b * (nuevo_nivel - nivel) + (1 - b) * tendencia, tendencia)
+        nivel = np.where(activa, nuevo_nivel, nivel)
+
+    flat = sse.reshape(-1, n_b)
+    best = flat.argmin(axis=0)
+    cols = np.arange(n_b)
+    ia, ib = np.unravel_index(best, (len(grid), len(grid)))
+    return {
+        "alpha": grid[ia],
+        "beta": grid[ib],
+        "nivel": nivel.reshape(-1, n_b)[best, cols],
+        "tendencia": tendencia.reshape(-1, n_b)[best, cols],
+        "rmse": np.sqrt(flat[best, cols] / np.maximum(T - 1 - t0, 1)),
+    }
+
+
+def predict_holt(params: dict, h: int) -> np.ndarray:
+    pasos = np.arange(1, h + 1)
+    return params["nivel"][:, None] + params["tendencia"][:, None] * pasos[None, :]
+
+
+_FIT = {"seasonal_naive": fit_seasonal_naive, "holt": fit_holt, "tendencia_lineal": fit_linear_trend}
+_PREDICT = {"seasonal_naive": predict_seasonal_naive, "holt": predict_holt, "tendencia_lineal": predict_linear_trend}
+
+
+# =============================================
+# Modelo ajustado (cacheado por versión de datos)
+# =============================================
+class BranchForecaster:
+    """Parámetros ajustados de los tres modelos para todas las sucursales."""
+
+    def __init__(self, Y: np.ndarray, sucursales: np.ndarray, p0: int):
+        self.sucursales = sucursales
+        self.ultimo_periodo = p0 + Y.shape[1] - 1
+        self.params = {m: _FIT[m](Y) for m in MODELOS}
+        self._pos = {s: i for i, s in enumerate(sucursales)}
+
+    def predict(self, h: int = 3, modelo: str = "holt", sucursales=None) -> pd.DataFrame:
+        """Pronóstico de los próximos `h` meses. Columnas: sucursal, anio, mes, periodo, pronostico."""
+        if modelo not in _PREDICT:
+            raise ValueError(f"Modelo desconocido: {modelo}. Usa uno de {MODELOS}")
+        pred = np.maximum(_PREDICT[modelo](self.params[modelo], h), 0)  # ventas no negativas
+
+        filas = np.arange(len(self.sucursales))
+        if sucursales is not None:
+            filas = np.array([self._pos[s] for s in sucursales if s in self._pos], dtype=int)
+
+        periodos = self.ultimo_periodo + 1 + np.arange(h)
+        out = pd.DataFrame({
+            "sucursal": np.repeat(self.sucursales[filas], h),
+            "anio": np.tile(periodos // 12, len(filas)),
+            "mes": np.tile(periodos % 12 + 1, len(filas)),
+            "pronostico": pred[filas].reshape(-1),
+        })
+        out["periodo"] = out["anio"].astype(str) + "-" + out["mes"].astype(str).str.zfill(2)
+        return out
+
+
+@tenant_resource
+def _fit_forecaster(version) -> BranchForecaster:
+    # El mes en curso está incompleto: ajustarlo como un mes bajo hunde las proyecciones
+    rollup = get_monthly_rollup()
+    Y, sucursales, p0 = branch_month_matrix(rollup.table, ultimo_periodo_completo(rollup))
+    return BranchForecaster(Y, sucursales, p0)
+
+
+def get_branch_forecaster() -> BranchForecaster:
+    """Modelos ajustados sobre el rollup mensual vigente (se reajustan solo si cambian los datos)."""
+    return _fit_forecaster(get_monthly_rollup().version)
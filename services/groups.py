@@ -0,0 +1,215 @@
+# services/groups.py
+import numpy as np
+import pandas as pd
+
+from data.config import BRANCH_MATURITY_MONTHS
+
+# scipy se importa dentro de prueba_grupos (mismo motivo que en services/analytics.py)
+
+RESTO = "Resto"
+ANTIGUEDAD = "antiguedad"
+COHORTES = "cohortes"
+
+# Columnas de la dimensión sucursales que identifican, no agrupan
+_NO_AGRUPABLES = {"id_sucursal", "nombre", "label"}
+
+
+# =============================================
+# Definiciones de grupos (id de sucursal -> grupo)
+# =============================================
+# Un agrupamiento es solo un diccionario id -> nombre de grupo; las métricas salen
+# del rollup mensual sumando las series ya calculadas de cada sucursal, así que
+# cambiar de agrupamiento no vuelve a consultar la tabla de hechos.
+
+def columnas_agrupables(dims) -> list:
+    """Columnas descriptivas de sucursales (ciudad, y región u otras si la tabla las tiene)."""
+    return [c for c in dims.sucursales.frame.columns if c not in _NO_AGRUPABLES]
+
+
+def grupos_por_columna(dims, columna: str, sucursales=None) -> dict:
+    mapa = dims.sucursales.mapping(columna)
+    ids = dims.sucursales.ids if sucursales is None else sucursales
+    return {s: mapa[s] for s in ids if s in mapa and pd.notna(mapa[s])}
+
+
+def etiquetas_antiguedad(meses: int = BRANCH_MATURITY_MONTHS) -> tuple:
+    return f"Nueva (< {meses} meses)", f"Madura (≥ {meses} meses)"
+
+
+def grupos_por_antiguedad(rollup, sucursales=None, fecha_ref=None,
+                          meses: int = BRANCH_MATURITY_MONTHS) -> dict:
+    """
+    Nuevas vs maduras según los meses transcurridos desde el primer mes con ventas
+    hasta `fecha_ref` ('YYYY-MM-DD'; por defecto, el último mes del rollup).
+    Sucursales sin ventas quedan fuera.
+    """
+    primeros = rollup.first_periods()
+    if sucursales is not None:
+        primeros = primeros[primeros.index.isin(list(sucursales))]
+    if primeros.empty:
+        return {}
+    ref = _periodo(fecha_ref) if fecha_ref else int((rollup.table["anio"] * 12 + rollup.table["mes"] - 1).max())
+    nueva, madura = etiquetas_antiguedad(meses)
+    edad = ref - primeros + 1
+    return {s: (madura if e >= meses else nueva) for s, e in edad.items() if e > 0}
+
+
+def grupos_por_cohortes(cohortes: dict, sucursales=None, resto: bool = True) -> dict:
+    """
+    cohortes: nombre -> lista de ids. Una sucursal cuenta en la primera cohorte que
+    la incluye; las demás del alcance van a "Resto" si `resto`.
+    """
+    grupos = {}
+    for nombre, ids in cohortes.items():
+        for s in ids:
+            grupos.setdefault(s, nombre)
+    if sucursales is not None:
+        alcance = set(sucursales)
+        grupos = {s: g for s, g in grupos.items() if s in alcance}
+        if resto:
+            grupos.update({s: RESTO for s in sucursales if s not in grupos})
+    return grupos
+
+
+def definir_grupos(por: str, dims, rollup, sucursales=None, fecha_ref=None, cohortes=None) -> dict:
+    """
+    `por`: una columna de columnas_agrupables(), ANTIGUEDAD o COHORTES.
+    Misma entrada para la vista y la API.
+    """
+    if por == ANTIGUEDAD:
+        return grupos_por_antiguedad(rollup, sucursales, fecha_ref)
+    if por == COHORTES:
+        return grupos_por_cohortes(cohortes or {}, sucursales)
+    if por not in columnas_agrupables(dims):
+        raise ValueError(f"Agrupamiento desconocido: {por}")
+    return grupos_por_columna(dims, por, sucursales)
+
+
+def _periodo(fecha: str) -> int:
+    return int(fecha[:4]) * 12 + int(fecha[5:7]) - 1
+
+
+def _completar_meses(serie: pd.DataFrame, fecha_inicio=None, fecha_fin=None) -> pd.DataFrame:
+    """Rellena con 0 los meses sin ventas de cada grupo dentro del rango."""
+    periodos = serie["anio"] * 12 + serie["mes"] - 1
+    p0 = _periodo(fecha_inicio) if fecha_inicio else int(periodos.min())
+    p1 = _periodo(fecha_fin) if fecha_fin else int(periodos.max())
+    idx = pd.MultiIndex.from_product([serie["grupo"].unique(), np.arange(p0, p1 + 1)],
+                                     names=["grupo", "periodo"])
+    out = (
+        serie.assign(periodo=periodos.to_numpy())
+        .set_index(["grupo", "periodo"])
+        .drop(columns=["anio", "mes"])
+        .reindex(idx, fill_value=0)
+        .reset_index()
+    )
+    out["anio"] = out["periodo"] // 12
+    out["mes"] = out["periodo"] % 12 + 1
+    out["periodo"] = out["anio"].astype(str) + "-" + out["mes"].astype(str).str.zfill(2)
+    return out
+
+
+# =============================================
+# Comparación N-vías
+# =============================================
+def comparar_grupos(rollup, grupos: dict, fecha_inicio=None, fecha_fin=None):
+    """
+    Devuelve (tabla, serie):
+      - tabla: una fila por grupo con sucursales, ventas, órdenes, ticket, participación,
+        venta mensual (total y por sucursal), desviación, CV, tendencia, rango y
+        distancia al líder.
+      - serie: ventas mensuales por grupo con meses faltantes en 0.
+    """
+    resumen = rollup.group_summary(grupos, fecha_inicio, fecha_fin)
+    serie = rollup.group_series(grupos, fecha_inicio, fecha_fin)
+    if resumen.empty:
+        return resumen, serie
+
+    serie = _completar_meses(serie, fecha_inicio, fecha_fin)
+    mensual = serie.groupby("grupo")["ventas"]
+    tabla = resumen.set_index("grupo")
+    tabla["meses"] = mensual.size()
+    tabla["participacion"] = tabla["ventas_totales"] / tabla["ventas_totales"].sum() * 100
+    tabla["venta_mensual"] = mensual.mean()
+    tabla["venta_mensual_por_sucursal"] = tabla["venta_mensual"] / tabla["sucursales"]
+    tabla["desv_mensual"] = mensual.std(ddof=1)
+    tabla["cv"] = tabla["desv_mensual"] / tabla["venta_mensual"].where(tabla["venta_mensual"] > 0) * 100
+    tabla["tendencia_mensual"] = mensual.apply(_tendencia_pct)
+
+    # El rango compara la venta por sucursal: un grupo con más tiendas no gana solo por tamaño
+    tabla = tabla.sort_values("venta_mensual_por_sucursal", ascending=False)
+    tabla["rango"] = np.arange(1, len(tabla) + 1)
+    lider = tabla["venta_mensual_por_sucursal"].iloc[0]
+    tabla["vs_lider"] = (tabla["venta_mensual_por_sucursal"] / lider - 1) * 100 if lider else np.nan
+    return tabla.reset_index(), serie
+
+
+def _tendencia_pct(ventas: pd.Series) -> float:
+    """Pendiente lineal de la serie mensual como % de su promedio (crecimiento por mes)."""
+    y = ventas.to_numpy(dtype=float)
+    if len(y) < 2 or not y.mean():
+        return np.nan
+    pendiente = np.polyfit(np.arange(len(y)), y, 1)[0]
+    return pendiente / y.mean() * 100
+
+
+def matriz_diferencias(tabla: pd.DataFrame, columna: str = "venta_mensual_por_sucursal") -> pd.DataFrame:
+    """% de diferencia de cada grupo (fila) contra cada otro (columna)."""
+    v = tabla.set_index("grupo")[columna]
+    base = v.to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        m = (base[:, None] / base[None, :] - 1) * 100
+    return pd.DataFrame(m, index=v.index, columns=v.index)
+
+
+def prueba_grupos(rollup, grupos: dict, fecha_inicio=None, fecha_fin=None) -> dict:
+    """
+    ¿Difieren los grupos? Cada observación es la venta mensual de una sucursal
+    (desde su primer mes con ventas), así el tamaño del grupo no pesa.
+    Devuelve ANOVA de una vía y Kruskal-Wallis (no paramétrica).
+    """
+    vacio = {"anova_f": None, "anova_p": None, "kruskal_h": None, "kruskal_p": None}
+    mask = rollup.mask(fecha_inicio, fecha_fin, list(grupos))
+    t = rollup.table.loc[mask, ["sucursal", "anio", "mes", "ventas"]]
+    if t.empty:
+        return vacio
+
+    periodo = (t["anio"] * 12 + t["mes"] - 1).to_numpy()
+    p1 = _periodo(fecha_fin) if fecha_fin else int(periodo.max())
+    sucs = t["sucursal"].to_numpy()
+    ventas = t["ventas"].to_numpy(dtype=float)
+    por_grupo = {}
+    for s in np.unique(sucs):
+        sel = sucs == s
+        p0 = int(periodo[sel].min())
+        fila = np.zeros(p1 - p0 + 1)
+        np.add.at(fila, periodo[sel] - p0, ventas[sel])
+        por_grupo.setdefault(grupos[s], []).append(fila)
+    muestras = [m for m in (np.concatenate(filas) for filas in por_grupo.values()) if len(m) >= 2]
+    if len(muestras) < 2:
+        return vacio
+
+    from scipy import stats
+    f, p_f = stats.f_oneway(*muestras)
+    h, p_h = stats.kruskal(*muestras)
+    return {"anova_f": float(f), "anova_p": float(p_f), "kruskal_h": float(h), "kruskal_p": float(p_h)}
+
+
+def preparar_grupos(tabla: pd.DataFrame) -> pd.DataFrame:
+    """Tabla de comparación con columnas legibles y formato de moneda/porcentaje."""
+    pct = lambda x: "---" if pd.isna(x) else f"{x:,.2f}%"
+    dinero = lambda x: "---" if pd.isna(x) else f"${x:,.2f}"
+    return pd.DataFrame({
+        "Rango": tabla["rango"],
+        "Grupo": tabla["grupo"],
+        "Sucursales": tabla["sucursales"],
+        "Ventas": tabla["ventas_totales"].apply(dinero),
+        "Participación": tabla["participacion"].apply(pct),
+        "Órdenes": tabla["total_ordenes"].apply(lambda x: f"{int(x):,}"),
+        "Ticket Prom.": tabla["ticket_promedio"].apply(dinero),
+        "Venta Mensual": tabla["venta_mensual"].apply(dinero),
+        "Mensual x Sucursal": tabla["venta_mensual_por_sucursal"].apply(dinero),
+        "CV": tabla["cv"].apply(pct),
+        "Tendencia / mes": tabla["tendencia_mensual"].apply(pct),
+        "vs Líder": tabla["vs_lider"].apply(pct),
+    })
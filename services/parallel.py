@@ -0,0 +1,208 @@
+# services/parallel.py
+import atexit
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# =============================================
+# Agregación paralela de la tabla de hechos
+# =============================================
+# Cada proceso toma las sucursales con id % P == k. Como order_id se numera por
+# sucursal (ORDER_KEY en data/schema.py), una orden cae completa en una sola
+# partición: sumas y conteos de órdenes distintas son aditivos al unir parciales.
+#
+# Los arreglos que vienen del almacén columnar (data/factstore.py) ya están en
+# disco: los workers abren el mismo .npy con mmap y no se copia nada. Solo lo que
+# no tiene archivo (p. ej. un frame filtrado) pasa por memoria compartida.
+# El pool solo compensa con muchas filas y varios núcleos; por debajo de
+# PARALLEL_MIN_ROWS el mismo cálculo corre en el proceso
+# (scripts/bench_parallel.py mide ambos caminos para fijar el umbral).
+
+PARALLEL_WORKERS = int(os.getenv("PARALLEL_WORKERS", str(os.cpu_count() or 1)))
+PARALLEL_MIN_ROWS = int(os.getenv("PARALLEL_MIN_ROWS", "2000000"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Pool persistente; 'spawn' evita heredar los hilos del servidor de Streamlit."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"))
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+
+def _drop_pool(pool: ProcessPoolExecutor):
+    """Descarta un pool roto (un worker murió, p. ej. por OOM); la siguiente llamada crea otro."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _archivo(arr: np.ndarray):
+    """Ruta del .npy mapeado del que `arr` es vista completa (None si no lo es)."""
+    base = arr
+    while base is not None and not isinstance(base, np.memmap):
+        base = base.base
+    if base is None or base.filename is None:
+        return None
+    completo = (arr.shape == base.shape and arr.dtype == base.dtype and arr.flags.c_contiguous
+                and arr.__array_interface__["data"][0] == base.__array_interface__["data"][0])
+    return str(base.filename) if completo else None
+
+
+class SharedArrays:
+    """
+    Arreglos NumPy visibles para los workers: los respaldados por un .npy se pasan
+    por ruta; el resto se copia a bloques de memoria compartida (se liberan con close()).
+    """
+
+    def __init__(self, arrays: dict):
+        self.blocks = {}
+        self.specs = {}
+        for name, arr in arrays.items():
+            ruta = _archivo(arr)
+            if ruta is not None:
+                self.specs[name] = ("npy", ruta)
+                continue
+            arr = np.ascontiguousarray(arr)
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[:] = arr
+            self.blocks[name] = shm
+            self.specs[name] = ("shm", shm.name, arr.shape, arr.dtype.str)
+
+    def close(self):
+        for shm in self.blocks.values():
+            shm.close()
+            shm.unlink()
+        self.blocks = {}
+
+
+def _attach(specs: dict):
+    blocks, arrays = [], {}
+    for name, spec in specs.items():
+        if spec[0] == "npy":
+            arrays[name] = np.load(spec[1], mmap_mode="r")
+            continue
+        _, shm_name, shape, dtype = spec
+        shm = shared_memory.SharedMemory(name=shm_name)
+        blocks.append(shm)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    return blocks, arrays
+
+
+def _partial_aggregate(arrays: dict, part: int, n_parts: int, n_ids: int, anio_min: int, n_years: int) -> dict:
+    """
+    Agregados de las sucursales con id % n_parts == part: ventas y filas por sucursal
+    y año, y órdenes distintas por sucursal.
+    """
+    import pandas as pd
+
+    suc = arrays["sucursal"]
+    if n_parts > 1:
+        sel = (suc % n_parts) == part
+        suc = suc[sel]
+        orden, anio, net = arrays["order_id"][sel], arrays["anio"][sel], arrays["net"][sel]
+    else:
+        orden, anio, net = arrays["order_id"], arrays["anio"], arrays["net"]
+    suc = suc.astype(np.int64)
+    anio = anio.astype(np.int64) - anio_min
+
+    # Órdenes distintas: pares (sucursal, order_id) únicos por hash, contados por sucursal
+    span = int(orden.max()) + 1 if len(orden) else 1
+    pares = pd.unique(suc * span + orden.astype(np.int64))
+    return {
+        "ventas_sucursal": np.bincount(suc, weights=net, minlength=n_ids),
+        "filas_sucursal": np.bincount(suc, minlength=n_ids),
+        "ordenes_sucursal": np.bincount(pares // span, minlength=n_ids),
+        "ventas_anio": np.bincount(anio, weights=net, minlength=n_years),
+        "filas_anio": np.bincount(anio, minlength=n_years),
+    }
+
+
+def _worker(specs: dict, part: int, n_parts: int, n_ids: int, anio_min: int, n_years: int) -> dict:
+    blocks, arrays = _attach(specs)
+    try:
+        return _partial_aggregate(arrays, part, n_parts, n_ids, anio_min, n_years)
+    finally:
+        del arrays
+        for shm in blocks:
+            shm.close()
+
+
+def aggregate_facts(df, workers: int = PARALLEL_WORKERS, min_rows: int = PARALLEL_MIN_ROWS) -> dict:
+    """
+    Calcula en un solo paso (paralelo si conviene) lo que la vista KPIs agrupaba en serie.
+    df: hechos con columnas sucursal (id entero no negativo), fecha_compra (datetime),
+    order_id, net y opcionalmente anio (el almacén columnar ya la trae).
+    Devuelve dict con:
+      - por_sucursal: DataFrame sucursal, ventas_totales, total_ordenes, ticket_promedio
+      - por_anio: DataFrame anio, ventas
+      - total_ventas, total_ordenes, ticket_promedio
+    """
+    import pandas as pd
+
+    arrays = {
+        "sucursal": df["sucursal"].to_numpy(),
+        "order_id": df["order_id"].to_numpy(),
+        "anio": df["anio"].to_numpy() if "anio" in df else df["fecha_compra"].dt.year.to_numpy(),
+        "net": df["net"].to_numpy(dtype=np.float64),
+    }
+    vacio = len(df) == 0
+    n_ids = 1 if vacio else int(arrays["sucursal"].max()) + 1
+    anio_min = 0 if vacio else int(arrays["anio"].min())
+    n_years = 0 if vacio else int(arrays["anio"].max()) - anio_min + 1
+    dims = (n_ids, anio_min, n_years)
+
+    n_parts = min(max(1, workers), n_ids)
+    parciales = None
+    if n_parts > 1 and len(df) >= min_rows:
+        shared = SharedArrays(arrays)
+        pool = _get_pool(n_parts)
+        try:
+            futures = [pool.submit(_worker, shared.specs, k, n_parts, *dims) for k in range(n_parts)]
+            parciales = [f.result() for f in futures]
+        except BrokenProcessPool:
+            _drop_pool(pool)  # esta llamada sigue en serie
+        finally:
+            shared.close()
+    if parciales is None:
+        parciales = [_partial_aggregate(arrays, 0, 1, *dims)]
+
+    # Unión de parciales: todas las métricas son aditivas entre particiones
+    ventas_suc = np.sum([p["ventas_sucursal"] for p in parciales], axis=0)
+    filas_suc = np.sum([p["filas_sucursal"] for p in parciales], axis=0)
+    ordenes_suc = np.sum([p["ordenes_sucursal"] for p in parciales], axis=0)
+    ventas_anio = np.sum([p["ventas_anio"] for p in parciales], axis=0)
+    filas_anio = np.sum([p["filas_anio"] for p in parciales], axis=0)
+
+    con_ventas = filas_suc > 0
+    por_sucursal = pd.DataFrame({
+        "sucursal": np.flatnonzero(con_ventas),
+        "ventas_totales": ventas_suc[con_ventas],
+        "total_ordenes": ordenes_suc[con_ventas].astype(np.int64),
+    })
+    por_sucursal["ticket_promedio"] = por_sucursal["ventas_totales"] / por_sucursal["total_ordenes"]
+
+    por_anio = pd.DataFrame({"anio": np.arange(len(ventas_anio)) + anio_min, "ventas": ventas_anio})
+    por_anio = por_anio[filas_anio > 0].reset_index(drop=True)
+
+    total_ventas = float(ventas_suc.sum())
+    total_ordenes = int(ordenes_suc.sum())
+    return {
+        "por_sucursal": por_sucursal,
+        "por_anio": por_anio,
+        "total_ventas": total_ventas,
+        "total_ordenes": total_ordenes,
+        "ticket_promedio": total_ventas / total_ordenes if total_ordenes > 0 else 0,
+    }
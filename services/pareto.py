@@ -0,0 +1,94 @@
+# services/pareto.py
+import numpy as np
+import pandas as pd
+
+from data.cache import versioned_cache
+from data.dimensions import get_dimensions
+from data.rollups import get_monthly_rollup, get_product_rollup
+
+# Límites acumulados de las clases ABC: A hasta 80 %, B hasta 95 %, C el resto
+ABC_BOUNDS = (0.80, 0.95)
+
+
+# =============================================
+# Clasificación Pareto / ABC
+# =============================================
+class ParetoResult:
+    """
+    Elementos ordenados por ventas DESC con su participación acumulada y clase ABC.
+    `porcentaje_acum` es creciente, por lo que las consultas por cobertura son búsquedas binarias.
+    """
+
+    def __init__(self, nombres, ventas, bounds=ABC_BOUNDS):
+        nombres = np.asarray(nombres, dtype=object)
+        ventas = np.asarray(ventas, dtype=float)
+        order = np.argsort(-ventas, kind="stable")
+
+        self.nombres = nombres[order]
+        self.ventas = ventas[order]
+        self.ventas_acum = np.cumsum(self.ventas)
+        total = self.ventas_acum[-1] if len(self.ventas_acum) else 0.0
+        self.total = float(total)
+        self.porcentaje_acum = self.ventas_acum / total if total else np.zeros_like(self.ventas)
+        self.bounds = bounds
+
+        # Un elemento es A si la participación acumulada ANTES de él aún no llega al límite A
+        previo = self.porcentaje_acum - (self.ventas / total if total else 0.0)
+        self.clases = np.where(previo < bounds[0], "A", np.where(previo < bounds[1], "B", "C"))
+
+    def __len__(self):
+        return len(self.nombres)
+
+    def items_covering(self, pct: float) -> int:
+        """Número mínimo de elementos que cubren `pct` (0-1) de las ventas."""
+        if not len(self):
+            return 0
+        n = int(np.searchsorted(self.porcentaje_acum, pct - 1e-12, side="left")) + 1
+        return min(n, len(self))
+
+    def top_covering(self, pct: float) -> np.ndarray:
+        """Nombres de los elementos que cubren `pct` de las ventas."""
+        return self.nombres[: self.items_covering(pct)]
+
+    def class_counts(self) -> dict:
+        return {c: int((self.clases == c).sum()) for c in ("A", "B", "C")}
+
+    def to_frame(self, name_col: str = "producto") -> pd.DataFrame:
+        return pd.DataFrame({
+            name_col: self.nombres,
+            "ventas": self.ventas,
+            "ventas_acum": self.ventas_acum,
+            "porcentaje_acum": self.porcentaje_acum,
+            "clase": self.clases,
+        })
+
+
+# =============================================
+# Resultados precalculados por versión de datos y filtros
+# =============================================
+# La llave lleva también las tablas de nombres: renombrar una pizza o una sucursal
+# invalida el resultado aunque ventas_totales no cambie.
+@versioned_cache("ventas_totales", "pizzas", "pizzas_info")
+def _pareto_productos(fecha_inicio, fecha_fin, sucursales: tuple) -> ParetoResult:
+    rollup = get_product_rollup()
+    t = rollup.table[rollup.mask(fecha_inicio, fecha_fin, sucursales)]
+    nombres = get_dimensions().pizza_names(t["pizza_id"])
+    ventas = pd.Series(t["ventas"].to_numpy()).groupby(nombres).sum()
+    return ParetoResult(ventas.index.to_numpy(), ventas.to_numpy())
+
+
+@versioned_cache("ventas_totales", "sucursales")
+def _pareto_sucursales(fecha_inicio, fecha_fin, sucursales: tuple) -> ParetoResult:
+    resumen = get_monthly_rollup().branch_summary(fecha_inicio, fecha_fin, sucursales)
+    nombres = get_dimensions().branch_labels(resumen["sucursal"], "nombre")
+    return ParetoResult(nombres, resumen["ventas_totales"].to_numpy())
+
+
+def get_pareto_productos_abc(fecha_inicio=None, fecha_fin=None, sucursales=None) -> ParetoResult:
+    """Pareto/ABC de productos (por nombre de pizza) para el filtro dado."""
+    return _pareto_productos(fecha_inicio, fecha_fin, sucursales)
+
+
+def get_pareto_sucursales_abc(fecha_inicio=None, fecha_fin=None, sucursales=None) -> ParetoResult:
+    """Pareto/ABC de sucursales para el filtro dado."""
+    return _pareto_sucursales(fecha_inicio, fecha_fin, sucursales)
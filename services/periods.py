@@ -0,0 +1,291 @@
+# services/periods.py
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data.cache import tenant_resource
+
+# Comparaciones que resuelve el motor: (nombre, meses de la ventana, desfase del periodo base)
+# None en la ventana = acumulado del año (YTD).
+COMPARACIONES = [
+    ("Mes vs mes anterior", 1, 1),
+    ("Mes vs mismo mes año anterior", 1, 12),
+    ("YTD vs YTD año anterior", None, 12),
+    ("Móvil 3 meses vs año anterior", 3, 12),
+    ("Móvil 6 meses vs año anterior", 6, 12),
+    ("Móvil 12 meses vs año anterior", 12, 12),
+]
+
+NIVELES = {
+    "sucursal": ("sucursal",),
+    "producto": ("sucursal", "pizza_id"),
+}
+
+
+def _periodo_abs(anio, mes):
+    return anio * 12 + mes - 1
+
+
+def etiqueta_periodo(p: int) -> str:
+    return f"{p // 12}-{p % 12 + 1:02d}"
+
+
+# =============================================
+# Motor de comparación entre periodos
+# =============================================
+# Cada entidad (sucursal, o sucursal × pizza) es una fila de una matriz mensual y se
+# guarda su suma acumulada C: la suma de cualquier ventana [a, b] es C[b+1] - C[a].
+# MoM, mismo mes del año anterior, YTD y ventanas móviles salen de restar columnas,
+# para cualquier subconjunto de filas (las sumas son lineales). Como cada columna
+# solo depende del pasado, al cambiar los datos basta con volver a acumular desde
+# el primer mes que cambió.
+
+class PeriodEngine:
+    """Matrices entidades × meses con sus acumulados, al día con la versión del rollup."""
+
+    def __init__(self, claves: tuple, medidas: tuple):
+        self.claves = claves
+        self.medidas = medidas
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.index = pd.MultiIndex.from_tuples([], names=list(self.claves))
+        self.p0 = None                   # índice absoluto del primer mes
+        self.X = {m: np.zeros((0, 0)) for m in self.medidas}
+        self.C = {m: np.zeros((0, 1)) for m in self.medidas}
+        self.ultimo_completo = None      # último mes con todos sus días cargados
+        self.version = None
+
+    # ---------- ingesta ----------
+    @property
+    def n_meses(self) -> int:
+        return next(iter(self.X.values())).shape[1]
+
+    @property
+    def ultimo_periodo(self):
+        return None if self.p0 is None else self.p0 + self.n_meses - 1
+
+    def ingest(self, table: pd.DataFrame) -> int:
+        """
+        Reescribe las celdas con el rollup completo (claves, anio, mes, medidas).
+        Devuelve la primera columna que cambió (desde ahí hay que volver a acumular).
+        """
+        if table.empty:
+            self._reset()
+            return 0
+        periodos = _periodo_abs(table["anio"].to_numpy(), table["mes"].to_numpy())
+        claves = pd.MultiIndex.from_frame(table[list(self.claves)])
+        nuevas = claves.unique().difference(self.index, sort=False)
+        index = self.index.append(nuevas) if len(nuevas) else self.index
+
+        p0 = int(periodos.min())
+        cambio = 0 if self.p0 is None or p0 < self.p0 else None
+        if cambio is None:
+            p0 = self.p0
+        T = int(periodos.max()) - p0 + 1
+
+        filas, cols = index.get_indexer(claves), periodos - p0
+        X = {}
+        for m in self.medidas:
+            X[m] = np.zeros((len(index), T))
+            np.add.at(X[m], (filas, cols), table[m].to_numpy(dtype=float))
+
+        if cambio is None:
+            E, T0 = self.X[self.medidas[0]].shape
+            comun = min(T, T0)
+            distinto = np.zeros(max(T, T0), dtype=bool)
+            distinto[comun:] = T != T0  # meses agregados (o quitados) al final
+            for m in self.medidas:
+                distinto[:comun] |= (X[m][:E, :comun] != self.X[m][:, :comun]).any(axis=0)
+                distinto[:comun] |= (X[m][E:, :comun] != 0).any(axis=0)
+            cambio = int(np.argmax(distinto)) if distinto.any() else T
+
+        self.index, self.p0, self.X = index, p0, X
+        self._acumular_desde(cambio)
+        return cambio
+
+    def _acumular_desde(self, start: int):
+        for m in self.medidas:
+            X, viejo = self.X[m], self.C[m]
+            C = np.zeros((X.shape[0], X.shape[1] + 1))
+            keep = min(start + 1, viejo.shape[1])
+            C[:viejo.shape[0], :keep] = viejo[:, :keep]
+            C[:, start + 1:] = C[:, start:start + 1] + np.cumsum(X[:, start:], axis=1)
+            self.C[m] = C
+
+    def refresh(self, table: pd.DataFrame, version: tuple, ultimo_dia=None):
+        with self._lock:
+            if version == self.version:
+                return
+            self.ingest(table)
+            self.ultimo_completo = self.ultimo_periodo
+            if ultimo_dia is not None and self.p0 is not None:
+                ultimo_dia = pd.Timestamp(ultimo_dia)
+                if not ultimo_dia.is_month_end:
+                    self.ultimo_completo = _periodo_abs(ultimo_dia.year, ultimo_dia.month) - 1
+            self.version = version
+
+    # ---------- consultas ----------
+    def _grupos(self, sucursales=None, por=None, etiquetas=None):
+        """Filas seleccionadas y su código de grupo (un solo grupo si `por` es None)."""
+        filas = np.arange(len(self.index))
+        if sucursales:
+            filas = filas[np.isin(self.index.get_level_values("sucursal")[filas], list(sucursales))]
+        if por is None:
+            return filas, np.zeros(len(filas), dtype=int), pd.Index(["Total"], name="grupo")
+        valores = self.index.get_level_values(por)[filas]
+        if etiquetas is not None:
+            valores = pd.Index(valores).map(lambda x: etiquetas.get(x, x))
+        codes, uniques = pd.factorize(valores, sort=True)
+        return filas, codes, pd.Index(uniques, name=por)
+
+    def _acumulado(self, medida, filas, codes, n_grupos) -> np.ndarray:
+        C = np.zeros((n_grupos, self.n_meses + 1))
+        np.add.at(C, codes, self.C[medida][filas])
+        return C
+
+    def _ventana(self, C, hasta: int, meses) -> np.ndarray:
+        """Suma de la ventana que termina en la columna `hasta` (NaN si empieza antes de la historia)."""
+        if meses is None:  # YTD: desde enero del año de `hasta`
+            desde = hasta - (self.p0 + hasta) % 12
+        else:
+            desde = hasta - meses + 1
+        if hasta < 0 or desde < 0 or hasta >= self.n_meses:
+            return np.full(C.shape[0], np.nan)
+        return C[:, hasta + 1] - C[:, desde]
+
+    def comparar(self, periodo: int | None = None, medida: str = "ventas", sucursales=None,
+                 por: str | None = None, etiquetas: dict | None = None) -> pd.DataFrame:
+        """
+        Todas las COMPARACIONES para el mes `periodo` (índice absoluto; por defecto el
+        último mes completo). Columnas: grupo, comparacion, desde, hasta, actual,
+        anterior, variacion (%). Una base que cae antes del primer mes con datos
+        queda en NaN en lugar de compararse contra cero.
+        """
+        cols = ["grupo", "comparacion", "desde", "hasta", "actual", "anterior", "variacion"]
+        if self.p0 is None:
+            return pd.DataFrame(columns=cols)
+        periodo = self.ultimo_completo if periodo is None else periodo
+        t = periodo - self.p0
+        filas, codes, grupos = self._grupos(sucursales, por, etiquetas)
+        C = self._acumulado(medida, filas, codes, len(grupos))
+
+        partes = []
+        for nombre, meses, desfase in COMPARACIONES:
+            actual = self._ventana(C, t, meses)
+            anterior = self._ventana(C, t - desfase, meses)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                variacion = np.where(anterior > 0, (actual / anterior - 1) * 100, np.nan)
+            inicio = periodo - (periodo % 12 if meses is None else meses - 1)
+            partes.append(pd.DataFrame({
+                "grupo": grupos, "comparacion": nombre,
+                "desde": etiqueta_periodo(inicio), "hasta": etiqueta_periodo(periodo),
+                "actual": actual, "anterior": anterior, "variacion": variacion,
+            }))
+        return pd.concat(partes, ignore_index=True)[cols]
+
+    def serie(self, medida: str = "ventas", sucursales=None, por: str | None = None,
+              etiquetas: dict | None = None, meses: int = 12) -> pd.DataFrame:
+        """
+        Serie mensual por grupo con la suma móvil de `meses` y su variación contra la
+        misma ventana del año anterior. Columnas: grupo, periodo, valor, movil,
+        movil_anterior, variacion.
+        """
+        if self.p0 is None:
+            return pd.DataFrame(columns=["grupo", "periodo", "valor", "movil", "movil_anterior", "variacion"])
+        filas, codes, grupos = self._grupos(sucursales, por, etiquetas)
+        C = self._acumulado(medida, filas, codes, len(grupos))
+        T = self.n_meses
+        t = np.arange(T)
+
+        movil = np.full((len(grupos), T), np.nan)
+        ok = t >= meses - 1
+        movil[:, ok] = C[:, t[ok] + 1] - C[:, t[ok] + 1 - meses]
+        anterior = np.full_like(movil, np.nan)
+        if T > 12:
+            anterior[:, 12:] = movil[:, :-12]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variacion = np.where(anterior > 0, (movil / anterior - 1) * 100, np.nan)
+
+        return pd.DataFrame({
+            "grupo": np.repeat(grupos.to_numpy(), T),
+            "periodo": np.tile([etiqueta_periodo(self.p0 + i) for i in t], len(grupos)),
+            "valor": np.diff(C, axis=1).ravel(),
+            "movil": movil.ravel(),
+            "movil_anterior": anterior.ravel(),
+            "variacion": variacion.ravel(),
+        })
+
+    def anual(self, medida: str = "ventas", sucursales=None) -> pd.DataFrame:
+        """
+        Totales por año con crecimiento contra el mismo periodo del año anterior: un
+        año en curso se compara solo con los mismos meses (completos) del previo.
+        Columnas: anio, ventas, meses, ventas_comparable, anterior_comparable,
+        crecimiento, parcial.
+        """
+        cols = ["anio", "ventas", "meses", "ventas_comparable", "anterior_comparable", "crecimiento", "parcial"]
+        if self.p0 is None:
+            return pd.DataFrame(columns=cols)
+        filas, codes, grupos = self._grupos(sucursales)
+        C = self._acumulado(medida, filas, codes, 1)[0]
+        col = lambda p: min(max(p - self.p0 + 1, 0), self.n_meses)  # columna de C tras el mes p
+
+        filas_out = []
+        for anio in range(self.p0 // 12, self.ultimo_periodo // 12 + 1):
+            enero, diciembre = anio * 12, anio * 12 + 11
+            corte = min(diciembre, self.ultimo_completo)
+            meses = corte - max(enero, self.p0) + 1
+            comparable = C[col(corte)] - C[col(enero - 1)] if meses > 0 else np.nan
+            # La base solo vale si el año anterior tiene historia para todos esos meses
+            base_ok = meses > 0 and enero - 12 >= self.p0
+            anterior = C[col(corte - 12)] - C[col(enero - 13)] if base_ok else np.nan
+            filas_out.append({
+                "anio": anio,
+                "ventas": C[col(diciembre)] - C[col(enero - 1)],
+                "meses": max(meses, 0),
+                "ventas_comparable": comparable,
+                "anterior_comparable": anterior,
+                "crecimiento": (comparable / anterior - 1) * 100 if base_ok and anterior > 0 else np.nan,
+                "parcial": enero < self.p0 or corte < diciembre,
+            })
+        return pd.DataFrame(filas_out, columns=cols)
+
+
+# Un recurso por nivel: tenant_resource conserva un solo juego de argumentos por franquicia.
+# Crecen en su lugar al refrescarse, así que se vuelven a medir para el presupuesto de memoria.
+@tenant_resource
+def _engine_sucursal() -> PeriodEngine:
+    return PeriodEngine(NIVELES["sucursal"], ("ventas", "cantidad", "lineas", "ordenes"))
+
+
+@tenant_resource
+def _engine_producto() -> PeriodEngine:
+    return PeriodEngine(NIVELES["producto"], ("ventas", "cantidad"))
+
+
+_ENGINES = {"sucursal": _engine_sucursal, "producto": _engine_producto}
+
+
+def get_period_engine(nivel: str = "sucursal") -> PeriodEngine:
+    """
+    Motor compartido por las sesiones de la franquicia, al día con el rollup vigente.
+    nivel: "sucursal" (ventas, cantidad, lineas, ordenes) o "producto" (ventas, cantidad).
+    """
+    from data.rollups import get_monthly_rollup, get_product_rollup
+    from services.sketches import hll_estimate
+
+    if nivel not in NIVELES:
+        raise ValueError(f"Nivel desconocido: {nivel}")
+    eng = _ENGINES[nivel]()
+    mensual = get_monthly_rollup()
+    rollup = mensual if nivel == "sucursal" else get_product_rollup()
+    if eng.version != rollup.version:
+        if nivel == "sucursal":
+            ordenes = np.round(hll_estimate(rollup.sketches)) if len(rollup.table) else []
+            eng.refresh(rollup.table.assign(ordenes=ordenes), rollup.version, rollup.ultimo_dia)
+        else:
+            eng.refresh(rollup.table, rollup.version, mensual.ultimo_dia)
+        _ENGINES[nivel].remedir()
+    return eng
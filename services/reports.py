@@ -0,0 +1,294 @@
+# services/reports.py
+"""
+Paquete semanal de KPIs sin Streamlit: HTML (y PDF si hay motor instalado) para el
+total, cada ciudad y cada sucursal.
+
+Todo sale de un solo recorrido de la tabla de hechos (ReportCube); las secciones de
+cada reporte son cortes baratos de ese cubo y el render (gráficos + HTML/PDF), que
+es lo costoso, se reparte entre procesos.
+"""
+import base64
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from data.config import REPORT_WORKERS, REPORTS_DIR
+
+FORMATOS_REPORTE = ("html", "pdf")
+MESES_COMPARACION = 12
+
+
+# =============================================
+# Cubo de agregados en un solo recorrido
+# =============================================
+class ReportCube:
+    """
+    Agregados diarios por sucursal y por producto.
+    - diario: sucursal, fecha, ventas, ordenes (órdenes distintas según ORDER_KEY,
+      cada una contada solo en el día de su primera línea: se pueden sumar entre
+      sucursales y fechas sin duplicar)
+    - productos: sucursal, fecha, producto, ventas, cantidad
+    """
+
+    def __init__(self, diario: pd.DataFrame, productos: pd.DataFrame):
+        self.diario = diario
+        self.productos = productos
+
+    @property
+    def ultimo_dia(self) -> pd.Timestamp:
+        return self.diario["fecha"].max()
+
+
+def build_report_cube(df: pd.DataFrame, nombres_producto) -> ReportCube:
+    """df: hechos con sucursal, fecha_compra, order_id, pizza_id, net, quantity."""
+    from data.schema import ORDER_KEY  # SQLAlchemy fuera de los procesos que solo renderizan
+    dias = df["fecha_compra"].to_numpy().astype("datetime64[D]")
+    suc_codes, sucursales = pd.factorize(df["sucursal"], sort=True)
+    dia_codes, fechas = pd.factorize(dias, sort=True)
+    n_dias = len(fechas)
+
+    celda = suc_codes.astype(np.int64) * n_dias + dia_codes
+    celdas, celda_codes = np.unique(celda, return_inverse=True)
+    net = df["net"].to_numpy(dtype=float)
+
+    orden_codes = df.groupby(list(ORDER_KEY), sort=False).ngroup().to_numpy()
+    primera = np.full(int(orden_codes.max()) + 1 if len(orden_codes) else 0, np.iinfo(np.int64).max)
+    np.minimum.at(primera, orden_codes, celda)  # misma sucursal: la celda mínima es el primer día
+    diario = pd.DataFrame({
+        "sucursal": np.asarray(sucursales)[celdas // n_dias],
+        "fecha": pd.to_datetime(np.asarray(fechas)[celdas % n_dias]),
+        "ventas": np.bincount(celda_codes, weights=net, minlength=len(celdas)),
+        "ordenes": np.bincount(np.searchsorted(celdas, primera), minlength=len(celdas)),
+    })
+
+    prod_codes, productos = pd.factorize(pd.Series(nombres_producto), sort=True)
+    conocido = prod_codes >= 0
+    llave = celda_codes[conocido].astype(np.int64) * len(productos) + prod_codes[conocido]
+    llaves, llave_codes = np.unique(llave, return_inverse=True)
+    por_producto = diario.iloc[llaves // len(productos)][["sucursal", "fecha"]].reset_index(drop=True)
+    por_producto["producto"] = np.asarray(productos, dtype=object)[llaves % len(productos)]
+    por_producto["ventas"] = np.bincount(llave_codes, weights=net[conocido], minlength=len(llaves))
+    por_producto["cantidad"] = np.bincount(llave_codes, weights=df["quantity"].to_numpy(dtype=float)[conocido],
+                                           minlength=len(llaves))
+    return ReportCube(diario, por_producto)
+
+
+# =============================================
+# Alcances (total, ciudades, sucursales) y secciones
+# =============================================
+@dataclass(frozen=True)
+class ReportScope:
+    slug: str
+    titulo: str
+    sucursales: tuple
+
+
+def report_scopes(sucursales: pd.DataFrame) -> list[ReportScope]:
+    """sucursales: frame de dimensión con id_sucursal, nombre, ciudad."""
+    scopes = [ReportScope("general", "Todas las sucursales", tuple(sorted(sucursales["id_sucursal"])))]
+    for ciudad, grupo in sucursales.groupby("ciudad", sort=True):
+        slug = "ciudad-" + "".join(c if c.isalnum() else "_" for c in str(ciudad).lower())
+        scopes.append(ReportScope(slug, f"Ciudad: {ciudad}", tuple(sorted(grupo["id_sucursal"]))))
+    for _, row in sucursales.sort_values("id_sucursal").iterrows():
+        scopes.append(ReportScope(f"sucursal-{row['id_sucursal']}", f"Sucursal: {row['nombre']} ({row['ciudad']})",
+                                  (row["id_sucursal"],)))
+    return scopes
+
+
+def default_period(cube: ReportCube) -> tuple[pd.Timestamp, pd.Timestamp]:
+    """Última semana completa (lunes a domingo) con datos."""
+    fin = cube.ultimo_dia.normalize()
+    fin = fin - pd.Timedelta(days=(fin.dayofweek + 1) % 7)  # domingo anterior (o el mismo día)
+    return fin - pd.Timedelta(days=6), fin
+
+
+def scope_sections(cube: ReportCube, scope: ReportScope, desde, hasta, sucursales: pd.DataFrame) -> dict:
+    """Datos de cada sección del reporte para un alcance (mismo contenido que la vista KPIs)."""
+    from services.analytics import calcular_crecimiento_anual_desde_totales, totales_anuales_comparables
+    from services.pareto import ParetoResult
+
+    desde, hasta = pd.Timestamp(desde), pd.Timestamp(hasta)
+    d = cube.diario[cube.diario["sucursal"].isin(scope.sucursales)]
+    periodo = d[d["fecha"].between(desde, hasta)]
+
+    ventas, ordenes = float(periodo["ventas"].sum()), int(periodo["ordenes"].sum())
+    kpis = {"ventas": ventas, "ordenes": ordenes, "ticket": ventas / ordenes if ordenes else 0.0}
+
+    historico = d[d["fecha"] <= hasta]
+    yoy = calcular_crecimiento_anual_desde_totales(
+        totales_anuales_comparables(historico["fecha"], historico["ventas"])
+    )
+
+    info = sucursales.set_index("id_sucursal")
+    top5 = None
+    if len(scope.sucursales) > 1:
+        top5 = periodo.groupby("sucursal", as_index=False)[["ventas", "ordenes"]].sum()
+        top5 = top5.nlargest(5, "ventas").rename(columns={"ventas": "ventas_totales", "ordenes": "total_ordenes"})
+        top5["ticket_promedio"] = top5["ventas_totales"] / top5["total_ordenes"].where(top5["total_ordenes"] > 0)
+        top5["ciudad"] = top5["sucursal"].map(info["ciudad"])
+        top5["sucursal"] = top5["sucursal"].map(info["nombre"])
+
+    p = cube.productos
+    p = p[p["sucursal"].isin(scope.sucursales) & p["fecha"].between(desde, hasta)]
+    por_producto = p.groupby("producto")["ventas"].sum()
+    pareto = ParetoResult(por_producto.index.to_numpy(), por_producto.to_numpy())
+
+    inicio_cmp = (hasta - pd.DateOffset(months=MESES_COMPARACION - 1)).replace(day=1)
+    cmp = historico[historico["fecha"] >= inicio_cmp]
+    comparacion = (
+        cmp.groupby(["sucursal", cmp["fecha"].dt.year.rename("anio"), cmp["fecha"].dt.month.rename("mes")])["ventas"]
+        .sum().reset_index().rename(columns={"ventas": "total_ventas"})
+    )
+    comparacion["sucursal"] = comparacion["sucursal"].map(info["nombre"])
+    comparacion["periodo"] = comparacion["anio"].astype(str) + "-" + comparacion["mes"].astype(str).str.zfill(2)
+    comparacion["mes_nombre"] = pd.to_datetime(comparacion["periodo"]).dt.month_name()
+    comparacion = comparacion.sort_values(["anio", "mes"]).reset_index(drop=True)
+
+    return {"kpis": kpis, "yoy": yoy, "top5": top5, "pareto": pareto.to_frame(),
+            "pareto_80": pareto.items_covering(0.8), "comparacion": comparacion}
+
+
+# =============================================
+# Render (en procesos): gráficos estáticos + HTML / PDF
+# =============================================
+def _chart_html(chart, nombre: str) -> str:
+    """PNG embebido si está vl-convert; si no, especificación Vega-Lite con vega-embed."""
+    spec = chart.to_dict()
+    try:
+        import vl_convert as vlc
+        png = vlc.vegalite_to_png(spec, scale=2)
+        return f'<img alt="{nombre}" src="data:image/png;base64,{base64.b64encode(png).decode()}">'
+    except ImportError:
+        import json
+        return (f'<div id="{nombre}"></div><script>vegaEmbed("#{nombre}", {json.dumps(spec)}, '
+                '{"actions": false});</script>')
+
+
+def _estatico() -> bool:
+    try:
+        import vl_convert  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+_TEMPLATE = """<!DOCTYPE html>
+<html lang="es"><head><meta charset="utf-8">
+<title>{{ titulo }} · {{ desde }} a {{ hasta }}</title>
+{% if not estatico %}<script src="https://cdn.jsdelivr.net/npm/vega@5"></script>
+<script src="https://cdn.jsdelivr.net/npm/vega-lite@5"></script>
+<script src="https://cdn.jsdelivr.net/npm/vega-embed@6"></script>{% endif %}
+<style>
+ body { font-family: Inter, "Segoe UI", Roboto, Arial, sans-serif; margin: 2rem; color: #1f2937; }
+ h1 { margin-bottom: 0; } .sub { color: #6b7280; margin-top: .25rem; }
+ .kpis { display: flex; gap: 2rem; margin: 1.5rem 0; }
+ .kpi { border: 1px solid #e5e7eb; border-radius: 8px; padding: 1rem 1.5rem; }
+ .kpi b { display: block; font-size: 1.6rem; }
+ table { border-collapse: collapse; margin: .5rem 0 1rem; } td, th { padding: .3rem .8rem; border-bottom: 1px solid #e5e7eb; text-align: right; }
+ th:first-child, td:first-child { text-align: left; } img { max-width: 100%; }
+ section { page-break-inside: avoid; }
+</style></head><body>
+<h1>📊 {{ titulo }}</h1>
+<p class="sub">Semana del {{ desde }} al {{ hasta }} · generado {{ generado }}</p>
+<div class="kpis">
+ <div class="kpi">💰 Ventas Totales<b>${{ "{:,.2f}".format(kpis.ventas) }}</b></div>
+ <div class="kpi">🧾 Total de Órdenes<b>{{ "{:,}".format(kpis.ordenes) }}</b></div>
+ <div class="kpi">🎟️ Ticket Promedio<b>${{ "{:,.2f}".format(kpis.ticket) }}</b></div>
+</div>
+<section><h2>📈 Crecimiento anual (YoY)</h2>{{ yoy_tabla }}{{ yoy_chart }}</section>
+{% if top5_tabla %}<section><h2>🏆 Top 5 sucursales de la semana</h2>{{ top5_tabla }}{{ top5_chart }}</section>{% endif %}
+<section><h2>🍕 Pareto de productos</h2>
+<p>{{ pareto_80 }} productos cubren el 80% de las ventas de la semana.</p>{{ pareto_chart }}</section>
+<section><h2>🏙️ Ventas mensuales por sucursal (últimos {{ meses }} meses)</h2>{{ comparacion_chart }}</section>
+</body></html>
+"""
+
+
+def render_report(scope: ReportScope, secciones: dict, desde, hasta, formatos, salida: str) -> dict:
+    """Genera los archivos de un alcance. Corre en un proceso del pool (sin Streamlit)."""
+    import jinja2
+    from charts.sales_charts import chart_comparison_lines, chart_crecimiento_anual, chart_top5, \
+        grafico_pareto_productos
+
+    t0 = time.perf_counter()
+    estatico = _estatico()
+    yoy, top5 = secciones["yoy"], secciones["top5"]
+    contexto = {
+        "titulo": scope.titulo, "desde": str(pd.Timestamp(desde).date()), "hasta": str(pd.Timestamp(hasta).date()),
+        "generado": time.strftime("%Y-%m-%d %H:%M"), "estatico": estatico, "kpis": secciones["kpis"],
+        "meses": MESES_COMPARACION, "pareto_80": secciones["pareto_80"],
+        "yoy_tabla": yoy[["anio", "ventas_formato", "crecimiento_formato"]]
+            .rename(columns={"anio": "Año", "ventas_formato": "Ventas", "crecimiento_formato": "Crecimiento"})
+            .to_html(index=False, border=0),
+        "yoy_chart": _chart_html(chart_crecimiento_anual(yoy), "yoy") if len(yoy) else "",
+        "top5_tabla": None, "top5_chart": "",
+        "pareto_chart": _chart_html(grafico_pareto_productos(secciones["pareto"]).properties(width=900), "pareto")
+            if len(secciones["pareto"]) else "",
+        "comparacion_chart": _chart_html(chart_comparison_lines(secciones["comparacion"], scope.titulo)
+                                         .properties(width=900), "comparacion")
+            if len(secciones["comparacion"]) else "",
+    }
+    if top5 is not None and len(top5):
+        contexto["top5_tabla"] = top5[["sucursal", "ciudad", "ventas_totales", "total_ordenes", "ticket_promedio"]] \
+            .to_html(index=False, border=0, float_format=lambda v: f"{v:,.2f}")
+        contexto["top5_chart"] = _chart_html(chart_top5(top5).properties(width=700), "top5")
+
+    html = jinja2.Template(_TEMPLATE).render(**contexto)
+    archivos = {}
+    base = os.path.join(salida, scope.slug)
+    if "html" in formatos:
+        with open(base + ".html", "w", encoding="utf-8") as fh:
+            fh.write(html)
+        archivos["html"] = base + ".html"
+    if "pdf" in formatos:
+        archivos["pdf"] = _write_pdf(html, base + ".pdf", estatico)
+    return {"alcance": scope.slug, "archivos": archivos, "segundos": round(time.perf_counter() - t0, 2)}
+
+
+def _write_pdf(html: str, path: str, estatico: bool):
+    """PDF con weasyprint (opcional). Sin gráficos estáticos el PDF saldría sin ellos, así que se omite."""
+    if not estatico:
+        return None
+    try:
+        from weasyprint import HTML
+    except ImportError:
+        return None
+    HTML(string=html).write_pdf(path)
+    return path
+
+
+# =============================================
+# Orquestación
+# =============================================
+def generate_reports(desde=None, hasta=None, formatos=("html",), workers: int = REPORT_WORKERS,
+                     salida: str = REPORTS_DIR, alcances=None) -> list[dict]:
+    """
+    Genera el paquete KPI de todos los alcances (o de los slugs en `alcances`).
+    Devuelve una fila por alcance con los archivos escritos y su tiempo de render.
+    """
+    from data.dimensions import get_dimensions
+    from data.factstore import get_fact_store
+
+    formatos = tuple(f for f in formatos if f in FORMATOS_REPORTE)
+    dims = get_dimensions()
+    df = get_fact_store().frame(["sucursal", "fecha_compra", "order_id", "pizza_id", "net", "quantity"])
+    cube = build_report_cube(df, dims.pizza_names(df["pizza_id"]))
+    if desde is None or hasta is None:
+        desde, hasta = default_period(cube)
+
+    sucursales = dims.sucursales.frame[["id_sucursal", "nombre", "ciudad"]]
+    scopes = [s for s in report_scopes(sucursales) if alcances is None or s.slug in alcances]
+    trabajos = [(s, scope_sections(cube, s, desde, hasta, sucursales)) for s in scopes]
+
+    salida = os.path.join(salida, str(pd.Timestamp(hasta).date()))
+    os.makedirs(salida, exist_ok=True)
+    if workers <= 1 or len(trabajos) == 1:
+        return [render_report(s, sec, desde, hasta, formatos, salida) for s, sec in trabajos]
+    with ProcessPoolExecutor(max_workers=min(workers, len(trabajos)), mp_context=mp.get_context("spawn")) as pool:
+        futures = [pool.submit(render_report, s, sec, desde, hasta, formatos, salida) for s, sec in trabajos]
+        return [f.result() for f in futures]
@@ -0,0 +1,180 @@
+# services/warmer.py
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from data.config import (
+    CACHE_DIR, WARMER_INTERVAL, WARMER_CONCURRENCY, WARMER_TOP_COMBOS
+)
+
+USAGE_FILE = os.path.join(CACHE_DIR, "usage.json")
+FLUSH_EVERY = 30  # segundos mínimos entre escrituras del registro de uso
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================
+# Registro de uso real de filtros
+# =============================================
+class UsageLog:
+    """
+    Cuenta cuántas veces se pidió cada combinación de filtros.
+    Tipos: "rango" (fecha_inicio, fecha_fin, sucursales) y "top" (top_n, sucursales).
+    Se persiste en JSON para sobrevivir a reinicios/deploys.
+    """
+
+    def __init__(self, path: str = USAGE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._last_flush = 0.0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                for item in json.load(fh):
+                    self._counts[json.dumps(item["combo"], sort_keys=True)] = item["hits"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def record(self, kind: str, **params):
+        combo = {"kind": kind, **params}
+        with self._lock:
+            self._counts[json.dumps(combo, sort_keys=True)] += 1
+            if time.monotonic() - self._last_flush > FLUSH_EVERY:
+                self._flush()
+
+    def _flush(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump([{"combo": json.loads(k), "hits": v} for k, v in self._counts.items()], fh)
+        os.replace(tmp, self.path)
+        self._last_flush = time.monotonic()
+
+    def most_common(self, n: int) -> list[dict]:
+        with self._lock:
+            return [json.loads(k) for k, _ in self._counts.most_common(n)]
+
+
+_usage = None
+_usage_lock = threading.Lock()
+
+
+def get_usage_log() -> UsageLog:
+    global _usage
+    with _usage_lock:
+        if _usage is None:
+            _usage = UsageLog()
+        return _usage
+
+
+def record_usage(kind: str, **params):
+    """Registra una combinación de filtros usada por un usuario real (en su franquicia)."""
+    from data.tenants import current_tenant
+    sucs = params.get("sucursales")
+    if sucs is not None:
+        params["sucursales"] = sorted(int(s) for s in sucs)
+    get_usage_log().record(kind, tenant=current_tenant(), **params)
+
+
+# =============================================
+# Pre-calentado
+# =============================================
+def _global_jobs():
+    """Cachés independientes de los filtros (dimensiones, hechos y rollups)."""
+    from data.dimensions import get_dimensions
+    from data.queries import load_fact_data
+    from data.rollups import get_monthly_rollup, get_product_rollup
+    from services.pareto import get_pareto_productos_abc, get_pareto_sucursales_abc
+    return [get_dimensions, load_fact_data, get_monthly_rollup, get_product_rollup,
+            get_pareto_productos_abc, get_pareto_sucursales_abc]
+
+
+def _in_tenant(tenant, job):
+    """El trabajo corre en un hilo del pool: la franquicia se fija explícitamente."""
+    from data.tenants import use_tenant
+
+    def run():
+        with use_tenant(tenant):
+            return job()
+    return run
+
+
+def _combo_jobs(combo: dict):
+    """
+    Funciones cacheadas que la UI invocará con esta combinación. Del rango, solo
+    "Comparar Sucursales" consulta la base (celdas sucursal × mes); el resto de
+    las vistas filtra el rollup mensual, que ya calientan los trabajos globales.
+    """
+    from data.queries import cached_top_pizzas
+    from services.analytics import get_branch_comparison_data
+
+    sucs = tuple(combo.get("sucursales", ()))
+    if combo["kind"] == "top":
+        return [lambda: cached_top_pizzas(int(combo["top_n"]), sucs)]
+    if combo["kind"] == "rango" and len(sucs) >= 2:
+        fi, ff = combo["fecha_inicio"], combo["fecha_fin"]
+        return [lambda: get_branch_comparison_data(fi, ff, sucs)]
+    return []
+
+
+def warm_once(top: int = WARMER_TOP_COMBOS, concurrency: int = WARMER_CONCURRENCY) -> dict:
+    """
+    Ejecuta una pasada: primero las cachés globales (en serie, son las pesadas),
+    luego las `top` combinaciones más frecuentes con a lo sumo `concurrency` consultas a la vez.
+    """
+    from data.tenants import DEFAULT, TENANT_URLS
+
+    stats = {"ok": 0, "errores": 0, "segundos": 0.0}
+    t0 = time.perf_counter()
+    combos = [c for c in get_usage_log().most_common(top) if c.get("tenant", DEFAULT) in TENANT_URLS]
+
+    def run(job):
+        try:
+            job()
+            return True
+        except Exception:
+            logger.warning("Error pre-calentando", exc_info=True)
+            return False
+
+    # Solo franquicias con uso reciente: calentar las demás mantendría vivos sus motores
+    for tenant in dict.fromkeys(c.get("tenant", DEFAULT) for c in combos) or [DEFAULT]:
+        for job in _global_jobs():
+            stats["ok" if run(_in_tenant(tenant, job)) else "errores"] += 1
+
+    jobs = [_in_tenant(combo.get("tenant", DEFAULT), j) for combo in combos for j in _combo_jobs(combo)]
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="warmer") as pool:
+        for ok in pool.map(run, jobs):
+            stats["ok" if ok else "errores"] += 1
+
+    stats["segundos"] = round(time.perf_counter() - t0, 2)
+    return stats
+
+
+class Warmer:
+    """Hilo daemon que pre-calienta al arrancar y luego cada `interval` segundos."""
+
+    def __init__(self, interval: int = WARMER_INTERVAL):
+        self.interval = interval
+        self.last_stats = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="cache-warmer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.last_stats = warm_once()
+            logger.info("Pasada de pre-calentado completa: %s", self.last_stats)
+            self._stop.wait(self.interval)
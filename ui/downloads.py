@@ -0,0 +1,105 @@
+# ui/downloads.py
+import os
+import streamlit as st
+
+from ui.tables import tabla_paginada
+
+from services.exports import (
+    EXCEL_MAX_ROWS, FORMATOS, ExportError, encode_chunks, export_ventas, file_name, frame_chunks, spool_to_file,
+)
+
+ETIQUETAS_FORMATO = {"csv": "CSV", "parquet": "Parquet", "xlsx": "Excel"}
+EXTRACTO_KEY = "_extracto_ruta"
+
+
+# ===============================================================
+# ⬇️ BOTONES DE DESCARGA PARA TABLAS DE LAS VISTAS
+# ===============================================================
+def botones_descarga(df, nombre: str, key: str):
+    """
+    Botones CSV / Parquet / Excel con los datos detrás de una tabla.
+    El archivo se genera solo al hacer clic (data diferida), no en cada rerun.
+    """
+    formatos = [f for f in FORMATOS if f != "xlsx" or len(df) <= EXCEL_MAX_ROWS]
+    cols = st.columns(len(formatos) + 2)
+    for col, formato in zip(cols, formatos):
+        col.download_button(
+            f"⬇️ {ETIQUETAS_FORMATO[formato]}",
+            data=lambda formato=formato: b"".join(encode_chunks(frame_chunks(df), formato)),
+            file_name=file_name(nombre, formato),
+            mime=FORMATOS[formato][0],
+            key=f"{key}_{formato}",
+            on_click="ignore",
+        )
+
+
+def _leer(ruta: str) -> bytes:
+    with open(ruta, "rb") as fh:
+        return fh.read()
+
+
+# ===============================================================
+# 📥 EXTRACTOS CRUDOS DE ventas_totales
+# ===============================================================
+def view_exportar(fecha_inicio, fecha_fin, sucursales, map_sucursales):
+    st.subheader("📥 Exportar datos crudos de ventas")
+    nombres = ", ".join(map_sucursales.get(s, str(s)) for s in sucursales) or "todas las sucursales"
+    st.caption(
+        f"Filas de ventas_totales del {fecha_inicio} al {fecha_fin} — {nombres}. "
+        "Se leen con cursor del servidor en bloques y se escriben a disco; para extractos muy grandes "
+        "usa también /api/export/ventas, que transmite el archivo sin pasar por el navegador de Streamlit."
+    )
+
+    formato = st.radio("Formato", list(FORMATOS), format_func=ETIQUETAS_FORMATO.get,
+                       horizontal=True, key="extracto_formato")
+
+    if st.button("⚙️ Generar extracto", key="extracto_generar"):
+        barra = st.progress(0.0, text="Contando filas...")
+
+        def avance(filas, total):
+            frac = min(filas / total, 1.0) if total else 0.0
+            barra.progress(frac, text=f"{filas:,} de {total:,} filas" if total else f"{filas:,} filas")
+
+        anterior = st.session_state.pop(EXTRACTO_KEY, None)
+        if anterior and os.path.exists(anterior[0]):
+            os.remove(anterior[0])
+        try:
+            ruta = spool_to_file(
+                export_ventas(formato, fecha_inicio, fecha_fin, tuple(sucursales), progress=avance),
+                suffix="." + FORMATOS[formato][1],
+            )
+        except ExportError as e:
+            barra.empty()
+            st.error(str(e))
+        else:
+            barra.progress(1.0, text="✅ Extracto listo")
+            st.session_state[EXTRACTO_KEY] = (ruta, formato)
+
+    extracto = st.session_state.get(EXTRACTO_KEY)
+    if extracto and os.path.exists(extracto[0]):
+        ruta, fmt = extracto
+        st.download_button(
+            f"⬇️ Descargar ventas_totales.{FORMATOS[fmt][1]} ({os.path.getsize(ruta) / 1e6:,.1f} MB)",
+            data=lambda: _leer(ruta),
+            file_name=file_name("ventas_totales", fmt),
+            mime=FORMATOS[fmt][0],
+            key="extracto_descargar",
+            on_click="ignore",
+        )
+
+    # Explorador de filas: paginación por llave directamente sobre ventas_totales
+    st.markdown("---")
+    st.markdown("### 🔎 Explorar filas")
+    tabla_paginada(
+        "tbl_ventas",
+        "ventas",
+        columnas=["fecha_compra", "sucursal", "order_id", "pizza_id", "quantity", "net"],
+        busqueda_label="Buscar pizza_id",
+        filtros={"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin, "sucursales": tuple(sorted(sucursales))},
+        column_config={
+            "fecha_compra": st.column_config.DatetimeColumn("Fecha de compra", format="YYYY-MM-DD HH:mm"),
+            "sucursal": st.column_config.NumberColumn("Sucursal", format="%d"),
+            "net": st.column_config.NumberColumn("Importe", format="dollar"),
+            "id_linea": None,  # solo llave de paginación
+        },
+    )
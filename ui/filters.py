@@ -1,44 +1,102 @@
 # ui/filters.py
 import calendar
 import streamlit as st
-from data.queries import get_branches
+from data.dimensions import get_dimensions
+from data.tenants import DEFAULT, SESSION_KEY, tenant_names
+from ui.fragments import SHOW_TIMINGS_KEY
 
 MONTHS = list(calendar.month_name)[1:]
 MONTHS_DICT = {calendar.month_name[i]: i for i in range(1, 13)}
+ANIOS = list(range(2020, 2026))
+
+# Modelo de filtros en st.session_state: cada widget usa su llave, así el valor
+# sobrevive a reruns parciales (fragmentos) y se inicializa una sola vez.
+# Los filtros de una sola vista (rank_*) no pueden ser llave de widget: Streamlit
+# borra el estado de los widgets que no se dibujan y se perderían al cambiar de
+# sección. Viven en su propia llave y el widget se liga con widget_state().
+FILTER_DEFAULTS = {
+    "f_anio_inicio": ANIOS[0],
+    "f_anio_fin": ANIOS[-1],
+    "f_mes_inicio": MONTHS[0],
+    "f_mes_fin": MONTHS[11],
+    "f_show_avg": True,
+    "rank_top_n": 5,
+    "rank_sucursales": [],
+}
+
+
+def init_filter_state(defaults: dict = FILTER_DEFAULTS):
+    for key, value in defaults.items():
+        if key not in st.session_state:
+            st.session_state[key] = value
+
+
+def _guardar_widget(key: str):
+    st.session_state[key] = st.session_state[f"_w_{key}"]
+
+
+def widget_state(key: str, param: str = "value") -> dict:
+    """
+    kwargs para un widget cuyo valor persiste en `key` aunque la vista no se dibuje:
+    el widget arranca con ese valor y lo devuelve a `key` al cambiar.
+    param: nombre del argumento de valor inicial ("value", o "default" en multiselect).
+    """
+    return {param: st.session_state[key], "key": f"_w_{key}", "on_change": _guardar_widget, "args": (key,)}
+
+
+# Se conservan al cambiar de franquicia (el resto de la sesión es de la anterior)
+KEEP_ON_TENANT_CHANGE = {SESSION_KEY, SHOW_TIMINGS_KEY, *FILTER_DEFAULTS} - {"rank_sucursales"}
+
+
+def _al_cambiar_franquicia():
+    # Sucursales, selecciones de fragmentos y cursores de paginación no existen en la otra base
+    for key in [k for k in st.session_state if k not in KEEP_ON_TENANT_CHANGE]:
+        del st.session_state[key]
+
+
+def tenant_selector() -> str:
+    """Selector de franquicia (solo si hay más de una); ?franquicia=<nombre> la preselecciona."""
+    nombres = tenant_names()
+    if SESSION_KEY not in st.session_state:
+        pedida = st.query_params.get("franquicia")
+        st.session_state[SESSION_KEY] = pedida if pedida in nombres else DEFAULT
+    if len(nombres) > 1:
+        st.sidebar.selectbox("🏢 Franquicia", nombres, key=SESSION_KEY, on_change=_al_cambiar_franquicia)
+    return st.session_state[SESSION_KEY]
 
 
 def sidebar_filters():
+    init_filter_state()
+    tenant_selector()
     st.sidebar.header("📂 Menú")
     vista = "Filtros"
     st.sidebar.header("🔧 Filtros")
-    anios = list(range(2020, 2026))
-    anio_inicio = st.sidebar.selectbox("Año de inicio", anios, index=0)
-    anio_fin    = st.sidebar.selectbox("Año de fin", anios, index=len(anios)-1)
-    mes_inicio  = st.sidebar.selectbox("Mes de inicio", MONTHS, index=0)
-    mes_fin     = st.sidebar.selectbox("Mes de fin", MONTHS, index=11)
+    anio_inicio = st.sidebar.selectbox("Año de inicio", ANIOS, key="f_anio_inicio")
+    anio_fin    = st.sidebar.selectbox("Año de fin", ANIOS, key="f_anio_fin")
+    mes_inicio  = st.sidebar.selectbox("Mes de inicio", MONTHS, key="f_mes_inicio")
+    mes_fin     = st.sidebar.selectbox("Mes de fin", MONTHS, key="f_mes_fin")
 
-    # === Cargar sucursales ===
-    sucs_df = get_branches()
+    # === Cargar sucursales (registro de dimensiones, cargado una vez) ===
+    sucs_dim = get_dimensions().sucursales
 
     # Mapas ID <-> Nombre legible
-    suc_label_to_id = dict(zip(sucs_df["label"], sucs_df["id_sucursal"]))
-    suc_id_to_label = dict(zip(sucs_df["id_sucursal"], sucs_df["label"]))
+    suc_label_to_id = sucs_dim.reverse_mapping("label")
+    suc_id_to_label = sucs_dim.mapping("label")
 
     # Lista visible de sucursales
-    sucs_disp = sucs_df["label"].tolist()
+    sucs_disp = sucs_dim.columns["label"].tolist()
 
-    # Multiselect → devuelve labels
-    sucs_sel_labels = st.sidebar.multiselect(
-        "Sucursal(es)",
-        sucs_disp,
-        default=sucs_disp[:2] if sucs_disp else []
-    )
+    # Multiselect → devuelve labels (por defecto las 2 primeras sucursales)
+    if "f_sucursales" not in st.session_state:
+        st.session_state["f_sucursales"] = sucs_disp[:2]
+    sucs_sel_labels = st.sidebar.multiselect("Sucursal(es)", sucs_disp, key="f_sucursales")
 
     # Convertir labels a IDs
     sucs_sel = [suc_label_to_id[label] for label in sucs_sel_labels]
 
     st.sidebar.subheader("Opciones del gráfico")
-    show_avg = st.sidebar.checkbox("Mostrar línea de promedio", value=True)
+    show_avg = st.sidebar.checkbox("Mostrar línea de promedio", key="f_show_avg")
+    st.sidebar.checkbox("⏱️ Mostrar tiempos de rerun", key=SHOW_TIMINGS_KEY)
 
     # === EL RETURN CORRECTO ===
     return {
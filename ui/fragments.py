@@ -0,0 +1,75 @@
+# ui/fragments.py
+import contextlib
+import functools
+import time
+import streamlit as st
+
+from data.admission import DEGRADABLE, QueryCancelled, collect_stale
+
+# st.fragment (Streamlit >= 1.37) o st.experimental_fragment en versiones previas
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+TIMINGS_KEY = "_rerun_timings"
+SHOW_TIMINGS_KEY = "mostrar_tiempos"
+MAX_TIMINGS = 50
+
+
+# ===============================================================
+# ⏱️ TIEMPOS DE RERUN
+# ===============================================================
+def registrar_tiempo(nombre: str, segundos: float, mostrar: bool = True):
+    """Guarda el tiempo de una ejecución (script o fragmento) en la sesión."""
+    tiempos = st.session_state.setdefault(TIMINGS_KEY, [])
+    tiempos.append({"seccion": nombre, "ms": round(segundos * 1000, 1), "hora": time.strftime("%H:%M:%S")})
+    del tiempos[:-MAX_TIMINGS]
+    if mostrar and st.session_state.get(SHOW_TIMINGS_KEY):
+        st.caption(f"⏱️ {nombre}: {segundos * 1000:,.1f} ms")
+
+
+def tiempos_recientes(n: int = 15) -> list[dict]:
+    return list(reversed(st.session_state.get(TIMINGS_KEY, [])[-n:]))
+
+
+# ===============================================================
+# 🛟 CONSULTAS CANCELADAS, VENCIDAS O DEGRADADAS
+# ===============================================================
+@contextlib.contextmanager
+def tolerante():
+    """
+    Una consulta cancelada (el usuario cambió filtros) termina el bloque en
+    silencio: Streamlit ya tiene el rerun pendiente. Timeout o sobrecarga sin
+    versión previa se muestran como aviso; las cachés que sirvieron datos de
+    una versión anterior se señalan al final del bloque.
+    """
+    with collect_stale() as avisos:
+        try:
+            yield
+        except QueryCancelled:
+            pass
+        except DEGRADABLE as e:
+            st.warning(f"⏳ {e}. Intenta de nuevo en unos segundos o acota los filtros.")
+    if avisos:
+        st.caption("🕰️ Algunos datos son de la versión anterior: la consulta actual "
+                   "excedió su tiempo o el servidor está ocupado.")
+
+
+# ===============================================================
+# 🧩 SECCIONES COMO FRAGMENTOS
+# ===============================================================
+def seccion(nombre: str):
+    """
+    Convierte una sección de vista en un fragmento independiente:
+    sus widgets solo re-ejecutan la sección, no todo el script.
+    Cada ejecución queda medida con registrar_tiempo.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def medida(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                with tolerante():
+                    return fn(*args, **kwargs)
+            finally:
+                registrar_tiempo(nombre, time.perf_counter() - t0)
+        return _fragment(medida) if _fragment else medida
+    return decorator
@@ -0,0 +1,95 @@
+# ui/tables.py
+import streamlit as st
+
+from data.pagination import DEFAULT_PAGE_SIZE, FUENTES, cached_count, cached_page
+
+PAGE_SIZES = (25, 50, 100, 250)
+ROW_HEIGHT = 35  # alto aproximado de fila en st.dataframe (para fijar la altura de la grilla)
+
+
+# ===============================================================
+# 📄 TABLA PAGINADA
+# ===============================================================
+# Solo la página visible se consulta y se serializa al navegador. Las fuentes SQL
+# (data.pagination.FUENTES) paginan por llave; los agregados en memoria usan FramePager.
+# La pila de cursores vive en session_state: "Anterior" es un pop, "Siguiente" un push.
+
+def _cursores(key: str) -> list:
+    return st.session_state.setdefault(f"{key}_cursores", [None])
+
+
+def _siguiente(key: str, cursor):
+    _cursores(key).append(cursor)
+
+
+def _anterior(key: str):
+    pila = _cursores(key)
+    if len(pila) > 1:
+        pila.pop()
+
+
+def _etiqueta(column_config: dict | None, columna: str) -> str:
+    cfg = (column_config or {}).get(columna)
+    if isinstance(cfg, str):
+        return cfg
+    return (cfg or {}).get("label") or columna
+
+
+def tabla_paginada(key: str, fuente, columnas: list | None = None, column_config: dict | None = None,
+                   orden: str | None = None, desc: bool = True, busqueda_label: str | None = None,
+                   filtros: dict | None = None, page_size: int = DEFAULT_PAGE_SIZE):
+    """
+    fuente: nombre de una fuente SQL registrada o un FramePager.
+    columnas: columnas que se pueden ordenar (por defecto todas las de la fuente).
+    filtros: filtros de servidor para fuentes SQL (fecha_inicio, fecha_fin, sucursales).
+    """
+    filtros = filtros or {}
+    sql = isinstance(fuente, str)
+    if columnas is None:
+        columnas = list(FUENTES[fuente].columnas) if sql else list(fuente.df.columns)
+    if orden is None:
+        orden = FUENTES[fuente].orden_default if sql else columnas[0]
+    etiquetas = {c: _etiqueta(column_config, c) for c in columnas}
+
+    c1, c2, c3, c4 = st.columns([3, 2, 3, 2])
+    orden = c1.selectbox("Ordenar por", columnas, index=columnas.index(orden), key=f"{key}_orden",
+                         format_func=lambda c: etiquetas.get(c, c))
+    desc = c2.toggle("Descendente", value=desc, key=f"{key}_desc")
+    tiene_busqueda = FUENTES[fuente].busqueda if sql else fuente.busqueda
+    texto = c3.text_input(busqueda_label or "Buscar", key=f"{key}_texto").strip() if tiene_busqueda else ""
+    limite = c4.selectbox("Filas por página", PAGE_SIZES,
+                          index=PAGE_SIZES.index(page_size) if page_size in PAGE_SIZES else 1,
+                          key=f"{key}_limite")
+
+    # Cambió el orden o algún filtro: la paginación vuelve al inicio
+    firma = (orden, desc, texto, limite, tuple(sorted((k, str(v)) for k, v in filtros.items())))
+    if st.session_state.get(f"{key}_firma") != firma:
+        st.session_state[f"{key}_firma"] = firma
+        st.session_state[f"{key}_cursores"] = [None]
+    pila = _cursores(key)
+    cursor = pila[-1]
+
+    if sql:
+        pagina = cached_page(fuente, orden, desc, cursor, limite, texto, **filtros)
+        total = cached_count(fuente, texto, **filtros)
+    else:
+        pagina = fuente.page(orden, desc, cursor, limite, texto=texto)
+        total = fuente.count(texto)
+
+    hay_siguiente = len(pagina) > limite
+    pagina = pagina.iloc[:limite]
+
+    # Altura fija: la grilla virtualiza el scroll y no crece con la página
+    st.dataframe(pagina, hide_index=True, use_container_width=True, column_config=column_config,
+                 height=min(len(pagina), 15) * ROW_HEIGHT + ROW_HEIGHT + 3)
+
+    inicio = (len(pila) - 1) * limite
+    n1, n2, n3 = st.columns([1, 4, 1])
+    n1.button("◀ Anterior", key=f"{key}_prev", disabled=len(pila) == 1, on_click=_anterior, args=(key,))
+    n2.caption(f"Página {len(pila):,} · filas {inicio + 1 if len(pagina) else 0:,}–{inicio + len(pagina):,} "
+               f"de {total:,}")
+    if hay_siguiente:
+        siguiente = FUENTES[fuente].cursor_of(pagina.iloc[-1], orden) if sql else (cursor or 0) + limite
+    n3.button("Siguiente ▶", key=f"{key}_next", disabled=not hay_siguiente, on_click=_siguiente,
+              args=(key, siguiente if hay_siguiente else None))
+    return pagina
@@ -3,16 +3,13 @@ import os, sys
 import streamlit as st
 import pandas as pd
 from calendar import monthrange
-import altair as alt
 
 from data.queries import get_top5_sucursales
 from services.analytics import preparar_top5
 
 from data.queries import get_top_pizzas
 
-from data.queries import get_pareto_productos
-from services.analytics import calcular_pareto_productos
-from charts.sales_charts import grafico_pareto_productos
+from services.pareto import get_pareto_productos_abc, get_pareto_sucursales_abc
 
 
 # ===== Ajuste de rutas para imports =====
@@ -22,32 +19,36 @@ if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
 # ===== IMPORTS =====
+# altair / charts.* se importan dentro de cada vista: no pagan en el arranque en frío
 
 def _debug_toggle():
     return st.sidebar.checkbox("🛠️ Modo debug", value=False, help="Muestra datos y trazas internas")
 
-from charts.sales_charts import (
-    chart_monthly_bars, chart_comparison_lines, chart_small_multiples,
-    grafico_ranking_sucursales, grafico_ranking_generico
-)
-
 from data.queries import (
-    get_ventas, get_sucursales, get_monthly_total, get_monthly_sales,
-    get_table_range_diag, get_top5_sucursales, get_top_pizzas
+    get_ventas, get_monthly_total, get_monthly_sales,
+    get_table_range_diag, get_top5_sucursales, get_top_pizzas,
+    cached_monthly_total, cached_monthly_sales, cached_top_pizzas, load_fact_data
 )
+from data.dimensions import get_dimensions
+from data.rollups import get_monthly_rollup
+from data.config import DISTINCT_MODE
+from services.warmer import record_usage
+from data.versioning import get_versions
+from data.cache import versioned_cache
+from ui.fragments import seccion
+from ui.downloads import botones_descarga
+from ui.tables import tabla_paginada
+from data.pagination import FramePager
+from ui.filters import init_filter_state, widget_state
 
 from services.analytics import (
-    calcular_kpis_generales, summary_two_branches, t_test_two_branches
+    calcular_kpis_generales, calcular_kpis_aproximados, summary_two_branches, t_test_two_branches
 )
 
 from services.transforms import (
     add_month_name, add_period, wide_table_month_branch, fill_missing_months,
     month_pairs_between, fill_missing_months_range
 )
-from charts.sales_charts import (
-    chart_monthly_bars, chart_comparison_lines, chart_small_multiples,
-    grafico_ranking_sucursales, grafico_ranking_generico
-)
 
 # ===============================================================
 # 🔧 UTILIDADES GENERALES
@@ -68,39 +69,63 @@ def compute_date_range(anio_inicio, anio_fin, months_dict, mes_inicio, mes_fin):
 # ===============================================================
 # 🧮 CACHES
 # ===============================================================
-@st.cache_data(show_spinner=False)
-def _cached_monthly_total(fi, ff, sucs_sel):
-    return get_monthly_total(fi, ff, sucs_sel)
-
-@st.cache_data(show_spinner=False)
-def _cached_monthly_sales(fi, ff, sucs_sel):
-    return get_monthly_sales(fi, ff, sucs_sel)
-
-@st.cache_data(ttl=900, show_spinner=False)
-def _load_data():
-    ventas = get_ventas()
-    sucursales = get_sucursales()[["id_sucursal", "nombre", "ciudad"]]
-
-    df = ventas.merge(sucursales, left_on="sucursal", right_on="id_sucursal", how="left")
-    df["fecha_compra"] = pd.to_datetime(df["fecha_compra"])
-    df["anio"] = df["fecha_compra"].dt.year
-    df["mes"] = df["fecha_compra"].dt.month_name()
-    return df
+# Cachés de consultas compartidas con la API (data/queries.py)
+_cached_monthly_total = cached_monthly_total
+_cached_monthly_sales = cached_monthly_sales
+_get_top_pizzas_cached = cached_top_pizzas
 
-@st.cache_data(ttl=1200, show_spinner=False)
-def _sucursales_lookup():
-    sucs = get_sucursales()[["id_sucursal", "nombre"]].copy()
-    id2name = dict(zip(sucs["id_sucursal"], sucs["nombre"]))
-    name2id = dict(zip(sucs["nombre"], sucs["id_sucursal"]))
-    return sucs, id2name, name2id
+_load_data = load_fact_data
 
-@st.cache_data(ttl=600, show_spinner=False)
-def _get_top_pizzas_cached(top_n: int, ids: tuple[int, ...]):
-    return get_top_pizzas(top_n=top_n, sucursales_ids=list(ids))
+def _sucursales_lookup():
+    sucs = get_dimensions().sucursales
+    return sucs.frame[["id_sucursal", "nombre"]], sucs.mapping("nombre"), sucs.reverse_mapping("nombre")
+
+def _with_branch_labels(df, columns=("nombre",)):
+    """Agrega columnas legibles de la sucursal (desde el registro) a un agregado por id."""
+    dims = get_dimensions()
+    df = df.copy()
+    for col in columns:
+        df[col] = dims.branch_labels(df["sucursal"], col)
+    return df
 
-@st.cache_data(ttl=600, show_spinner=False)
-def _compute_kpis(df):
-    return calcular_kpis_generales(df)
+# Cálculos de la vista KPIs: dependen solo de la versión de ventas_totales,
+# así un rerun por cambio de filtros no vuelve a recorrer la tabla de hechos.
+# La versión llega como argumento; versioned_cache() solo agrega la franquicia y
+# pone las entradas bajo el presupuesto de memoria (data/memory.py).
+def _fact_version():
+    return get_versions("ventas_totales")
+
+@versioned_cache()
+def _agregados_por_version(version):
+    # Un solo paso (multi-proceso si hay varios núcleos) para métricas, YoY y sucursales
+    from services.parallel import aggregate_facts
+    return aggregate_facts(_load_data())
+
+@versioned_cache()
+def _kpis_por_version(version):
+    if DISTINCT_MODE == "hll":
+        return calcular_kpis_aproximados(get_monthly_rollup())
+    agg = _agregados_por_version(version)
+    return agg["total_ventas"], agg["total_ordenes"], agg["ticket_promedio"]
+
+@versioned_cache()
+def _yoy_por_version(version):
+    # Mismo tramo del año anterior (meses completos): el año en curso no aparece como caída
+    from services.analytics import calcular_crecimiento_anual_desde_totales
+    from services.periods import get_period_engine
+    return calcular_crecimiento_anual_desde_totales(get_period_engine().anual())
+
+@versioned_cache()
+def _resumen_sucursales_por_version(version):
+    """Por id de sucursal: ventas_totales, total_ordenes, ticket_promedio."""
+    if DISTINCT_MODE == "hll":
+        # Órdenes por sucursal combinando los sketches mensuales del rollup
+        return get_monthly_rollup().branch_summary()
+    return _agregados_por_version(version)["por_sucursal"]
+
+@versioned_cache()
+def _filas_por_version(version):
+    return int(get_monthly_rollup().table["lineas"].sum())
 
 # ===============================================================
 # 📊 VISTA KPIs
@@ -109,30 +134,39 @@ def kpis_view():
     st.title("📊 Indicadores Clave de Rendimiento (KPIs)")
     st.markdown("Explora las métricas principales y rankings de desempeño por sucursal y producto.")
 
+    # Cada sección es un fragmento: se vuelve a ejecutar sola si cambian sus widgets
+    _kpis_metricas()
+    _kpis_yoy()
+    _kpis_periodos()
+    _kpis_top5()
+    _kpis_pareto_sucursales()
+    _kpis_participacion()
+    _kpis_anomalias()
+
+
+@seccion("KPIs · métricas")
+def _kpis_metricas():
     with st.spinner("Cargando datos y calculando KPIs..."):
-        df = _load_data()
-        total_ventas, total_ordenes, ticket_promedio = _compute_kpis(df)
+        total_ventas, total_ordenes, ticket_promedio = _kpis_por_version(_fact_version())
 
     col1, col2, col3 = st.columns(3)
     col1.metric("💰 Ventas Totales", f"${total_ventas:,.2f}")
     col2.metric("🧾 Órdenes Totales", f"{total_ordenes:,}")
     col3.metric("🎟️ Ticket Promedio", f"${ticket_promedio:,.2f}")
-    
-    
-    
+    if DISTINCT_MODE == "hll":
+        st.caption(f"≈ Órdenes estimadas con HyperLogLog (error estándar ±{get_monthly_rollup().error:.2%}).")
 
-    
-    
-    ####
-    # ================================
+
+# ================================
 # 📈 CRECIMIENTO ANUAL (YoY)
 # ================================
-    from services.analytics import calcular_crecimiento_anual
+@seccion("KPIs · YoY")
+def _kpis_yoy():
     from charts.sales_charts import chart_crecimiento_anual
 
     st.markdown("## 📈 Crecimiento Anual (YoY)")
 
-    df_yoy = calcular_crecimiento_anual(df)
+    df_yoy = _yoy_por_version(_fact_version())
 
     st.dataframe(
         df_yoy[["anio", "ventas_formato", "crecimiento_formato"]]
@@ -144,15 +178,76 @@ def kpis_view():
         use_container_width=True
     )
 
+    parciales = df_yoy[df_yoy["parcial"] & df_yoy["crecimiento"].notna()]
+    for _, fila in parciales.iterrows():
+        st.caption(f"{int(fila['anio'])}: crecimiento sobre los primeros {int(fila['meses'])} meses "
+                   f"completos, contra los mismos meses de {int(fila['anio']) - 1}.")
+
     st.altair_chart(chart_crecimiento_anual(df_yoy), use_container_width=True)
 
 
+@seccion("KPIs · periodos")
+def _kpis_periodos():
+    from services.periods import get_period_engine, etiqueta_periodo
+
+    st.markdown("## 🗓️ Comparación entre periodos")
+    c1, c2, c3 = st.columns(3)
+    nivel = c1.radio("Por", ["Total", "Sucursal", "Ciudad", "Producto"], horizontal=True, key="periodos_por")
+    medidas = {"ventas": "Ventas ($)", "cantidad": "Pizzas vendidas"}
+    if nivel != "Producto":
+        medidas["ordenes"] = "Órdenes"
+    medida = c2.selectbox("Medida", list(medidas), format_func=medidas.get, key="periodos_medida")
+
+    eng = get_period_engine("producto" if nivel == "Producto" else "sucursal")
+    if eng.p0 is None:
+        st.info("Sin datos para comparar.")
+        return
+    periodos = list(range(eng.ultimo_periodo, eng.p0 - 1, -1))
+    defecto = periodos.index(eng.ultimo_completo) if eng.ultimo_completo in periodos else 0
+    periodo = c3.selectbox("Mes", periodos, index=defecto, format_func=etiqueta_periodo, key="periodos_mes",
+                           help="Por defecto el último mes completo: un mes en curso compararía días parciales.")
+
+    dims = get_dimensions()
+    por, etiquetas = {
+        "Total": (None, None),
+        "Sucursal": ("sucursal", dims.sucursales.mapping("label")),
+        "Ciudad": ("sucursal", dims.sucursales.mapping("ciudad")),
+        "Producto": ("pizza_id", dims.pizzas.mapping("nombre")),
+    }[nivel]
+    df = eng.comparar(periodo, medida if medida in eng.medidas else "ventas", por=por, etiquetas=etiquetas)
+
+    fmt = (lambda x: "---" if pd.isna(x) else f"${x:,.2f}") if medida == "ventas" else \
+          (lambda x: "---" if pd.isna(x) else f"{x:,.0f}")
+    if por is None:
+        tabla = df.assign(
+            Periodo=df["desde"] + " → " + df["hasta"],
+            Actual=df["actual"].apply(fmt), Base=df["anterior"].apply(fmt),
+            Variación=df["variacion"].apply(lambda x: "---" if pd.isna(x) else f"{x:+.2f}%"),
+        )[["comparacion", "Periodo", "Actual", "Base", "Variación"]].rename(columns={"comparacion": "Comparación"})
+        st.dataframe(tabla, hide_index=True, use_container_width=True)
+    else:
+        # Una fila por grupo, una columna de variación por comparación
+        ancho = df.pivot_table(index="grupo", columns="comparacion", values="variacion", sort=False, dropna=False)
+        actual = df[df["comparacion"] == df["comparacion"].iloc[0]].set_index("grupo")["actual"]
+        ancho.insert(0, f"{medidas[medida]} {etiqueta_periodo(periodo)}", actual.apply(fmt))
+        for col in ancho.columns[1:]:
+            ancho[col] = ancho[col].apply(lambda x: "---" if pd.isna(x) else f"{x:+.2f}%")
+        st.dataframe(ancho, use_container_width=True)
+    botones_descarga(df, "comparacion_periodos", key="dl_periodos")
+
+
+@seccion("KPIs · Top 5")
+def _kpis_top5():
+    from charts.sales_charts import grafico_ranking_sucursales
+
     st.markdown("---")
     st.subheader("🏆 Top 5 Sucursales por Ventas Totales")
 
-    ranking = (
-        df.groupby("nombre", as_index=False)["net"]
-        .sum()
+    version = _fact_version()
+    resumen = _resumen_sucursales_por_version(version)
+    ranking = _with_branch_labels(
+        resumen[["sucursal", "ventas_totales"]]
+        .rename(columns={"ventas_totales": "net"})
         .sort_values(by="net", ascending=False)
         .head(5)
     )
@@ -165,32 +260,25 @@ def kpis_view():
     )
 
     grafico_ranking_sucursales(ranking)
-    st.caption(f"📊 Datos procesados: {len(df):,} filas, {df['nombre'].nunique()} sucursales totales.")
-    
-    
-    
+    st.caption(f"📊 Datos procesados: {_filas_por_version(version):,} filas, {len(resumen)} sucursales totales.")
 
 
-    
-    
-    
-    # ===============================================================
+# ===============================================================
 #  Gráfico Pareto de Ventas por Sucursal
 # ===============================================================
+@seccion("KPIs · Pareto sucursales")
+def _kpis_pareto_sucursales():
+    import altair as alt
+
     st.markdown("## 📈 Análisis Pareto de Ventas por Sucursal")
 
-    df_pareto = (
-        df.groupby("nombre", as_index=False)["net"]
-        .sum()
-        .sort_values(by="net", ascending=False)
+    # Precalculado por versión de datos (services/pareto.py)
+    pareto_sucs = get_pareto_sucursales_abc()
+    df_pareto = pareto_sucs.to_frame(name_col="nombre")
+    st.caption(
+        f"🔎 {pareto_sucs.items_covering(0.8)} de {len(pareto_sucs)} sucursales cubren el 80% de las ventas."
     )
 
-    df_pareto["ventas"] = df_pareto["net"]
-    df_pareto["ventas_acum"] = df_pareto["ventas"].cumsum()
-    df_pareto["porcentaje_acum"] = df_pareto["ventas_acum"] / df_pareto["ventas"].sum()
-    
-    
-
     # 🔹 Gráfico de barras (ventas por sucursal)
     bars = alt.Chart(df_pareto).mark_bar(color="#4CC9F0").encode(
         x=alt.X("nombre:N", sort=df_pareto["nombre"].tolist(), title="Sucursal"),
@@ -215,35 +303,24 @@ def kpis_view():
         height=450,
         title="Pareto de Ventas por Sucursal"
     )
-    
-    
 
     st.altair_chart(pareto_chart, use_container_width=True)
 
 
-    
-    
-    
-        # =======================================================
-    #  PARTICIPACIÓN POR SUCURSAL (%)
-    # =======================================================
+# =======================================================
+#  PARTICIPACIÓN POR SUCURSAL (%)
+# =======================================================
+@seccion("KPIs · participación")
+def _kpis_participacion():
+    from charts.sales_charts import chart_participacion_sucursales
+
     st.markdown("---")
     st.subheader("🏙️ Participación por Sucursal en las Ventas Totales")
 
     # Agrupación por sucursal y ciudad
-    participacion = (
-        df.groupby(["nombre", "ciudad"])
-        .agg(
-            ventas_totales=("net", "sum"),
-            total_ordenes=("order_id", "nunique"),
-        )
-        .reset_index()
-    )
-
-    # Ticket promedio
-    participacion["ticket_promedio"] = (
-        participacion["ventas_totales"] / participacion["total_ordenes"]
-    )
+    participacion = _with_branch_labels(
+        _resumen_sucursales_por_version(_fact_version()), columns=("nombre", "ciudad")
+    )[["nombre", "ciudad", "ventas_totales", "total_ordenes", "ticket_promedio"]]
 
     # Porcentaje sobre total global
     total_global = participacion["ventas_totales"].sum()
@@ -251,54 +328,124 @@ def kpis_view():
         participacion["ventas_totales"] / total_global * 100
     )
 
-    # Tabla formateada
-    participacion_fmt = participacion.assign(
-        ventas_totales=lambda x: x["ventas_totales"].apply(lambda v: f"${v:,.2f}"),
-        total_ordenes=lambda x: x["total_ordenes"].apply(lambda v: f"{v:,}"),
-        ticket_promedio=lambda x: x["ticket_promedio"].apply(lambda v: f"${v:,.2f}"),
-        porcentaje=lambda x: x["porcentaje"].apply(lambda v: f"{v:.2f}%")
+    # Tabla paginada: orden/búsqueda en el servidor, solo la página visible va al navegador
+    tabla_paginada(
+        "tbl_participacion",
+        FramePager(participacion, busqueda="nombre"),
+        orden="ventas_totales",
+        busqueda_label="Buscar sucursal",
+        column_config={
+            "nombre": st.column_config.TextColumn("Sucursal"),
+            "ciudad": st.column_config.TextColumn("Ciudad"),
+            "ventas_totales": st.column_config.NumberColumn("Ventas Totales", format="dollar"),
+            "total_ordenes": st.column_config.NumberColumn("Órdenes", format="localized"),
+            "ticket_promedio": st.column_config.NumberColumn("Ticket Promedio", format="dollar"),
+            "porcentaje": st.column_config.NumberColumn("Participación", format="%.2f%%"),
+        },
     )
+    botones_descarga(participacion, "participacion_sucursales", key="dl_participacion")
 
-    st.dataframe(
-        participacion_fmt,
-        use_container_width=True
+    # Gráfico donut
+    chart_participacion_sucursales(participacion)
+
+
+# =======================================================
+#  ANOMALÍAS DIARIAS POR SUCURSAL
+# =======================================================
+@seccion("KPIs · anomalías")
+def _kpis_anomalias():
+    import altair as alt
+    from services.anomalies import get_anomaly_detector
+    from data.config import ANOMALY_THRESHOLD
+
+    st.markdown("---")
+    st.subheader("🚨 Anomalías en ventas diarias")
+    st.caption(
+        "Cada día se compara con la mediana de los mismos días de la semana en las semanas previas "
+        "de su sucursal; se marca cuando el z robusto (basado en la MAD) supera el umbral."
     )
 
+    with st.spinner("Actualizando líneas base..."):
+        det = get_anomaly_detector()
+    if det.d0 is None:
+        st.info("Aún no hay ventas para construir líneas base.")
+        return
 
-    # Gráfico donut
-    from charts.sales_charts import chart_participacion_sucursales
-    chart_participacion_sucursales(participacion)
+    col1, col2 = st.columns(2)
+    umbral = col1.slider("Umbral |z|", 2.0, 8.0, float(ANOMALY_THRESHOLD), 0.5, key="anom_umbral")
+    dias = col2.selectbox("Periodo", [30, 90, 180, 365], index=1, key="anom_dias",
+                          format_func=lambda d: f"Últimos {d} días")
+    ff = det.ultimo_dia
+    fi = ff - (dias - 1)
+
+    anomalias = det.anomalies(str(fi), str(ff), threshold=umbral)
+    if anomalias.empty:
+        st.success("✅ Sin anomalías en el periodo.")
+        return
+
+    anomalias = _with_branch_labels(anomalias)
+    st.dataframe(
+        anomalias[["nombre", "fecha", "dia_semana", "ventas", "esperado", "z", "tipo"]]
+            .rename(columns={"nombre": "Sucursal", "fecha": "Fecha", "dia_semana": "Día",
+                             "ventas": "Ventas", "esperado": "Esperado", "z": "z", "tipo": "Tipo"})
+            .style.format({"Ventas": "${:,.2f}", "Esperado": "${:,.2f}", "z": "{:+.1f}",
+                           "Fecha": lambda d: d.strftime("%Y-%m-%d")}),
+        hide_index=True, use_container_width=True
+    )
+
+    # Serie de la sucursal elegida con su banda esperada
+    etiquetas = dict(zip(anomalias["sucursal"], anomalias["nombre"]))
+    suc = st.selectbox("Sucursal a graficar", list(etiquetas), format_func=etiquetas.get, key="anom_sucursal")
+    serie = det.series(suc, str(fi), str(ff), threshold=umbral)
+    serie["anomalia"] = serie["z"].abs() >= umbral
+
+    base = alt.Chart(serie).encode(x=alt.X("fecha:T", title="Fecha"))
+    banda = base.mark_area(opacity=0.2).encode(y=alt.Y("banda_inf:Q", title="Ventas ($)"), y2="banda_sup:Q")
+    linea = base.mark_line().encode(y="ventas:Q")
+    puntos = base.transform_filter(alt.datum.anomalia).mark_circle(size=80, color="red").encode(
+        y="ventas:Q",
+        tooltip=[alt.Tooltip("fecha:T", title="Fecha"),
+                 alt.Tooltip("ventas:Q", title="Ventas ($)", format=",.2f"),
+                 alt.Tooltip("esperado:Q", title="Esperado ($)", format=",.2f"),
+                 alt.Tooltip("z:Q", format="+.1f")]
+    )
+    st.altair_chart((banda + linea + puntos).properties(height=300), use_container_width=True)
 
-    
-    
-    
-    
-    
 
 # ===============================================================
 #  RANKING DE PRODUCTOS (PIZZAS)
 # ===============================================================
 def ranking_pizzas_view():
-   # st.warning(" DEBUG: Entró a la función ranking_pizzas_view()")
-   # st.warning("Entró correctamente a ranking_pizzas_view()")
+    init_filter_state()
     st.subheader("🍕 Ranking de Productos (Pizzas)")
 
-    top_n = st.number_input("📈 Mostrar Top N productos", min_value=1, max_value=50, value=5, step=1)
+    # Top N y Pareto son fragmentos separados: cambiar top_n o el filtro
+    # de sucursales solo re-ejecuta la sección del Top N.
+    _ranking_top_n()
+    _ranking_pareto_productos()
+
+
+@seccion("Ranking · Top N")
+def _ranking_top_n():
+    from charts.sales_charts import grafico_ranking_generico
+
+    top_n = st.number_input("📈 Mostrar Top N productos", min_value=1, max_value=50, step=1,
+                            **widget_state("rank_top_n"))
     sucs_df, id2name, name2id = _sucursales_lookup()
     opciones_sucs = sucs_df["nombre"].tolist()
 
     sucs_sel_names = st.multiselect(
         "🏙️ Filtrar por sucursal (opcional)",
         options=opciones_sucs,
+        **widget_state("rank_sucursales", "default"),
         help="Si lo dejas vacío, mostrará el ranking general de todas las sucursales."
     )
-    sucs_sel_ids = tuple(name2id[n] for n in sucs_sel_names)
+    sucs_sel_ids = tuple(sorted(name2id[n] for n in sucs_sel_names))
+    record_usage("top", top_n=int(top_n), sucursales=sucs_sel_ids)
 
     with st.spinner("Consultando base de datos..."):
         df = _get_top_pizzas_cached(int(top_n), sucs_sel_ids)
 
-    
-
     df["ventas_formateadas"] = df["ventas"].apply(lambda x: f"${x:,.2f}")
     df["cantidad_formateada"] = df["cantidad"].apply(lambda x: f"{x:,.0f}")
 
@@ -308,51 +455,54 @@ def ranking_pizzas_view():
           .rename(columns={"nombre": "Producto", "cantidad_formateada": "Cantidad", "ventas_formateadas": "Ventas ($)"}),
         use_container_width=True
     )
+    botones_descarga(df[["nombre", "cantidad", "ventas"]], f"top_{int(top_n)}_pizzas", key="dl_top_pizzas")
 
     st.markdown("### 📊 Visualización")
     titulo = f"Top {top_n} pizzas más vendidas" + ("" if not sucs_sel_names else f" — filtro: {', '.join(sucs_sel_names)}")
     grafico_ranking_generico(df, titulo=titulo)
-    
-    
-    
-            # ===============================================================
+
+
+# ===============================================================
 #  PARETO DE PRODUCTOS (PIZZAS)
 # ===============================================================
+@seccion("Ranking · Pareto productos")
+def _ranking_pareto_productos():
+    from charts.sales_charts import grafico_pareto_productos
+
     st.markdown("---")
     st.header("🍕 Análisis Pareto de Ventas por Producto")
 
     with st.spinner("Generando Pareto de productos..."):
-        df_prod = get_pareto_productos()
-
-        # 🔥 FORZAR ORDEN ANTES DEL CÁLCULO
-        df_prod = df_prod.sort_values(by="ventas", ascending=False).reset_index(drop=True)
-
-        df_prod = calcular_pareto_productos(df_prod)
-
-    st.caption(f"🔎 Datos procesados: {len(df_prod):,} productos analizados.")
-
-    tabla_pareto = df_prod.copy()
-
-    tabla_pareto["ventas"] = tabla_pareto["ventas"].apply(lambda x: f"${x:,.2f}")
-    tabla_pareto["ventas_acum"] = tabla_pareto["ventas_acum"].apply(lambda x: f"${x:,.2f}")
-    tabla_pareto["porcentaje_acum"] = tabla_pareto["porcentaje_acum"].apply(lambda x: f"{x*100:.2f}%")
+        # Ya viene ordenado y acumulado (precalculado por versión de datos)
+        pareto_prod = get_pareto_productos_abc()
+        df_prod = pareto_prod.to_frame()
+
+    clases = pareto_prod.class_counts()
+    st.caption(
+        f"🔎 Datos procesados: {len(df_prod):,} productos analizados. "
+        f"{pareto_prod.items_covering(0.8)} productos cubren el 80% de las ventas "
+        f"(A: {clases['A']}, B: {clases['B']}, C: {clases['C']})."
+    )
 
-    st.dataframe(
-        tabla_pareto[["producto", "ventas", "ventas_acum", "porcentaje_acum"]],
-        use_container_width=True
-)
-    
-    
+    tabla_paginada(
+        "tbl_pareto_productos",
+        FramePager(df_prod[["producto", "ventas", "ventas_acum", "porcentaje_acum", "clase"]], busqueda="producto"),
+        orden="ventas",
+        busqueda_label="Buscar producto",
+        column_config={
+            "producto": st.column_config.TextColumn("Producto"),
+            "ventas": st.column_config.NumberColumn("Ventas", format="dollar"),
+            "ventas_acum": st.column_config.NumberColumn("Ventas acumuladas", format="dollar"),
+            "porcentaje_acum": st.column_config.NumberColumn("% acumulado", format="percent"),
+            "clase": st.column_config.TextColumn("Clase ABC"),
+        },
+    )
+    botones_descarga(df_prod, "pareto_productos", key="dl_pareto_productos")
 
     chart_prod = grafico_pareto_productos(df_prod)
     st.altair_chart(chart_prod, use_container_width=True)
 
 
-
-
-    
-
-
 def view_placeholder(title: str):
     """
     Placeholder genérico usado para vistas que aún no están implementadas.
@@ -366,16 +516,17 @@ def view_placeholder(title: str):
 #  COMPARAR SUCURSALES 
 # ===============================================================
 from services.analytics import get_branch_comparison_data
-from charts.sales_charts import chart_comparison_lines
 
 
 def view_comparar_sucursales(fecha_inicio, fecha_fin, sucursales, map_sucursales):
+    import altair as alt
 
     st.subheader("🏙️ Comparar Sucursales")
 
     # Validación mínima
     if len(sucursales) < 2:
         st.warning("⚠️ Debes seleccionar al menos **2 sucursales** para comparar.")
+        _comparar_grupos(fecha_inicio, fecha_fin, tuple(sorted(sucursales)))
         return
 
     st.write("🔍 Rango seleccionado:", fecha_inicio, "→", fecha_fin)
@@ -420,11 +571,15 @@ def view_comparar_sucursales(fecha_inicio, fecha_fin, sucursales, map_sucursales
 
     # Mostrar tabla resumen normal
     st.dataframe(resumen, use_container_width=True)
+    botones_descarga(
+        df[["sucursal", "sucursal_nombre", "anio", "mes", "periodo", "total_ventas"]],
+        "comparacion_sucursales", key="dl_comparacion"
+    )
 
     # ======================================================
-    #  COMPARACIÓN DIRECTA (solo si hay 2 sucursales)
+    #  COMPARACIÓN DIRECTA (2 sucursales) O N-VÍAS
     # ======================================================
-    from services.analytics import comparar_dos_sucursales
+    from services.analytics import comparar_dos_sucursales, comparar_n_sucursales
 
     if len(resumen) == 2:
         st.subheader("🔍 Comparación directa entre sucursales")
@@ -433,8 +588,9 @@ def view_comparar_sucursales(fecha_inicio, fecha_fin, sucursales, map_sucursales
         tabla_comparacion = comparar_dos_sucursales(resumen)
 
         st.dataframe(tabla_comparacion, hide_index=True)
-    else:
-        st.info("Selecciona exactamente 2 sucursales para mostrar la comparación.")
+    elif len(resumen) > 2:
+        st.subheader("🔍 Comparación entre sucursales")
+        st.dataframe(comparar_n_sucursales(resumen), hide_index=True, use_container_width=True)
     
 
     # ======================================================
@@ -465,16 +621,342 @@ def view_comparar_sucursales(fecha_inicio, fecha_fin, sucursales, map_sucursales
 
     st.altair_chart(chart, use_container_width=True)
 
+    # ======================================================
+    #  COMPARACIÓN POR GRUPOS (CIUDAD, ANTIGÜEDAD, COHORTES)
+    # ======================================================
+    _comparar_grupos(fecha_inicio, fecha_fin, tuple(sorted(sucursales)))
+
+    # ======================================================
+    #  PROYECCIÓN PRÓXIMO TRIMESTRE
+    # ======================================================
+    _proyeccion_sucursales(tuple(sorted(sucursales)), map_sucursales)
+
     # ======================================================
     st.markdown("---")
     st.caption(f"Datos procesados: {len(df):,} registros.")
+
+
+COHORTES_KEY = "cohortes_sucursales"  # nombre -> lista de ids (por sesión y franquicia)
+
+
+@seccion("Comparar · grupos")
+def _comparar_grupos(fecha_inicio, fecha_fin, sucursales):
+    import altair as alt
+    from services.groups import (
+        ANTIGUEDAD, COHORTES, columnas_agrupables, comparar_grupos, definir_grupos,
+        etiquetas_antiguedad, matriz_diferencias, preparar_grupos, prueba_grupos
+    )
+
+    st.markdown("### 🏘️ Comparación por grupos de sucursales")
+    dims = get_dimensions()
+    rollup = get_monthly_rollup()
+
+    opciones = {c: c.capitalize() for c in columnas_agrupables(dims)}
+    opciones[ANTIGUEDAD] = "Antigüedad (nuevas vs maduras)"
+    opciones[COHORTES] = "Cohortes propias"
+
+    c1, c2 = st.columns([2, 1])
+    por = c1.radio("Agrupar por", list(opciones), format_func=opciones.get,
+                   horizontal=True, key="grupos_por")
+    alcance = c2.radio("Sucursales", ["Todas", "Seleccionadas"], horizontal=True, key="grupos_alcance",
+                       help="Todas = toda la franquicia; Seleccionadas = las del filtro lateral.")
+    base = None if alcance == "Todas" else sucursales
+
+    cohortes = st.session_state.setdefault(COHORTES_KEY, {})
+    if por == COHORTES:
+        with st.expander("✏️ Definir cohortes", expanded=not cohortes):
+            nombre = st.text_input("Nombre de la cohorte", key="cohorte_nombre")
+            etiquetas = dims.sucursales.mapping("label")
+            miembros = st.multiselect("Sucursales", list(dims.sucursales.ids),
+                                      format_func=lambda s: etiquetas.get(s, s), key="cohorte_miembros")
+            b1, b2 = st.columns(2)
+            if b1.button("Guardar cohorte", disabled=not (nombre.strip() and miembros)):
+                cohortes[nombre.strip()] = [int(s) for s in miembros]
+            if b2.button("Borrar cohortes", disabled=not cohortes):
+                cohortes.clear()
+            for n, ids in cohortes.items():
+                st.caption(f"**{n}**: " + ", ".join(str(etiquetas.get(s, s)) for s in ids))
+        if not cohortes:
+            st.info("Define al menos una cohorte; las demás sucursales se comparan como «Resto».")
+            return
+    elif por == ANTIGUEDAD:
+        st.caption(" vs ".join(etiquetas_antiguedad()) + f", al cierre de {fecha_fin[:7]}.")
+
+    grupos = definir_grupos(por, dims, rollup, base, fecha_fin, cohortes)
+    tabla, serie = comparar_grupos(rollup, grupos, fecha_inicio, fecha_fin)
+    if len(tabla) < 2:
+        st.info("Se necesitan al menos 2 grupos con ventas en el rango para comparar.")
+        return
+
+    st.dataframe(preparar_grupos(tabla), hide_index=True, use_container_width=True)
+    st.caption("El rango y «vs Líder» usan la venta mensual por sucursal; las órdenes son "
+               f"estimadas (±{rollup.error:.1%}).")
+    botones_descarga(tabla, f"comparacion_{por}", key="dl_grupos")
+
+    chart = (
+        alt.Chart(serie)
+        .mark_line(point=True, strokeWidth=3)
+        .encode(
+            x=alt.X("periodo:N", sort=None, title="Periodo (Año-Mes)"),
+            y=alt.Y("ventas:Q", title="Ventas ($)"),
+            color=alt.Color("grupo:N", title=opciones[por]),
+            tooltip=[
+                alt.Tooltip("grupo:N", title="Grupo"),
+                alt.Tooltip("periodo:N", title="Periodo"),
+                alt.Tooltip("ventas:Q", title="Ventas ($)", format=",.2f"),
+                alt.Tooltip("sucursales_activas:Q", title="Sucursales activas"),
+            ],
+        )
+        .properties(width=1000, height=380, title=f"Ventas mensuales por {opciones[por].lower()}")
+    )
+    st.altair_chart(chart, use_container_width=True)
+
+    c1, c2 = st.columns(2)
+    with c1:
+        st.markdown("**% de diferencia (fila vs columna), venta mensual por sucursal**")
+        st.dataframe(matriz_diferencias(tabla).map(lambda v: "---" if pd.isna(v) else f"{v:+.1f}%"),
+                     use_container_width=True)
+    with c2:
+        prueba = prueba_grupos(rollup, grupos, fecha_inicio, fecha_fin)
+        st.markdown("**¿Los grupos difieren?** (ventas mensuales por sucursal)")
+        if prueba["anova_p"] is None:
+            st.caption("Datos insuficientes para la prueba.")
+        else:
+            st.write(f"ANOVA: F = {prueba['anova_f']:.2f}, p = {prueba['anova_p']:.4f}")
+            st.write(f"Kruskal-Wallis: H = {prueba['kruskal_h']:.2f}, p = {prueba['kruskal_p']:.4f}")
+            if prueba["kruskal_p"] < 0.05:
+                st.success("Diferencia significativa entre grupos (p < 0.05).")
+            else:
+                st.info("Sin diferencia significativa entre grupos (p ≥ 0.05).")
+
+
+@seccion("Comparar · proyección")
+def _proyeccion_sucursales(sucursales, map_sucursales):
+    import altair as alt
+    from services.forecast import get_branch_forecaster, MODELOS
+
+    st.markdown("### 🔮 Proyección del próximo trimestre")
+    modelo = st.selectbox(
+        "Modelo", MODELOS, index=MODELOS.index("holt"), key="forecast_modelo",
+        help="seasonal_naive repite el mismo mes del año anterior; holt = suavizamiento exponencial con tendencia."
+    )
+
+    with st.spinner("Calculando proyección..."):
+        # Parámetros ajustados una vez por versión de datos para todas las sucursales
+        forecaster = get_branch_forecaster()
+        pron = forecaster.predict(h=3, modelo=modelo, sucursales=sucursales)
+
+    if pron.empty:
+        st.info("No hay historia suficiente para proyectar estas sucursales.")
+        return
+
+    pron["sucursal_nombre"] = pron["sucursal"].map(map_sucursales)
+    tabla = pron.pivot_table(index="periodo", columns="sucursal_nombre", values="pronostico").round(2)
+    st.dataframe(tabla.map(lambda v: f"${v:,.2f}"), use_container_width=True)
+
+    chart = (
+        alt.Chart(pron)
+        .mark_line(point=True, strokeDash=[6, 3], strokeWidth=3)
+        .encode(
+            x=alt.X("periodo:N", sort=None, title="Periodo (Año-Mes)"),
+            y=alt.Y("pronostico:Q", title="Ventas proyectadas ($)"),
+            color=alt.Color("sucursal_nombre:N", title="Sucursal"),
+            tooltip=[
+                alt.Tooltip("sucursal_nombre:N", title="Sucursal"),
+                alt.Tooltip("periodo:N", title="Periodo"),
+                alt.Tooltip("pronostico:Q", title="Proyección ($)", format=",.2f"),
+            ],
+        )
+        .properties(width=1000, height=320, title=f"Proyección ({modelo})")
+    )
+    st.altair_chart(chart, use_container_width=True)
     
     
     
+# ===============================================================
+#  DRILL-DOWN MES → DÍA → HORA
+# ===============================================================
+def view_drilldown(fecha_inicio, fecha_fin, sucursales, map_sucursales):
+    import altair as alt
+    from services.drilldown import monthly_level
+
+    st.subheader("🕒 Drill-down de ventas: mes → día → hora")
+
+    if not sucursales:
+        st.warning("⚠️ Selecciona al menos una sucursal en la barra lateral.")
+        return
+
+    # Nivel mes: sale del rollup en memoria, no consulta la base
+    mensual = monthly_level(fecha_inicio, fecha_fin, sucursales)
+    if mensual.empty:
+        st.error("No hay datos para las sucursales y rango seleccionados.")
+        return
+    mensual["sucursal_nombre"] = mensual["sucursal"].map(map_sucursales)
+
+    st.altair_chart(
+        alt.Chart(mensual).mark_bar().encode(
+            x=alt.X("periodo:N", sort=None, title="Periodo (Año-Mes)"),
+            y=alt.Y("total_ventas:Q", title="Ventas ($)"),
+            color=alt.Color("sucursal_nombre:N", title="Sucursal"),
+            tooltip=[alt.Tooltip("sucursal_nombre:N", title="Sucursal"),
+                     alt.Tooltip("total_ventas:Q", title="Ventas ($)", format=",.2f")],
+        ).properties(height=280, title="Ventas mensuales"),
+        use_container_width=True
+    )
+
+    _drilldown_detalle(tuple(sorted(sucursales)), map_sucursales, tuple(mensual["periodo"].unique()))
+
+
+@seccion("Drill-down · día/hora")
+def _drilldown_detalle(sucursales, map_sucursales, periodos):
+    import altair as alt
+    from services.drilldown import daily_level, hourly_level, month_window, peak_hours
+
+    # Nivel día: solo el mes elegido
+    periodo = st.selectbox("🔎 Mes a detallar", periodos, index=len(periodos) - 1, key="drill_periodo")
+    anio, mes = int(periodo[:4]), int(periodo[5:7])
+
+    with st.spinner("Consultando ventas diarias del mes..."):
+        diario = daily_level(anio, mes, sucursales)
+    if diario.empty:
+        st.info("Sin ventas en el mes seleccionado.")
+        return
+    diario["sucursal_nombre"] = diario["sucursal"].map(map_sucursales)
+
+    st.altair_chart(
+        alt.Chart(diario).mark_line(point=True).encode(
+            x=alt.X("fecha:T", title="Día"),
+            y=alt.Y("total_ventas:Q", title="Ventas ($)"),
+            color=alt.Color("sucursal_nombre:N", title="Sucursal"),
+            tooltip=[alt.Tooltip("sucursal_nombre:N", title="Sucursal"),
+                     alt.Tooltip("fecha:T", title="Día"),
+                     alt.Tooltip("total_ventas:Q", title="Ventas ($)", format=",.2f"),
+                     alt.Tooltip("ordenes:Q", title="Órdenes", format=",")],
+        ).properties(height=280, title=f"Ventas diarias — {periodo}"),
+        use_container_width=True
+    )
+
+    # Nivel hora: mes completo o un solo día
+    dias = ["Mes completo"] + sorted(diario["fecha"].dt.strftime("%Y-%m-%d").unique().tolist())
+    dia = st.selectbox("🕒 Ventana para el mapa de calor por hora", dias, key="drill_dia")
+    fi, ff = month_window(anio, mes) if dia == "Mes completo" else (dia, dia)
+
+    with st.spinner("Consultando ventas por hora..."):
+        horario = hourly_level(fi, ff, sucursales)
+    if horario.empty:
+        st.info("Sin ventas en la ventana seleccionada.")
+        return
+    horario["sucursal_nombre"] = horario["sucursal"].map(map_sucursales)
+    horario["dia"] = horario["fecha"].dt.strftime("%d")
+
+    heatmap = (
+        alt.Chart(horario)
+        .mark_rect()
+        .encode(
+            x=alt.X("dia:O", title="Día del mes"),
+            y=alt.Y("hora:O", title="Hora del día"),
+            color=alt.Color("total_ventas:Q", title="Ventas ($)", scale=alt.Scale(scheme="oranges")),
+            tooltip=[alt.Tooltip("fecha:T", title="Día"), alt.Tooltip("hora:O", title="Hora"),
+                     alt.Tooltip("total_ventas:Q", title="Ventas ($)", format=",.2f"),
+                     alt.Tooltip("ordenes:Q", title="Órdenes", format=",")],
+        )
+        .properties(height=360, width=220)
+        .facet(column=alt.Column("sucursal_nombre:N", title=None))
+    )
+    st.altair_chart(heatmap)
+
+    st.markdown("#### 🔥 Horas pico por sucursal (promedio diario)")
+    pico = peak_hours(horario)
+    pico["sucursal"] = pico["sucursal"].map(map_sucursales)
+    pico["promedio_diario"] = pico["promedio_diario"].apply(lambda v: f"${v:,.2f}")
+    st.dataframe(
+        pico[["sucursal", "hora", "promedio_diario"]]
+            .rename(columns={"sucursal": "Sucursal", "hora": "Hora", "promedio_diario": "Ventas promedio/día"}),
+        hide_index=True, use_container_width=True
+    )
+
+
+# ===============================================================
+#  ANÁLISIS DE CANASTA (PIZZAS COMPRADAS JUNTAS)
+# ===============================================================
+def view_canasta(fecha_inicio, fecha_fin, sucursales, map_sucursales):
+    st.subheader("🧺 Análisis de Canasta: ¿qué pizzas se compran juntas?")
+    nombres = ", ".join(map_sucursales.get(s, str(s)) for s in sucursales) or "todas las sucursales"
+    st.caption(f"Periodo {fecha_inicio} a {fecha_fin} — {nombres}.")
+    _canasta_reglas(fecha_inicio, fecha_fin, tuple(sorted(sucursales)))
+
+
+@seccion("Canasta · reglas")
+def _canasta_reglas(fecha_inicio, fecha_fin, sucursales):
+    import altair as alt
+    from services.basket import MIN_SUPPORT, get_basket_analysis
+
+    col1, col2, col3 = st.columns(3)
+    soporte = col1.select_slider("Soporte mínimo", [0.001, 0.002, 0.005, 0.01, 0.02],
+                                 value=MIN_SUPPORT, key="canasta_soporte",
+                                 format_func=lambda v: f"{v:.1%}")
+    confianza = col2.slider("Confianza mínima", 0.0, 1.0, 0.05, 0.05, key="canasta_confianza")
+    lift = col3.slider("Lift mínimo", 0.0, 3.0, 1.0, 0.1, key="canasta_lift")
+
+    with st.spinner("Calculando conjuntos frecuentes..."):
+        canasta = get_basket_analysis(fecha_inicio, fecha_fin, sucursales, soporte)
+
+    if not canasta.n_ordenes:
+        st.info("No hay órdenes en el filtro seleccionado.")
+        return
+
+    st.caption(
+        f"🔎 {canasta.n_ordenes:,} órdenes analizadas · {len(canasta.pares):,} pares y "
+        f"{len(canasta.triples):,} triples frecuentes."
+    )
+
+    reglas = canasta.rules(min_confidence=confianza, min_lift=lift)
+    st.markdown("### 🔗 Reglas de asociación")
+    if reglas.empty:
+        st.info("Ninguna regla cumple los umbrales; prueba bajar el soporte, la confianza o el lift.")
+    else:
+        st.dataframe(
+            reglas.rename(columns={"antecedente": "Si compra", "consecuente": "También compra",
+                                   "tamano": "Productos", "ordenes": "Órdenes", "soporte": "Soporte",
+                                   "confianza": "Confianza", "lift": "Lift"})
+                .style.format({"Soporte": "{:.2%}", "Confianza": "{:.1%}", "Lift": "{:.2f}", "Órdenes": "{:,}"}),
+            hide_index=True, use_container_width=True
+        )
+
+    # Mapa de calor de lift entre pares frecuentes
+    pares = canasta.pairs()
+    if not pares.empty:
+        st.markdown("### 🍕 Lift entre pares de pizzas")
+        simetrico = pd.concat([
+            pares,
+            pares.rename(columns={"producto_a": "producto_b", "producto_b": "producto_a"}),
+        ], ignore_index=True)
+        heatmap = alt.Chart(simetrico).mark_rect().encode(
+            x=alt.X("producto_a:N", title=None),
+            y=alt.Y("producto_b:N", title=None),
+            color=alt.Color("lift:Q", title="Lift", scale=alt.Scale(scheme="redblue", domainMid=1, reverse=True)),
+            tooltip=[alt.Tooltip("producto_a:N", title="Pizza A"), alt.Tooltip("producto_b:N", title="Pizza B"),
+                     alt.Tooltip("ordenes:Q", title="Órdenes", format=","),
+                     alt.Tooltip("soporte:Q", title="Soporte", format=".2%"),
+                     alt.Tooltip("lift:Q", title="Lift", format=".2f")],
+        ).properties(height=600)
+        st.altair_chart(heatmap, use_container_width=True)
+
+
 def vista_top5():
     st.subheader("🏆 Top 5 Sucursales por Ventas Totales")
 
-    df = get_top5_sucursales()
+    if DISTINCT_MODE == "hll":
+        df = (
+            get_monthly_rollup().branch_summary()
+            .sort_values("ventas_totales", ascending=False)
+            .head(5)
+        )
+        df = _with_branch_labels(df, columns=("nombre", "ciudad")).rename(
+            columns={"sucursal": "id_sucursal", "nombre": "sucursal"}
+        )
+    else:
+        df = get_top5_sucursales()
     df = preparar_top5(df)
 
     tabla = df[[